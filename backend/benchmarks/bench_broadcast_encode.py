@@ -0,0 +1,78 @@
+"""Microbenchmark: cost of encoding one broadcast for N WebSocket clients.
+
+Compares the previous behaviour (json.dumps once per connection, as
+send_json does) against encoding once with websocket_manager.encode and
+reusing the same text for every client.
+
+Usage (from backend/):
+    python benchmarks/bench_broadcast_encode.py [--clients 2,10,50,200] [--messages 2000] [--repeat 5]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from websocket_manager import encode, orjson  # noqa: E402
+
+SAMPLE_EVENT = {
+    'type': 'chat_message',
+    'data': {
+        'seq': 48213,
+        'id': 'b34ccfc7-4977-403a-8a94-33c6bac34fb8',
+        'channel': 'kallie',
+        'username': 'CozyViewer',
+        'message': 'this beat is actually so hard, play it again Kappa Kappa',
+        'timestamp': '2024-11-14T22:13:20.123000+00:00',
+        'badges': ['subscriber', 'premium'],
+        'badge_info': {'subscriber': '14'},
+        'color': '#FF69B4',
+        # One record per occurrence, as EmoteIndex.detect produces them
+        'emotes': [
+            {'id': '25', 'name': 'Kappa', 'positions': [[45, 49]]},
+            {'id': '25', 'name': 'Kappa', 'positions': [[51, 55]]}
+        ]
+    }
+}
+
+
+def per_client(event, clients: int):
+    # Starlette's send_json: one json.dumps per socket
+    return [json.dumps(event, ensure_ascii=False, separators=(',', ':')) for _ in range(clients)]
+
+
+def once(event, clients: int):
+    message = encode(event)
+    return [message for _ in range(clients)]
+
+
+def run(encode_fn, clients: int, messages: int, repeat: int) -> float:
+    """Best-of-N microseconds per broadcast"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(messages):
+            encode_fn(SAMPLE_EVENT, clients)
+        best = min(best, time.perf_counter() - start)
+    return best / messages * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', default='2,10,50,200')
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'clients':>8} {'per-client us':>14} {'once us':>10} {'speedup':>9}")
+    for clients in (int(n) for n in args.clients.split(',')):
+        legacy = run(per_client, clients, args.messages, args.repeat)
+        current = run(once, clients, args.messages, args.repeat)
+        print(f"{clients:>8} {legacy:>14.1f} {current:>10.1f} {legacy / current:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Microbenchmark: IRC PRIVMSG parsing throughput (lines/sec).
+
+Compares the previous regex-based TwitchIRCChat._parse_message against the
+single-pass tokenizer in irc_parser.py.
+
+Usage (from backend/):
+    python benchmarks/bench_irc_parser.py [--lines 100000] [--repeat 5]
+"""
+import argparse
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from irc_chat_service import TwitchIRCChat  # noqa: E402
+
+SAMPLE_LINES = [
+    "@badge-info=subscriber/14;badges=subscriber/12,premium/1;client-nonce=d5b1a3;color=#FF69B4;"
+    "display-name=CozyViewer;emotes=;first-msg=0;flags=;id=b34ccfc7-4977-403a-8a94-33c6bac34fb8;"
+    "mod=0;returning-chatter=0;room-id=123456789;subscriber=1;tmi-sent-ts=1700000000123;turbo=0;"
+    "user-id=987654321;user-type= :cozyviewer!cozyviewer@cozyviewer.tmi.twitch.tv PRIVMSG #kallie "
+    ":this beat is actually so hard, play it again",
+    "@badge-info=;badges=moderator/1;color=#1E90FF;display-name=ModSquad;emotes=25:0-4,12-16/1902:6-10;"
+    "first-msg=0;flags=;id=1a2b3c4d-0000-1111-2222-333344445555;mod=1;room-id=123456789;subscriber=0;"
+    "tmi-sent-ts=1700000000456;turbo=0;user-id=111222333;user-type=mod "
+    ":modsquad!modsquad@modsquad.tmi.twitch.tv PRIVMSG #kallie :Kappa Keepo Kappa",
+    "@badge-info=;badges=;color=;display-name=lurker_42;emotes=;first-msg=1;flags=;"
+    "id=ffffffff-eeee-dddd-cccc-bbbbbbbbbbbb;mod=0;room-id=123456789;subscriber=0;"
+    "tmi-sent-ts=1700000000789;turbo=0;user-id=444555666;user-type= "
+    ":lurker_42!lurker_42@lurker_42.tmi.twitch.tv PRIVMSG #kallie :!queue",
+]
+
+
+def legacy_parse(raw_message: str):
+    """The pre-tokenizer implementation (tag split + two unanchored regex scans)"""
+    tags = {}
+    if raw_message.startswith('@'):
+        tag_section = raw_message.split(' ', 1)[0][1:]
+        for tag in tag_section.split(';'):
+            if '=' in tag:
+                key, value = tag.split('=', 1)
+                tags[key] = value
+
+    username_match = re.search(r':(\w+)!', raw_message)
+    message_match = re.search(r'PRIVMSG #\w+ :(.+)$', raw_message)
+    if not username_match or not message_match:
+        return None
+
+    username = username_match.group(1)
+    message_text = message_match.group(1)
+
+    badges = []
+    badge_info = {}
+    if 'badges' in tags and tags['badges']:
+        for badge in tags['badges'].split(','):
+            if '/' in badge:
+                badge_name, badge_version = badge.split('/', 1)
+                badges.append(badge_name)
+                badge_info[badge_name] = badge_version
+
+    color = tags.get('color', '#9147FF') or '#9147FF'
+
+    emotes_list = []
+    if 'emotes' in tags and tags['emotes']:
+        for emote_data in tags['emotes'].split('/'):
+            if ':' in emote_data:
+                emote_id, positions_str = emote_data.split(':', 1)
+                positions = []
+                for pos_str in positions_str.split(','):
+                    if '-' in pos_str:
+                        start, end = pos_str.split('-')
+                        positions.append([int(start), int(end)])
+                if positions and not any(e['id'] == emote_id for e in emotes_list):
+                    emotes_list.append({'id': emote_id, 'name': '', 'positions': positions})
+
+    return {
+        'id': tags.get('id', f"{username}_{datetime.now().timestamp()}"),
+        'username': username,
+        'message': message_text,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'badges': badges,
+        'badge_info': badge_info,
+        'color': color,
+        'emotes': emotes_list
+    }
+
+
+def run(label: str, parse, lines, repeat: int) -> float:
+    """Best-of-N throughput, to keep scheduler noise out of the comparison"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            parse(line)
+        best = min(best, time.perf_counter() - start)
+    rate = len(lines) / best
+    print(f"{label:<12} {rate:>12,.0f} lines/sec  ({best * 1000:.1f} ms for {len(lines):,} lines)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    lines = (SAMPLE_LINES * (args.lines // len(SAMPLE_LINES) + 1))[:args.lines]
+    chat = TwitchIRCChat()
+
+    # Warm up both paths
+    for line in SAMPLE_LINES:
+        legacy_parse(line)
+        chat._parse_message(line)
+
+    legacy_rate = run('legacy', legacy_parse, lines, args.repeat)
+    current_rate = run('tokenizer', chat._parse_message, lines, args.repeat)
+    print(f"speedup      {current_rate / legacy_rate:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
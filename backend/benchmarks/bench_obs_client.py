@@ -0,0 +1,104 @@
+"""Round-trip benchmark for OBSClient against the mock OBS server.
+
+Runs a quick protocol check (auth, error status, events), then times N
+GetStats requests awaited one after another versus all N in flight at
+once on the same socket, and the four update_stats reads as separate
+round trips versus one RequestBatch.
+
+Usage (from backend/):
+    python benchmarks/bench_obs_client.py [--requests 200] [--latency-ms 5]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_obs_server import start  # noqa: E402
+from obs_client import OBSClient, OBSError  # noqa: E402
+
+PORT = 44555
+PASSWORD = 'hunter2'
+STATS_REQUESTS = ['GetStreamStatus', 'GetRecordStatus', 'GetStats', 'GetCurrentProgramScene']
+
+
+async def check(client: OBSClient):
+    """Fail loudly if the client and mock disagree about the protocol"""
+    bad = OBSClient('localhost', PORT, 'wrong')
+    try:
+        await bad.connect(timeout=2)
+        raise AssertionError("connected with a wrong password")
+    except AssertionError:
+        raise
+    except Exception:
+        pass
+
+    try:
+        await client.call('SetCurrentProgramScene', {'sceneName': 'Nope'})
+        raise AssertionError("expected OBSError")
+    except OBSError as e:
+        assert e.code == 600, e
+
+    seen = asyncio.Event()
+
+    async def on_scene(data):
+        if data.get('sceneName') == 'BRB':
+            seen.set()
+
+    client.on('CurrentProgramSceneChanged', on_scene)
+    await client.call('SetCurrentProgramScene', {'sceneName': 'BRB'})
+    await asyncio.wait_for(seen.wait(), 2)
+    await client.call('SetCurrentProgramScene', {'sceneName': 'Main'})
+    print("protocol check  ok (auth, error status, events)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    mock, server = await start(port=PORT, password=PASSWORD, latency=args.latency_ms / 1000)
+    client = OBSClient('localhost', PORT, PASSWORD)
+    await client.connect()
+    try:
+        await check(client)
+
+        start_time = time.perf_counter()
+        for _ in range(args.requests):
+            await client.call('GetStats')
+        sequential = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(client.call('GetStats') for _ in range(args.requests)))
+        pipelined = time.perf_counter() - start_time
+
+        print(f"sequential      {sequential * 1000:8.1f} ms for {args.requests} requests")
+        print(f"pipelined       {pipelined * 1000:8.1f} ms for {args.requests} requests")
+        print(f"speedup         {sequential / pipelined:.1f}x")
+
+        rounds = max(1, args.requests // 4)
+        start_time = time.perf_counter()
+        for _ in range(rounds):
+            for request_type in STATS_REQUESTS:
+                await client.call(request_type)
+        separate = (time.perf_counter() - start_time) / rounds
+
+        start_time = time.perf_counter()
+        for _ in range(rounds):
+            await client.batch([(request_type, None) for request_type in STATS_REQUESTS])
+        batched = (time.perf_counter() - start_time) / rounds
+
+        print(f"stats separate  {separate * 1000:8.2f} ms per refresh")
+        print(f"stats batched   {batched * 1000:8.2f} ms per refresh")
+    finally:
+        await client.disconnect()
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
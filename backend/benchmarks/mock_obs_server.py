@@ -0,0 +1,307 @@
+"""Minimal obs-websocket v5 server for exercising OBSClient/OBSService without OBS.
+
+Implements Hello/Identify (with optional password auth), Reidentify,
+single requests, RequestBatch (including Sleep) and a handful of requests
+backed by fake state, emitting the matching events. Every response is
+delayed by --latency-ms to stand in for a real OBS round trip. Clients
+subscribed to InputVolumeMeters get random stereo levels at --meter-hz.
+
+Usage (from backend/):
+    python benchmarks/mock_obs_server.py [--port 4455] [--password secret] [--latency-ms 5] [--meter-hz 20]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from obs_client import (  # noqa: E402
+    OP_HELLO, OP_IDENTIFY, OP_IDENTIFIED, OP_REIDENTIFY, OP_EVENT, OP_REQUEST,
+    OP_REQUEST_RESPONSE, OP_REQUEST_BATCH, OP_REQUEST_BATCH_RESPONSE, EVENTS_INPUT_VOLUME_METERS, auth_string
+)
+
+RESOURCE_NOT_FOUND = 600
+UNKNOWN_REQUEST_TYPE = 204
+
+
+class MockOBS:
+    def __init__(self, password: str = '', latency: float = 0.0):
+        self.password = password
+        self.latency = latency
+        self.clients = {}
+        self.requests_handled = 0
+        self.current_scene = 'Main'
+        self.scenes = {
+            'Main': [{'sceneItemId': 1, 'sourceName': 'Webcam', 'sceneItemEnabled': True},
+                     {'sceneItemId': 2, 'sourceName': 'Game Capture', 'sceneItemEnabled': True},
+                     {'sceneItemId': 3, 'sourceName': 'Alerts', 'sceneItemEnabled': True}],
+            'BRB': [{'sceneItemId': 1, 'sourceName': 'BRB Loop', 'sceneItemEnabled': True}],
+            'Starting Soon': [{'sceneItemId': 1, 'sourceName': 'Countdown', 'sceneItemEnabled': True}],
+        }
+        self.streaming = False
+        self.recording = False
+        # Output counters advance with wall time at these rates while streaming
+        self.bitrate_kbps = 6000.0
+        self.drop_pct = 0.0
+        self.fps = 60.0
+        self._counted_at = time.monotonic()
+        self._skipped = 0.0
+        self._total = 0.0
+        self.output_bytes = 0
+        self.skipped_frames = 0
+        self.total_frames = 0
+        self.render_skipped = 0
+        self.render_total = 0
+        self.muted = {'Mic/Aux': False, 'Desktop Audio': False}
+        self.replay_buffer = False
+        self.meter_hz = 20.0
+        self.meter_events = 0
+        self.meter_task = None
+
+    async def handler(self, websocket):
+        hello = {'obsWebSocketVersion': '5.5.0', 'rpcVersion': 1}
+        if self.password:
+            salt = base64.b64encode(os.urandom(16)).decode()
+            challenge = base64.b64encode(os.urandom(16)).decode()
+            hello['authentication'] = {'salt': salt, 'challenge': challenge}
+        await websocket.send(json.dumps({'op': OP_HELLO, 'd': hello}))
+
+        identify = json.loads(await websocket.recv())
+        if identify.get('op') != OP_IDENTIFY:
+            await websocket.close(4007, 'Not identified')
+            return
+        if self.password and identify['d'].get('authentication') != auth_string(
+                self.password, hello['authentication']['salt'], hello['authentication']['challenge']):
+            await websocket.close(4009, 'Authentication failed')
+            return
+        self.clients[websocket] = identify['d'].get('eventSubscriptions', 0)
+        await websocket.send(json.dumps({'op': OP_IDENTIFIED, 'd': {'negotiatedRpcVersion': 1}}))
+
+        try:
+            async for raw in websocket:
+                message = json.loads(raw)
+                asyncio.create_task(self._handle(websocket, message['op'], message['d']))
+        finally:
+            self.clients.pop(websocket, None)
+
+    async def _handle(self, websocket, op, data):
+        if op == OP_REIDENTIFY:
+            self.clients[websocket] = data.get('eventSubscriptions', 0)
+            await websocket.send(json.dumps({'op': OP_IDENTIFIED, 'd': {'negotiatedRpcVersion': 1}}))
+            return
+
+        await asyncio.sleep(self.latency)
+        if op == OP_REQUEST:
+            result = await self._run(data['requestType'], data.get('requestData') or {})
+            await websocket.send(json.dumps({'op': OP_REQUEST_RESPONSE, 'd': {
+                'requestType': data['requestType'], 'requestId': data['requestId'], **result
+            }}))
+        elif op == OP_REQUEST_BATCH:
+            results = []
+            for request in data.get('requests', []):
+                result = await self._run(request['requestType'], request.get('requestData') or {})
+                results.append({'requestType': request['requestType'], **result})
+                if data.get('haltOnFailure') and not result['requestStatus']['result']:
+                    break
+            await websocket.send(json.dumps({'op': OP_REQUEST_BATCH_RESPONSE, 'd': {
+                'requestId': data['requestId'], 'results': results
+            }}))
+
+    async def emit(self, event_type, event_data, intent=0):
+        message = json.dumps({'op': OP_EVENT, 'd': {
+            'eventType': event_type, 'eventIntent': intent, 'eventData': event_data
+        }})
+        for websocket, subscriptions in list(self.clients.items()):
+            if subscriptions & intent or not intent:
+                await websocket.send(message)
+
+    async def run_meters(self):
+        """Emit InputVolumeMeters like OBS does (only reaches clients subscribed to it)"""
+        while True:
+            await asyncio.sleep(1 / self.meter_hz)
+            inputs = []
+            for name, muted in self.muted.items():
+                channels = []
+                for _ in range(2):
+                    peak = 0.0 if muted else random.uniform(0.05, 0.9)
+                    channels.append([peak * random.uniform(0.3, 0.7), peak, peak])
+                inputs.append({'inputName': name, 'inputLevelsMul': channels})
+            try:
+                await self.emit('InputVolumeMeters', {'inputs': inputs}, EVENTS_INPUT_VOLUME_METERS)
+            except ConnectionClosed:
+                continue
+            self.meter_events += 1
+
+    @staticmethod
+    def ok(data=None):
+        result = {'requestStatus': {'result': True, 'code': 100}}
+        if data is not None:
+            result['responseData'] = data
+        return result
+
+    @staticmethod
+    def fail(code, comment):
+        return {'requestStatus': {'result': False, 'code': code, 'comment': comment}}
+
+    async def _run(self, request_type, data):
+        self.requests_handled += 1
+        handler = getattr(self, f"req_{request_type}", None)
+        if handler is None:
+            return self.fail(UNKNOWN_REQUEST_TYPE, f"Unknown request type: {request_type}")
+        return await handler(data)
+
+    def _scene(self, data):
+        return self.scenes.get(data.get('sceneName'))
+
+    async def req_Sleep(self, data):
+        await asyncio.sleep(data.get('sleepMillis', 0) / 1000)
+        return self.ok()
+
+    def _advance_output(self):
+        now = time.monotonic()
+        elapsed, self._counted_at = now - self._counted_at, now
+        if not self.streaming:
+            return
+        self.output_bytes += int(self.bitrate_kbps * 1000 / 8 * elapsed)
+        frames = self.fps * elapsed
+        self._total += frames
+        self._skipped += frames * self.drop_pct / 100
+        self.total_frames = int(self._total)
+        self.skipped_frames = int(self._skipped)
+
+    async def req_GetStats(self, data):
+        self._advance_output()
+        self.render_total += 60
+        return self.ok({
+            'cpuUsage': 4.2, 'memoryUsage': 512.0, 'activeFps': 60.0,
+            'averageFrameRenderTime': 1.8, 'renderSkippedFrames': self.render_skipped,
+            'renderTotalFrames': self.render_total, 'outputSkippedFrames': self.skipped_frames,
+            'outputTotalFrames': self.total_frames
+        })
+
+    async def req_GetStreamStatus(self, data):
+        self._advance_output()
+        return self.ok({
+            'outputActive': self.streaming, 'outputReconnecting': False,
+            'outputBytes': self.output_bytes, 'outputSkippedFrames': self.skipped_frames,
+            'outputTotalFrames': self.total_frames
+        })
+
+    async def req_GetRecordStatus(self, data):
+        return self.ok({'outputActive': self.recording, 'outputPaused': False})
+
+    async def req_GetCurrentProgramScene(self, data):
+        return self.ok({'currentProgramSceneName': self.current_scene, 'sceneName': self.current_scene})
+
+    async def req_GetSceneList(self, data):
+        return self.ok({
+            'currentProgramSceneName': self.current_scene,
+            'scenes': [{'sceneName': name, 'sceneIndex': i} for i, name in enumerate(reversed(self.scenes))]
+        })
+
+    async def req_SetCurrentProgramScene(self, data):
+        if data.get('sceneName') not in self.scenes:
+            return self.fail(RESOURCE_NOT_FOUND, 'No source was found by the name of `sceneName`.')
+        self.current_scene = data['sceneName']
+        await self.emit('CurrentProgramSceneChanged', {'sceneName': self.current_scene}, 1 << 2)
+        return self.ok()
+
+    async def req_GetSceneItemList(self, data):
+        items = self._scene(data)
+        if items is None:
+            return self.fail(RESOURCE_NOT_FOUND, 'No source was found by the name of `sceneName`.')
+        return self.ok({'sceneItems': [dict(item, sceneItemIndex=i) for i, item in enumerate(items)]})
+
+    async def req_GetSceneItemId(self, data):
+        for item in self._scene(data) or []:
+            if item['sourceName'] == data.get('sourceName'):
+                return self.ok({'sceneItemId': item['sceneItemId']})
+        return self.fail(RESOURCE_NOT_FOUND, 'No scene items were found in the specified scene by that name.')
+
+    async def req_SetSceneItemEnabled(self, data):
+        for item in self._scene(data) or []:
+            if item['sceneItemId'] == data.get('sceneItemId'):
+                item['sceneItemEnabled'] = data['sceneItemEnabled']
+                await self.emit('SceneItemEnableStateChanged', {
+                    'sceneName': data['sceneName'], 'sceneItemId': item['sceneItemId'],
+                    'sceneItemEnabled': item['sceneItemEnabled']
+                }, 1 << 7)
+                return self.ok()
+        return self.fail(RESOURCE_NOT_FOUND, 'No scene items were found in the specified scene.')
+
+    async def req_GetInputMute(self, data):
+        if data.get('inputName') not in self.muted:
+            return self.fail(RESOURCE_NOT_FOUND, 'No source was found by the name of `inputName`.')
+        return self.ok({'inputMuted': self.muted[data['inputName']]})
+
+    async def req_SetInputMute(self, data):
+        if data.get('inputName') not in self.muted:
+            return self.fail(RESOURCE_NOT_FOUND, 'No source was found by the name of `inputName`.')
+        self.muted[data['inputName']] = data['inputMuted']
+        await self.emit('InputMuteStateChanged', {'inputName': data['inputName'], 'inputMuted': data['inputMuted']},
+                        1 << 3)
+        return self.ok()
+
+    async def _set_output(self, attribute, event, active, state):
+        self._advance_output()
+        setattr(self, attribute, active)
+        await self.emit(event, {'outputActive': active, 'outputState': state}, 1 << 6)
+        return self.ok()
+
+    async def req_StartStream(self, data):
+        return await self._set_output('streaming', 'StreamStateChanged', True, 'OBS_WEBSOCKET_OUTPUT_STARTED')
+
+    async def req_StopStream(self, data):
+        return await self._set_output('streaming', 'StreamStateChanged', False, 'OBS_WEBSOCKET_OUTPUT_STOPPED')
+
+    async def req_StartRecord(self, data):
+        return await self._set_output('recording', 'RecordStateChanged', True, 'OBS_WEBSOCKET_OUTPUT_STARTED')
+
+    async def req_StopRecord(self, data):
+        return await self._set_output('recording', 'RecordStateChanged', False, 'OBS_WEBSOCKET_OUTPUT_STOPPED')
+
+    async def req_StartReplayBuffer(self, data):
+        return await self._set_output('replay_buffer', 'ReplayBufferStateChanged', True,
+                                      'OBS_WEBSOCKET_OUTPUT_STARTED')
+
+    async def req_SaveReplayBuffer(self, data):
+        if not self.replay_buffer:
+            return self.fail(501, 'Replay buffer is not active.')
+        return self.ok()
+
+
+async def start(host: str = 'localhost', port: int = 4455, password: str = '', latency: float = 0.0,
+                meter_hz: float = 20.0):
+    """Start a mock server; returns (MockOBS, server) so callers can inspect state and close it"""
+    mock = MockOBS(password, latency)
+    mock.meter_hz = meter_hz
+    server = await serve(mock.handler, host, port, subprotocols=['obswebsocket.json'])
+    mock.meter_task = asyncio.create_task(mock.run_meters(), name='mock-obs-meters')
+    return mock, server
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=4455)
+    parser.add_argument('--password', default='')
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--meter-hz', type=float, default=20.0)
+    args = parser.parse_args()
+
+    _, server = await start(args.host, args.port, args.password, args.latency_ms / 1000, args.meter_hz)
+    print(f"Mock OBS listening on ws://{args.host}:{args.port}")
+    await server.serve_forever()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
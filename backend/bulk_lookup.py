@@ -0,0 +1,168 @@
+import re
+import logging
+from typing import Dict, Iterable, List, Optional
+from dotenv import load_dotenv
+from pathlib import Path
+from helix_client import helix, PRIORITY_BACKGROUND
+from user_cache import user_cache, LOGIN_RE
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# helix/subscriptions accepts up to 100 user_id= parameters per call
+HELIX_SUBSCRIPTIONS_MAX = 100
+
+# Tier mapping: 1000 = T1, 2000 = T2, 3000 = T3
+TIER_MAP = {
+    '1000': 'T1',
+    '2000': 'T2',
+    '3000': 'T3'
+}
+
+NOT_FOUND = {'is_subscribed': False, 'tier': None, 'found': False}
+
+
+def candidate_logins(discord_username: str) -> List[str]:
+    """Twitch logins worth trying for a Discord username, best guess first (empty if too short)"""
+    exact = discord_username.lower()
+    # Remove common suffixes, separators and trailing numbers (common in Discord)
+    clean_name = exact.replace('ttv', '').replace('twitch', '').replace('_', '').replace('-', '').replace('.', '')
+    clean_name = re.sub(r'\d+$', '', clean_name)
+    if len(clean_name) < 3:
+        return []
+    # Discord allows dots, spaces and longer names; only send what could be a Twitch login
+    return [login for login in dict.fromkeys((exact, clean_name)) if LOGIN_RE.match(login)]
+
+
+def _first_found(logins: List[str], users: Dict[str, Optional[Dict]]) -> Optional[Dict]:
+    return next((users[login] for login in logins if users.get(login)), None)
+
+
+class BulkLookup:
+    """Many-at-once versions of the find-user and subscription lookups.
+
+    Logins go through user_cache.get_users (100 per helix/users call, cached
+    ones skipped) and subscriptions are checked 100 user IDs per
+    helix/subscriptions call, so annotating a 50-item submission queue
+    takes two or three Helix requests instead of one or two per item.
+    """
+
+    def __init__(self):
+        # Metrics
+        self.subscription_requests = 0
+        self.subscriptions_checked = 0
+        self.annotated = 0
+
+    async def get_subscriptions(self, user_ids: Iterable[str], broadcaster_id: str, access_token: str,
+                                priority: int = PRIORITY_BACKGROUND) -> Dict[str, Dict]:
+        """Subscription status by user ID for the broadcaster's channel.
+
+        helix/subscriptions only lists users who are subscribed, so every
+        ID it leaves out is reported as not subscribed. A chunk Helix
+        refuses (e.g. missing channel:read:subscriptions) is logged and its
+        users reported as not subscribed, like the single-user lookup does.
+        """
+        ids = list(dict.fromkeys(user_id for user_id in user_ids if user_id))
+        results = {user_id: {'is_subscribed': False, 'tier': None, 'found': True} for user_id in ids}
+
+        for start in range(0, len(ids), HELIX_SUBSCRIPTIONS_MAX):
+            chunk = ids[start:start + HELIX_SUBSCRIPTIONS_MAX]
+            try:
+                response = await helix.client.get(
+                    'https://api.twitch.tv/helix/subscriptions',
+                    params=[('broadcaster_id', broadcaster_id)] + [('user_id', user_id) for user_id in chunk],
+                    headers={'Authorization': f'Bearer {access_token}'},
+                    extensions={'helix_priority': priority}
+                )
+                self.subscription_requests += 1
+                response.raise_for_status()
+            except Exception as e:
+                logger.error(f"Error checking subscriptions for {len(chunk)} users: {e}")
+                continue
+
+            self.subscriptions_checked += len(chunk)
+            for sub in response.json().get('data', []):
+                if sub.get('user_id') in results:
+                    results[sub['user_id']] = {
+                        'is_subscribed': True,
+                        'tier': TIER_MAP.get(sub.get('tier'), 'T1'),
+                        'is_gift': bool(sub.get('is_gift', False)),
+                        'found': True
+                    }
+        return results
+
+    async def get_user_subscriptions(self, logins: Iterable[str], broadcaster_id: str, access_token: str,
+                                     priority: int = PRIORITY_BACKGROUND) -> Dict[str, Dict]:
+        """Subscription status by login (found False for logins Twitch doesn't know)"""
+        users = await user_cache.get_users(logins, access_token, priority)
+        subs = await self.get_subscriptions(
+            [user['id'] for user in users.values() if user], broadcaster_id, access_token, priority
+        )
+        return {login: subs[user['id']] if user else dict(NOT_FOUND) for login, user in users.items()}
+
+    async def find_matching_users(self, discord_usernames: Iterable[str], access_token: str,
+                                  priority: int = PRIORITY_BACKGROUND) -> Dict[str, Optional[Dict]]:
+        """Best Twitch user for each Discord username (None when no candidate exists)"""
+        candidates = {name: candidate_logins(name) for name in dict.fromkeys(discord_usernames)}
+        users = await user_cache.get_users(
+            [login for logins in candidates.values() for login in logins], access_token, priority
+        )
+        return {name: _first_found(logins, users) for name, logins in candidates.items()}
+
+    async def annotate_submissions(self, submissions: List[Dict], broadcaster_id: str, access_token: str,
+                                   priority: int = PRIORITY_BACKGROUND) -> List[Dict]:
+        """Copies of the submissions with a 'twitch' entry shaped like /twitch/find-user's response.
+
+        Submissions with a mapped twitch_username use it as is; the rest are
+        auto-matched from their Discord username.
+        """
+        mapped = {sub['twitch_username'].lower().lstrip('@') for sub in submissions if sub.get('twitch_username')}
+        unmapped = [sub['discord_username'] for sub in submissions if not sub.get('twitch_username')]
+        candidates = {name: candidate_logins(name) for name in dict.fromkeys(unmapped)}
+
+        # One pass over helix/users for mapped logins and every auto-match candidate
+        users = await user_cache.get_users(
+            list(mapped) + [login for logins in candidates.values() for login in logins], access_token, priority
+        )
+        matches = {name: _first_found(logins, users) for name, logins in candidates.items()}
+        # Subscriptions only for the users submissions end up with, not every candidate tried
+        chosen = [users[login] for login in mapped] + list(matches.values())
+        subs = await self.get_subscriptions(
+            [user['id'] for user in chosen if user], broadcaster_id, access_token, priority
+        )
+
+        annotated = []
+        for sub in submissions:
+            if sub.get('twitch_username'):
+                login = sub['twitch_username'].lower().lstrip('@')
+                user = users.get(login)
+                twitch = {
+                    'matched': True,
+                    'twitch_username': user['login'] if user else login,
+                    'subscription': subs[user['id']] if user else dict(NOT_FOUND)
+                }
+            else:
+                user = matches.get(sub['discord_username'])
+                twitch = {
+                    'matched': user is not None,
+                    'twitch_username': user['login'] if user else None,
+                    'subscription': subs[user['id']] if user else None
+                }
+            annotated.append({**sub, 'twitch': twitch})
+        self.annotated += len(annotated)
+        return annotated
+
+    def get_metrics(self) -> Dict:
+        return {
+            'subscription_requests': self.subscription_requests,
+            'subscriptions_checked': self.subscriptions_checked,
+            'submissions_annotated': self.annotated,
+            'users': user_cache.get_metrics()
+        }
+
+
+# Global instance
+bulk_lookup = BulkLookup()
@@ -4,6 +4,8 @@ from typing import Optional, Dict, List
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 from pathlib import Path
+from outbound_chat import OutboundChatQueue, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from rate_limit import SlidingWindowLimiter
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -32,6 +34,21 @@ class ChatBotService:
             '!commands': self._handle_commands_list,
             '!help': self._handle_help_command,
         }
+        
+        # Reply priority per command (mods/broadcaster always get PRIORITY_HIGH)
+        self.command_priorities = {
+            '!queue': PRIORITY_NORMAL,
+            '!task': PRIORITY_NORMAL,
+            '!grwm': PRIORITY_LOW,
+            '!commands': PRIORITY_LOW,
+            '!help': PRIORITY_LOW,
+        }
+        
+        # Twitch allows 20 messages per 30 seconds for regular accounts
+        self.outbound = OutboundChatQueue(
+            self._write_message,
+            SlidingWindowLimiter(int(os.getenv('TWITCH_CHAT_RATE_LIMIT', '20')), 30)
+        )
     
     def set_discord_manager(self, discord_manager):
         """Set reference to discord manager for queue data"""
@@ -153,16 +170,44 @@ class ChatBotService:
             logger.error(f"Error processing command: {e}")
             return None
     
-    async def send_message(self, message: str):
-        """Send a message to chat via IRC"""
+    def _reply_priority(self, command: str, message_data: Dict) -> int:
+        """Replies to moderators and the broadcaster jump the queue"""
+        badges = message_data.get('badges') or []
+        if 'moderator' in badges or 'broadcaster' in badges:
+            return PRIORITY_HIGH
+        return self.command_priorities.get(command, PRIORITY_NORMAL)
+    
+    async def handle_message(self, message_data: Dict):
+        """Process a chat message and queue the reply, if any"""
+        response = await self.process_message(message_data)
+        if response:
+            command = message_data.get('message', '').split(maxsplit=1)[0].lower()
+            await self.send_message(response, priority=self._reply_priority(command, message_data))
+    
+    async def send_message(self, message: str, priority: int = PRIORITY_NORMAL):
+        """Queue a message for chat (rate-limited, duplicates merged)"""
+        self.outbound.enqueue(message, priority)
+    
+    async def _write_message(self, message: str) -> bool:
+        """Write a message to chat via IRC"""
         if self.irc_chat and self.irc_chat.writer:
             try:
                 chat_message = f"PRIVMSG #{self.channel_name} :{message}\r\n"
                 self.irc_chat.writer.write(chat_message.encode('utf-8'))
                 await self.irc_chat.writer.drain()
                 logger.info(f"Bot sent message: {message}")
+                return True
             except Exception as e:
                 logger.error(f"Error sending bot message: {e}")
+        return False
+    
+    def get_metrics(self) -> Dict:
+        """Outbound chat queue metrics"""
+        return self.outbound.get_metrics()
+    
+    async def stop(self):
+        """Stop the outbound sender"""
+        await self.outbound.stop()
 
 
 # Global instance
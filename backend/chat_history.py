@@ -0,0 +1,121 @@
+import os
+from typing import Optional, Dict, List
+
+DEFAULT_CHAT_HISTORY_SIZE = int(os.getenv('CHAT_HISTORY_SIZE', '5000'))
+
+
+class ChatRecord:
+    """Compact in-memory chat message"""
+
+    __slots__ = ('seq', 'id', 'channel', 'username', 'message', 'timestamp',
+                 'badges', 'badge_info', 'color', 'emotes')
+
+    def __init__(self, seq: int, data: Dict):
+        self.seq = seq
+        self.id = data.get('id')
+        self.channel = data.get('channel')
+        self.username = data.get('username')
+        self.message = data.get('message')
+        self.timestamp = data.get('timestamp')
+        self.badges = data.get('badges') or []
+        self.badge_info = data.get('badge_info') or {}
+        self.color = data.get('color')
+        self.emotes = data.get('emotes') or []
+
+    def to_dict(self) -> Dict:
+        return {
+            'seq': self.seq,
+            'id': self.id,
+            'channel': self.channel,
+            'username': self.username,
+            'message': self.message,
+            'timestamp': self.timestamp,
+            'badges': self.badges,
+            'badge_info': self.badge_info,
+            'color': self.color,
+            'emotes': self.emotes
+        }
+
+
+class ChatHistory:
+    """Fixed-capacity ring buffer of chat messages.
+
+    Every appended message gets a monotonically increasing sequence number.
+    Because the buffer only ever holds a contiguous run of sequence numbers,
+    a cursor maps straight to a slot index, so "messages since X" costs
+    O(returned messages) rather than a scan of the whole history.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CHAT_HISTORY_SIZE):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._slots: List[Optional[ChatRecord]] = [None] * capacity
+        self._next_seq = 1
+        self._seq_by_id: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._next_seq - self.oldest_seq
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._seq_by_id
+
+    @property
+    def oldest_seq(self) -> int:
+        """Sequence number of the oldest retained message"""
+        return max(1, self._next_seq - self.capacity)
+
+    @property
+    def latest_seq(self) -> int:
+        """Sequence number of the newest message (0 when empty)"""
+        return self._next_seq - 1
+
+    def append(self, data: Dict) -> ChatRecord:
+        """Store a message, evicting the oldest one when full"""
+        seq = self._next_seq
+        record = ChatRecord(seq, data)
+        index = seq % self.capacity
+
+        evicted = self._slots[index]
+        if evicted is not None and self._seq_by_id.get(evicted.id) == evicted.seq:
+            del self._seq_by_id[evicted.id]
+
+        self._slots[index] = record
+        if record.id:
+            self._seq_by_id[record.id] = seq
+        self._next_seq = seq + 1
+        return record
+
+    def seq_for_id(self, message_id: str) -> Optional[int]:
+        """Sequence number of a retained message, by Twitch message ID"""
+        return self._seq_by_id.get(message_id)
+
+    def _range(self, start: int, end: int) -> List[ChatRecord]:
+        """Records with start <= seq < end, oldest first"""
+        slots = self._slots
+        capacity = self.capacity
+        return [slots[seq % capacity] for seq in range(start, end)]
+
+    def recent(self, limit: Optional[int] = None) -> List[ChatRecord]:
+        """Newest messages first"""
+        return self.since(0, limit)
+
+    def since(self, seq: int, limit: Optional[int] = None) -> List[ChatRecord]:
+        """Messages newer than the given sequence number, newest first.
+
+        When more than `limit` messages arrived after the cursor, only the
+        newest `limit` are returned.
+        """
+        start = max(seq + 1, self.oldest_seq)
+        if limit is not None:
+            start = max(start, self._next_seq - limit)
+        records = self._range(start, self._next_seq)
+        records.reverse()
+        return records
+
+    def since_id(self, message_id: str, limit: Optional[int] = None) -> Optional[List[ChatRecord]]:
+        """Messages newer than the given message ID (None if it is no longer retained)"""
+        seq = self._seq_by_id.get(message_id)
+        if seq is None:
+            return None
+        return self.since(seq, limit)
@@ -3,7 +3,7 @@ import discord
 import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import Optional, List, Dict
+from typing import Awaitable, Callable, Optional, List, Dict
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -35,10 +35,15 @@ class DiscordQueueManager:
         self.submissions = []
         self.skip_submissions = []
         self.username_mappings = {}  # {discord_username: twitch_username}
+        self.queue_callback: Optional[Callable[[str, Dict], Awaitable[None]]] = None
         
         # Setup event handlers
         self._setup_events()
         
+    def set_queue_callback(self, callback: Callable[[str, Dict], Awaitable[None]]):
+        """Register callback(event, submission) for submissions posted to Discord while running"""
+        self.queue_callback = callback
+        
     def _setup_events(self):
         @self.client.event
         async def on_ready():
@@ -119,6 +124,8 @@ class DiscordQueueManager:
                 self.submissions.append(submission)
                 if not is_historical:
                     logger.info(f'New submission from {message.author.name}: {links[0]}')
+                    if self.queue_callback:
+                        await self.queue_callback('submission_added', submission)
         
         except Exception as e:
             logger.error(f'Error handling submission: {e}')
@@ -149,6 +156,8 @@ class DiscordQueueManager:
                 self.skip_submissions.append(skip_submission)
                 if not is_historical:
                     logger.info(f'New skip submission from {message.author.name}')
+                    if self.queue_callback:
+                        await self.queue_callback('skip_added', skip_submission)
         
         except Exception as e:
             logger.error(f'Error handling skip submission: {e}')
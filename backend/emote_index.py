@@ -0,0 +1,82 @@
+import re
+from types import MappingProxyType
+from typing import Optional, Dict, List, Mapping
+
+# Whitespace-separated tokens, matched with their offsets in one scan
+_TOKEN = re.compile(r'\S+')
+
+
+class EmoteIndex:
+    """Immutable emote name -> emote ID lookup shared by the chat paths.
+
+    Built once per emote refresh (TwitchService.fetch_channel_emotes) and
+    swapped in as a whole, so readers never see a half-updated mapping.
+    """
+
+    __slots__ = ('_ids',)
+
+    def __init__(self, channel_emotes: Optional[Mapping[str, str]] = None,
+                 global_emotes: Optional[Mapping[str, str]] = None):
+        ids: Dict[str, str] = dict(global_emotes or {})
+        # Channel emotes win over global emotes with the same name
+        ids.update(channel_emotes or {})
+        self._ids = MappingProxyType(ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._ids
+
+    def get(self, token: str) -> Optional[str]:
+        return self._ids.get(token)
+
+    def detect(self, text: str, tag_emotes: Optional[str] = None) -> List[Dict]:
+        """Find emotes in a message.
+
+        Combines tokens matched against the index with the positions Twitch
+        sends in the IRC `emotes` tag (emote_id:start-end,start-end/...).
+        Occurrences are keyed by start offset, so merging is linear in the
+        number of emotes and the same emote is never reported twice.
+        Returns one entry per occurrence, ordered by position.
+        """
+        found: Dict[int, Dict] = {}
+
+        ids = self._ids
+        if ids:
+            for match in _TOKEN.finditer(text):
+                emote_id = ids.get(match.group())
+                if emote_id is not None:
+                    start = match.start()
+                    found[start] = {
+                        'id': emote_id,
+                        'name': match.group(),
+                        'positions': [[start, match.end() - 1]]
+                    }
+
+        if tag_emotes:
+            for emote_data in tag_emotes.split('/'):
+                emote_id, sep, positions_str = emote_data.partition(':')
+                if not sep:
+                    continue
+                for pos_str in positions_str.split(','):
+                    start_str, sep, end_str = pos_str.partition('-')
+                    if not sep or not start_str.isdigit() or not end_str.isdigit():
+                        continue
+                    start = int(start_str)
+                    if start in found:
+                        continue
+                    end = int(end_str)
+                    found[start] = {
+                        'id': emote_id,
+                        'name': text[start:end + 1],
+                        'positions': [[start, end]]
+                    }
+
+        if not found:
+            return []
+        return [found[start] for start in sorted(found)]
+
+
+# Shared empty index used before emotes have been fetched
+EMPTY_EMOTE_INDEX = EmoteIndex()
@@ -0,0 +1,284 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import importlib.util
+from typing import Dict, Optional
+import httpx
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+HELIX_HOST = 'api.twitch.tv'
+
+# Lower value = sent first; pass as extensions=BACKGROUND on polling calls
+PRIORITY_INTERACTIVE = 0   # dashboard actions a person is waiting on
+PRIORITY_BACKGROUND = 1    # polling and bulk lookups
+BACKGROUND = {'helix_priority': PRIORITY_BACKGROUND}
+
+# Twitch's default per-token bucket: 800 points, refilled continuously over a minute
+DEFAULT_BUCKET_LIMIT = 800
+BUCKET_REFILL_PERIOD = 60.0
+
+
+class HelixBucket:
+    """Local view of one token's Helix rate-limit bucket.
+
+    Seeded and corrected from the Ratelimit-Limit/-Remaining/-Reset headers
+    of every response; between responses each request spends a point up
+    front and points refill at limit per minute, as they do on Twitch's
+    side. Background requests leave `reserve_pct` of the bucket untouched
+    and yield to any waiting interactive request.
+    """
+
+    def __init__(self, limit: int = DEFAULT_BUCKET_LIMIT, reserve_pct: float = 10.0):
+        self.limit = limit
+        self.remaining = float(limit)
+        self.reset_at = 0.0  # wall-clock time Twitch says the bucket is full again
+        self.reserve_pct = reserve_pct
+        self.in_flight = 0
+        self.interactive_waiting = 0
+        self._refilled_at = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.limit / BUCKET_REFILL_PERIOD
+
+    def _refill(self):
+        now = time.monotonic()
+        self.remaining = min(float(self.limit), self.remaining + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        if self.reset_at and time.time() >= self.reset_at:
+            # Twitch said the bucket would be full by now
+            self.remaining = float(self.limit - self.in_flight)
+            self.reset_at = 0.0
+
+    def _reserve(self, priority: int) -> float:
+        return 0.0 if priority == PRIORITY_INTERACTIVE else self.limit * self.reserve_pct / 100
+
+    async def acquire(self, priority: int) -> float:
+        """Wait for a point; returns seconds spent waiting"""
+        waited = 0.0
+        while True:
+            self._refill()
+            reserve = self._reserve(priority)
+            can_go = self.remaining >= reserve + 1
+            if can_go and (priority == PRIORITY_INTERACTIVE or not self.interactive_waiting):
+                self.remaining -= 1
+                self.in_flight += 1
+                return waited
+            # Pace: sleep until the next point (above the reserve) should be back
+            delay = max((reserve + 1 - self.remaining) / self.rate, 0.01)
+            if priority == PRIORITY_INTERACTIVE:
+                self.interactive_waiting += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                if priority == PRIORITY_INTERACTIVE:
+                    self.interactive_waiting -= 1
+            waited += delay
+
+    def release(self, headers: Optional[httpx.Headers]):
+        """Request finished; adopt the server's numbers when it sent them"""
+        self.in_flight -= 1
+        if headers is None:
+            return
+        try:
+            limit = headers.get('ratelimit-limit')
+            remaining = headers.get('ratelimit-remaining')
+            reset = headers.get('ratelimit-reset')
+            if limit is not None:
+                self.limit = int(limit)
+            if remaining is not None:
+                self._refill()
+                # Requests still in flight have spent points the server hasn't counted yet
+                self.remaining = max(0.0, float(remaining) - self.in_flight)
+            if reset is not None:
+                self.reset_at = float(reset)
+        except ValueError:
+            pass
+
+    def exhausted(self):
+        """A 429 means the bucket is empty whatever we thought"""
+        self._refill()
+        self.remaining = 0.0
+
+    def reset_delay(self) -> float:
+        return max(0.0, self.reset_at - time.time())
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """Paces api.twitch.tv requests per token and retries 429s after the bucket resets.
+
+    Requests wait in their token's HelixBucket before going out, so bursts
+    turn into short delays instead of 429s. A 429 that still happens (other
+    apps sharing the token, a stale estimate) is retried once the reset time
+    from its headers has passed, up to max_retries times and as long as the
+    total wait stays within max_retry_wait. Interactive requests get only
+    interactive_retry_wait: a moderator clicking ban would rather see the 429
+    than a spinner for a minute.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_retries: int = 2,
+                 max_retry_wait: float = 60.0, reserve_pct: float = 10.0,
+                 interactive_retry_wait: float = 3.0):
+        self.transport = transport
+        self.max_retries = max_retries
+        self.max_retry_wait = max_retry_wait
+        self.interactive_retry_wait = interactive_retry_wait
+        self.reserve_pct = reserve_pct
+        self.buckets: Dict[str, HelixBucket] = {}
+
+        # Metrics
+        self.requests = 0
+        self.delayed = 0
+        self.total_delay = 0.0
+        self.max_delay = 0.0
+        self.rate_limited = 0
+        self.retries = 0
+
+    def _bucket(self, request: httpx.Request) -> HelixBucket:
+        # Buckets are per token; key on a digest so tokens don't sit around in plain text
+        authorization = request.headers.get('authorization', '')
+        key = hashlib.sha256(authorization.encode()).hexdigest()[:16]
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = HelixBucket(reserve_pct=self.reserve_pct)
+        return bucket
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host != HELIX_HOST:
+            return await self.transport.handle_async_request(request)
+
+        bucket = self._bucket(request)
+        priority = request.extensions.get('helix_priority', PRIORITY_INTERACTIVE)
+        self.requests += 1
+        retry_budget = self.interactive_retry_wait if priority == PRIORITY_INTERACTIVE else self.max_retry_wait
+        attempt = 0
+        while True:
+            waited = await bucket.acquire(priority)
+            if waited:
+                self.delayed += 1
+                self.total_delay += waited
+                self.max_delay = max(self.max_delay, waited)
+            try:
+                response = await self.transport.handle_async_request(request)
+            except BaseException:
+                bucket.release(None)
+                raise
+            bucket.release(response.headers)
+
+            if response.status_code != 429:
+                return response
+            self.rate_limited += 1
+            bucket.exhausted()
+            delay = bucket.reset_delay()
+            if attempt >= self.max_retries or delay > retry_budget:
+                return response
+            await response.aclose()
+            retry_budget -= delay
+            attempt += 1
+            self.retries += 1
+            logger.warning(f"Helix rate limited on {request.method} {request.url.path}; "
+                           f"retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def get_metrics(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'delayed': self.delayed,
+            'avg_delay_ms': round(self.total_delay / self.delayed * 1000, 1) if self.delayed else 0.0,
+            'max_delay_ms': round(self.max_delay * 1000, 1),
+            'rate_limited': self.rate_limited,
+            'retries': self.retries,
+            'buckets': [
+                {
+                    'limit': bucket.limit,
+                    'remaining': int(bucket.remaining),
+                    'reset_in': round(bucket.reset_delay(), 1),
+                    'in_flight': bucket.in_flight
+                }
+                for bucket in self.buckets.values()
+            ]
+        }
+
+
+class HelixClient:
+    """One pooled HTTP client for api.twitch.tv and id.twitch.tv, shared for the app's lifetime.
+
+    Opening an httpx.AsyncClient per request pays a TCP and TLS handshake
+    every time; this keeps connections alive between dashboard actions so
+    a call costs one round trip. The client is created on first use and
+    closed at shutdown (after which the next use opens a fresh one).
+    Helix requests go through a RateLimitedTransport.
+    """
+
+    def __init__(self, client_id: Optional[str] = None, timeout: float = 10.0, connect_timeout: float = 5.0,
+                 max_connections: int = 20, max_keepalive: int = 10, keepalive_expiry: float = 60.0,
+                 http2: bool = False, max_retries: int = 2, max_retry_wait: float = 60.0,
+                 reserve_pct: float = 10.0, interactive_retry_wait: float = 3.0):
+        self.client_id = client_id
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        if http2 and importlib.util.find_spec('h2') is None:
+            logger.warning("HELIX_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.max_retries = max_retries
+        self.max_retry_wait = max_retry_wait
+        self.reserve_pct = reserve_pct
+        self.interactive_retry_wait = interactive_retry_wait
+        self.scheduler: Optional[RateLimitedTransport] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            headers = {'Client-ID': self.client_id} if self.client_id else None
+            self.scheduler = RateLimitedTransport(
+                httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2),
+                max_retries=self.max_retries,
+                max_retry_wait=self.max_retry_wait,
+                reserve_pct=self.reserve_pct,
+                interactive_retry_wait=self.interactive_retry_wait
+            )
+            self._client = httpx.AsyncClient(
+                headers=headers,
+                timeout=self.timeout,
+                transport=self.scheduler
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_metrics(self) -> Dict:
+        return self.scheduler.get_metrics() if self.scheduler else {'requests': 0, 'buckets': []}
+
+
+helix = HelixClient(
+    client_id=os.getenv('TWITCH_CLIENT_ID'),
+    timeout=float(os.getenv('HELIX_TIMEOUT', '10')),
+    connect_timeout=float(os.getenv('HELIX_CONNECT_TIMEOUT', '5')),
+    max_connections=int(os.getenv('HELIX_MAX_CONNECTIONS', '20')),
+    max_keepalive=int(os.getenv('HELIX_MAX_KEEPALIVE', '10')),
+    keepalive_expiry=float(os.getenv('HELIX_KEEPALIVE_EXPIRY', '60')),
+    http2=os.getenv('HELIX_HTTP2', 'false').lower() == 'true',
+    max_retries=int(os.getenv('HELIX_MAX_RETRIES', '2')),
+    max_retry_wait=float(os.getenv('HELIX_MAX_RETRY_WAIT', '60')),
+    reserve_pct=float(os.getenv('HELIX_BACKGROUND_RESERVE_PCT', '10')),
+    interactive_retry_wait=float(os.getenv('HELIX_INTERACTIVE_RETRY_WAIT', '3'))
+)
@@ -1,11 +1,18 @@
 import os
 import asyncio
 import logging
-import re
-from typing import Optional, Callable, Dict
+import random
+import time
+from typing import Optional, Callable, Dict, List, Tuple
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 from pathlib import Path
+from irc_parser import IRCMessage, parse_irc_line
+from emote_index import EMPTY_EMOTE_INDEX
+from chat_history import ChatHistory
+from message_pipeline import MessagePipeline
+from rate_limit import SlidingWindowLimiter
+from user_cache import user_cache
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -13,22 +20,65 @@ load_dotenv(ROOT_DIR / '.env')
 
 logger = logging.getLogger(__name__)
 
+# Twitch allows 20 JOINs per 10 seconds per account; shared by every connection
+join_rate_limiter = SlidingWindowLimiter(int(os.getenv('TWITCH_JOIN_RATE_LIMIT', '20')), 10)
+
 class TwitchIRCChat:
-    def __init__(self):
-        self.channel_name = os.getenv('TWITCH_CHANNEL_NAME', '').lower()
+    def __init__(self, channels: Optional[List[str]] = None,
+                 join_limiter: Optional[SlidingWindowLimiter] = None):
+        self.nickname = os.getenv('TWITCH_CHANNEL_NAME', '').lower()  # Use channel name as bot nickname
+        if channels is None:
+            channels = [self.nickname]
+        self.channels: List[str] = [channel.lower().lstrip('#') for channel in channels]
+        self.channel_name = self.channels[0] if self.channels else ''
+        self.join_limiter = join_limiter or join_rate_limiter
         self.server = 'irc.chat.twitch.tv'
         self.port = 6667
-        self.nickname = self.channel_name  # Use channel name as bot nickname
         self.oauth_token = None  # Will be set from oauth service
         self.reader: Optional[asyncio.StreamReader] = None
         self.writer: Optional[asyncio.StreamWriter] = None
         self.running = False
         self.message_callback: Optional[Callable] = None
-        self.recent_messages = []
-        self.max_messages = 50
+        self.histories: Dict[str, ChatHistory] = {channel: ChatHistory() for channel in self.channels}
+        # Decouples socket reads from callback work (broadcast, bot commands)
+        self.pipeline = MessagePipeline(
+            self._dispatch_message,
+            maxsize=int(os.getenv('IRC_QUEUE_SIZE', '1000')),
+            policy=os.getenv('IRC_QUEUE_POLICY', 'drop_oldest'),
+            consumers=int(os.getenv('IRC_QUEUE_CONSUMERS', '1')),
+            name='irc-chat'
+        )
         self.emote_service = None  # Will be set from server.py
         self.authenticated = False
         
+        # Connection supervision
+        self.connect_timeout = 10
+        self.keepalive_interval = 60  # send our own PING after this much silence
+        self.pong_timeout = 10  # connection is dead if nothing arrives after our PING
+        self.base_backoff = 1.0
+        self.max_backoff = 60.0
+        self.stable_after = 30  # connections shorter than this count as failed attempts
+        self._supervisor_task: Optional[asyncio.Task] = None
+        self._handoff_task: Optional[asyncio.Task] = None
+        self._connected_at = 0.0
+        self._down_since: Optional[float] = None
+        self.connection_stats = {
+            'connects': 0,
+            'reconnects': 0,
+            'handoffs': 0,
+            'failed_attempts': 0,
+            'connected_since': None,
+            'last_disconnect_reason': None,
+            'last_recovery_seconds': None,
+            'max_recovery_seconds': 0.0,
+            'last_handoff_seconds': None
+        }
+        
+    @property
+    def history(self) -> ChatHistory:
+        """History of the primary (first) channel"""
+        return self.histories[self.channel_name]
+    
     def set_message_callback(self, callback: Callable):
         """Register callback for new messages"""
         self.message_callback = callback
@@ -42,122 +92,312 @@ class TwitchIRCChat:
         self.oauth_token = token
         self.authenticated = True
     
-    async def connect(self):
-        """Connect to Twitch IRC server"""
+    async def start(self):
+        """Start the connection supervisor (keeps chat connected until disconnect())"""
+        if self._supervisor_task and not self._supervisor_task.done():
+            return
+        self.running = True
+        self.pipeline.start()
+        self._supervisor_task = asyncio.create_task(self._supervise(), name='irc-supervisor')
+    
+    async def _open_connection(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, List[str]]:
+        """Open, authenticate and join; returns once Twitch confirms the JOIN, with the channels joined"""
+        logger.info(f"Connecting to Twitch IRC for channels: {', '.join(self.channels) or '(none)'}")
+        
+        # Connect to IRC server
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.server, self.port),
+            timeout=self.connect_timeout
+        )
+        
         try:
-            logger.info(f"Connecting to Twitch IRC for channel: {self.channel_name}")
-            
-            # Connect to IRC server
-            self.reader, self.writer = await asyncio.open_connection(
-                self.server, self.port
-            )
-            
             # Send authentication
             if self.authenticated and self.oauth_token:
                 # Authenticated connection (can send messages)
-                self.writer.write(f"PASS oauth:{self.oauth_token}\r\n".encode('utf-8'))
-                self.writer.write(f"NICK {self.nickname}\r\n".encode('utf-8'))
+                writer.write(f"PASS oauth:{self.oauth_token}\r\n".encode('utf-8'))
+                writer.write(f"NICK {self.nickname}\r\n".encode('utf-8'))
                 logger.info(f"Using authenticated IRC connection as {self.nickname}")
             else:
                 # Anonymous connection (read-only)
-                self.writer.write(f"NICK justinfan12345\r\n".encode('utf-8'))
+                writer.write(f"NICK justinfan12345\r\n".encode('utf-8'))
                 logger.info("Using anonymous IRC connection (read-only)")
             
-            self.writer.write(f"CAP REQ :twitch.tv/tags twitch.tv/commands\r\n".encode('utf-8'))
-            self.writer.write(f"JOIN #{self.channel_name}\r\n".encode('utf-8'))
-            await self.writer.drain()
+            writer.write(f"CAP REQ :twitch.tv/tags twitch.tv/commands\r\n".encode('utf-8'))
+            await writer.drain()
+            joined = list(self.channels)
+            await self._send_joins(writer, joined)
+            
+            # Wait for the first JOIN echo so a replacement connection is live before it is used
+            deadline = time.monotonic() + self.connect_timeout
+            while joined:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError("Timed out waiting for JOIN confirmation")
+                line = await asyncio.wait_for(reader.readline(), timeout=remaining)
+                if not line:
+                    raise ConnectionError("Connection closed during login")
+                msg = parse_irc_line(line.decode('utf-8', errors='ignore').strip())
+                if not msg:
+                    continue
+                if msg.command == 'JOIN':
+                    break
+                if msg.command == 'PING':
+                    writer.write(f"PONG :{msg.trailing or 'tmi.twitch.tv'}\r\n".encode('utf-8'))
+                    await writer.drain()
+                elif msg.command == 'NOTICE' and msg.trailing and 'authentication' in msg.trailing.lower():
+                    raise ConnectionError(f"IRC login failed: {msg.trailing}")
+        except BaseException:
+            writer.close()
+            raise
+        
+        logger.info(f"Connected to IRC chat: {', '.join('#' + channel for channel in joined)}")
+        return reader, writer, joined
+    
+    async def _send_joins(self, writer: asyncio.StreamWriter, channels: List[str]):
+        """JOIN channels, paced by the shared JOIN rate limiter"""
+        for channel in channels:
+            await self.join_limiter.acquire()
+            writer.write(f"JOIN #{channel}\r\n".encode('utf-8'))
+            await writer.drain()
+    
+    async def _sync_joins(self, joined: List[str]):
+        """Catch a newly installed connection up with joins and parts made while it was logging in"""
+        writer = self.writer
+        try:
+            await self._send_joins(writer, [channel for channel in self.channels if channel not in joined])
+            for channel in joined:
+                if channel not in self.histories:
+                    writer.write(f"PART #{channel}\r\n".encode('utf-8'))
+            await writer.drain()
+        except Exception as e:
+            logger.error(f"Error syncing IRC channels after connecting: {e}")
+    
+    async def join(self, channel: str):
+        """Start following another channel on this connection"""
+        channel = channel.lower().lstrip('#')
+        if channel in self.histories:
+            return
+        self.channels.append(channel)
+        self.histories[channel] = ChatHistory()
+        if not self.channel_name:
+            self.channel_name = channel
+        if self.writer:
+            await self._send_joins(self.writer, [channel])
+    
+    async def part(self, channel: str):
+        """Stop following a channel on this connection"""
+        channel = channel.lower().lstrip('#')
+        if channel not in self.histories:
+            return
+        self.channels.remove(channel)
+        del self.histories[channel]
+        if self.channel_name == channel:
+            self.channel_name = self.channels[0] if self.channels else ''
+        if self.writer:
+            try:
+                self.writer.write(f"PART #{channel}\r\n".encode('utf-8'))
+                await self.writer.drain()
+            except Exception as e:
+                logger.error(f"Error leaving #{channel}: {e}")
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter (half fixed, half random)"""
+        delay = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    async def _supervise(self):
+        """Keep one live connection, reconnecting with backoff when it drops"""
+        attempt = 0
+        while self.running:
+            if self.writer is None:
+                try:
+                    self.reader, self.writer, joined = await self._open_connection()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.connection_stats['failed_attempts'] += 1
+                    delay = self._backoff_delay(attempt)
+                    attempt += 1
+                    logger.error(f"Failed to connect to IRC: {e}. Retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                self._mark_connected()
+                await self._sync_joins(joined)
+            
+            reader, writer = self.reader, self.writer
+            reason = await self._read_messages(reader, writer)
             
-            self.running = True
-            logger.info(f"Connected to #{self.channel_name} IRC chat")
+            # A RECONNECT handoff may still be installing the replacement connection
+            if self._handoff_task and not self._handoff_task.done():
+                await asyncio.wait({self._handoff_task})
+            if self.reader is not reader:
+                continue
             
-            # Start reading messages
-            await self._read_messages()
+            # Dropped without a replacement: reconnect
+            uptime = time.monotonic() - self._connected_at
+            self._mark_down(reason)
+            await self._close_writer(writer)
+            self.reader = self.writer = None
             
+            if not self.running:
+                break
+            if uptime < self.stable_after:
+                # Flapping connection: back off instead of hammering Twitch
+                delay = self._backoff_delay(attempt)
+                attempt += 1
+                logger.warning(f"IRC connection dropped after {uptime:.0f}s ({reason}). Reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            else:
+                attempt = 0
+                logger.warning(f"IRC connection dropped ({reason}). Reconnecting now")
+    
+    async def _handoff(self, old_writer: asyncio.StreamWriter):
+        """Handle a Twitch RECONNECT: join on a new socket, then drop the old one"""
+        started = time.monotonic()
+        try:
+            new_reader, new_writer, joined = await self._open_connection()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"IRC reconnect handoff failed: {e}")
+            return
+        
+        if not self.running or self.writer is not old_writer:
+            await self._close_writer(new_writer)
+            return
+        
+        self.reader, self.writer = new_reader, new_writer
+        self._connected_at = time.monotonic()
+        self.connection_stats['handoffs'] += 1
+        self.connection_stats['last_handoff_seconds'] = round(self._connected_at - started, 3)
+        logger.info(f"IRC RECONNECT handoff completed in {self._connected_at - started:.2f}s")
+        
+        # Closing the old socket ends its read loop
+        await self._close_writer(old_writer)
+        await self._sync_joins(joined)
+    
+    def _mark_connected(self):
+        now = time.monotonic()
+        self._connected_at = now
+        self.connection_stats['connects'] += 1
+        self.connection_stats['connected_since'] = datetime.now(timezone.utc).isoformat()
+        if self._down_since is not None:
+            recovery = now - self._down_since
+            self.connection_stats['reconnects'] += 1
+            self.connection_stats['last_recovery_seconds'] = round(recovery, 3)
+            self.connection_stats['max_recovery_seconds'] = round(
+                max(self.connection_stats['max_recovery_seconds'], recovery), 3
+            )
+            self._down_since = None
+            logger.info(f"IRC chat recovered in {recovery:.2f}s")
+    
+    def _mark_down(self, reason: str):
+        if self._down_since is None:
+            self._down_since = time.monotonic()
+        self.connection_stats['connected_since'] = None
+        self.connection_stats['last_disconnect_reason'] = reason
+    
+    async def _close_writer(self, writer: Optional[asyncio.StreamWriter]):
+        if not writer:
+            return
+        try:
+            writer.close()
+            await writer.wait_closed()
         except Exception as e:
-            logger.error(f"Failed to connect to IRC: {e}")
-            self.running = False
+            logger.debug(f"Error closing IRC socket: {e}")
     
-    async def _read_messages(self):
-        """Read and process IRC messages"""
+    async def _read_messages(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> str:
+        """Read and process IRC messages until the connection ends; returns the reason"""
+        awaiting_pong = False
         while self.running:
             try:
-                if not self.reader:
-                    break
-                    
                 line = await asyncio.wait_for(
-                    self.reader.readline(),
-                    timeout=300  # 5 minute timeout
+                    reader.readline(),
+                    timeout=self.pong_timeout if awaiting_pong else self.keepalive_interval
                 )
                 
                 if not line:
-                    logger.warning("IRC connection closed")
-                    break
+                    return 'closed'
+                awaiting_pong = False
                 
                 message = line.decode('utf-8', errors='ignore').strip()
+                msg = parse_irc_line(message)
+                if not msg:
+                    continue
                 
                 # Handle PING to keep connection alive
-                if message.startswith('PING'):
-                    pong = message.replace('PING', 'PONG')
-                    self.writer.write(f"{pong}\r\n".encode('utf-8'))
-                    await self.writer.drain()
+                if msg.command == 'PING':
+                    writer.write(f"PONG :{msg.trailing or 'tmi.twitch.tv'}\r\n".encode('utf-8'))
+                    await writer.drain()
                     continue
                 
                 # Parse chat messages
-                if 'PRIVMSG' in message:
-                    parsed = self._parse_message(message)
-                    if parsed:
+                if msg.command == 'PRIVMSG':
+                    history = self.histories.get(msg.channel)
+                    if history is None:
+                        # Late message from a channel we already left
+                        continue
+                    parsed = self._build_chat_message(msg)
+                    # Skip duplicates delivered on both sockets during a handoff
+                    if parsed and parsed['id'] not in history:
                         # Store message
-                        self.recent_messages.insert(0, parsed)
-                        if len(self.recent_messages) > self.max_messages:
-                            self.recent_messages.pop()
+                        parsed['seq'] = history.append(parsed).seq
                         
-                        # Call callback
-                        if self.message_callback:
-                            await self.message_callback(parsed)
+                        # Hand off to the consumer tasks
+                        await self.pipeline.put(parsed)
+                
+                elif msg.command == 'RECONNECT':
+                    logger.info("Twitch requested RECONNECT; starting handoff")
+                    if not self._handoff_task or self._handoff_task.done():
+                        self._handoff_task = asyncio.create_task(self._handoff(writer), name='irc-handoff')
                 
             except asyncio.TimeoutError:
-                # Send PING to keep connection alive
-                if self.writer:
-                    self.writer.write(b"PING :keepalive\r\n")
-                    await self.writer.drain()
-                continue
+                if awaiting_pong:
+                    return 'ping timeout'
+                # Send PING to check the connection is still alive
+                writer.write(b"PING :keepalive\r\n")
+                await writer.drain()
+                awaiting_pong = True
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"Error reading IRC message: {e}")
-                break
+                return f"error: {e}"
         
-        await self.disconnect()
+        return 'stopped'
+    
+    async def _dispatch_message(self, parsed: dict):
+        """Pipeline consumer: run the registered callback"""
+        if self.message_callback:
+            await self.message_callback(parsed)
     
     def _parse_message(self, raw_message: str) -> Optional[dict]:
-        """Parse IRC message into structured format"""
+        """Parse a raw IRC line into structured format (PRIVMSG only)"""
+        msg = parse_irc_line(raw_message)
+        if not msg or msg.command != 'PRIVMSG':
+            return None
+        return self._build_chat_message(msg)
+    
+    def _build_chat_message(self, msg: IRCMessage) -> Optional[dict]:
+        """Build a chat message dict from a tokenized PRIVMSG"""
         try:
-            # Extract tags
-            tags = {}
-            if raw_message.startswith('@'):
-                tag_section = raw_message.split(' ', 1)[0][1:]
-                for tag in tag_section.split(';'):
-                    if '=' in tag:
-                        key, value = tag.split('=', 1)
-                        tags[key] = value
-            
-            # Extract username and message
-            # Format: :username!username@username.tmi.twitch.tv PRIVMSG #channel :message
-            username_match = re.search(r':(\w+)!', raw_message)
-            message_match = re.search(r'PRIVMSG #\w+ :(.+)$', raw_message)
+            tags = msg.tags
+            username = msg.nick
+            message_text = msg.trailing
             
-            if not username_match or not message_match:
+            if not username or message_text is None:
                 return None
             
-            username = username_match.group(1)
-            message_text = message_match.group(1)
+            # Chatters are the usual targets of mod actions; remember their user IDs
+            user_cache.put(tags.get('user-id'), username, tags.get('display-name'))
             
             # Extract badges and tiers
             badges = []
             badge_info = {}
-            if 'badges' in tags and tags['badges']:
-                badge_list = tags['badges'].split(',')
-                for badge in badge_list:
-                    if '/' in badge:
-                        badge_name, badge_version = badge.split('/', 1)
+            if tags.get('badges'):
+                for badge in tags['badges'].split(','):
+                    badge_name, sep, badge_version = badge.partition('/')
+                    if sep:
                         badges.append(badge_name)
                         badge_info[badge_name] = badge_version
             
@@ -166,69 +406,18 @@ class TwitchIRCChat:
             if not color:
                 color = '#9147FF'
             
-            # Parse emotes from message text
-            emotes_list = []
-            if self.emote_service:
-                emote_data = self.emote_service.get_emotes()
-                channel_emotes = emote_data.get('channel_emotes', {})
-                global_emotes = emote_data.get('global_emotes', {})
-                
-                # Split message into words and check each against emote cache
-                words = message_text.split()
-                current_pos = 0
-                
-                for word in words:
-                    # Find position of this word in the original text
-                    word_start = message_text.find(word, current_pos)
-                    if word_start == -1:
-                        continue
-                    word_end = word_start + len(word) - 1
-                    
-                    # Check if word is a channel emote
-                    if word in channel_emotes:
-                        emotes_list.append({
-                            'id': channel_emotes[word],
-                            'name': word,
-                            'positions': [[word_start, word_end]]
-                        })
-                    # Check if word is a global emote
-                    elif word in global_emotes:
-                        emotes_list.append({
-                            'id': global_emotes[word],
-                            'name': word,
-                            'positions': [[word_start, word_end]]
-                        })
-                    
-                    current_pos = word_end + 1
+            # Detect emotes from the shared index plus IRC tag positions
+            emote_index = self.emote_service.emote_index if self.emote_service else EMPTY_EMOTE_INDEX
+            emotes_list = emote_index.detect(message_text, tags.get('emotes'))
             
-            # Also check IRC tags for emote data
-            if 'emotes' in tags and tags['emotes']:
-                raw_emotes = tags['emotes']
-                # Parse emotes from IRC tags format: emote_id:start-end,start-end/emote_id:start-end
-                for emote_data in raw_emotes.split('/'):
-                    if ':' in emote_data:
-                        emote_id, positions_str = emote_data.split(':', 1)
-                        positions = []
-                        for pos_str in positions_str.split(','):
-                            if '-' in pos_str:
-                                start, end = pos_str.split('-')
-                                positions.append([int(start), int(end)])
-                        
-                        if positions:
-                            # Check if we already have this emote
-                            already_exists = any(e['id'] == emote_id for e in emotes_list)
-                            if not already_exists:
-                                emotes_list.append({
-                                    'id': emote_id,
-                                    'name': '',
-                                    'positions': positions
-                                })
+            sent_at = self._sent_at(tags)
             
             return {
-                'id': tags.get('id', f"{username}_{datetime.now().timestamp()}"),
+                'id': tags.get('id') or f"{username}_{sent_at.timestamp()}",
+                'channel': msg.channel,
                 'username': username,
                 'message': message_text,
-                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'timestamp': sent_at.isoformat(),
                 'badges': badges,
                 'badge_info': badge_info,
                 'color': color,
@@ -239,19 +428,56 @@ class TwitchIRCChat:
             logger.error(f"Error parsing IRC message: {e}")
             return None
     
-    def get_recent_messages(self):
-        """Get recent chat messages"""
-        return self.recent_messages.copy()
+    @staticmethod
+    def _sent_at(tags: Dict[str, str]) -> datetime:
+        """Server-side send time from the tmi-sent-ts tag (falls back to now)"""
+        sent_ts = tags.get('tmi-sent-ts')
+        if sent_ts and sent_ts.isdigit():
+            return datetime.fromtimestamp(int(sent_ts) / 1000, timezone.utc)
+        return datetime.now(timezone.utc)
+    
+    def get_recent_messages(self, limit: int = 50, since: Optional[int] = None,
+                            since_id: Optional[str] = None, channel: Optional[str] = None) -> List[Dict]:
+        """Get recent chat messages (newest first), optionally only those after a cursor"""
+        history = self.histories.get(channel.lower().lstrip('#')) if channel else self.history
+        if history is None:
+            return []
+        if since_id is not None:
+            records = history.since_id(since_id, limit)
+            if records is None:
+                records = history.recent(limit)
+        elif since is not None:
+            records = history.since(since, limit)
+        else:
+            records = history.recent(limit)
+        return [record.to_dict() for record in records]
+    
+    def get_metrics(self) -> Dict:
+        """Connection and chat pipeline metrics"""
+        return {
+            'connected': self.writer is not None,
+            'channel': self.channel_name,
+            'channels': list(self.channels),
+            'history_size': sum(len(history) for history in self.histories.values()),
+            'connection': dict(self.connection_stats),
+            'pipeline': self.pipeline.get_metrics()
+        }
     
     async def disconnect(self):
-        """Disconnect from IRC"""
+        """Disconnect from IRC and stop reconnecting"""
         self.running = False
-        if self.writer:
-            try:
-                self.writer.close()
-                await self.writer.wait_closed()
-            except Exception as e:
-                logger.error(f"Error closing IRC connection: {e}")
+        for task in (self._handoff_task, self._supervisor_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                except Exception as e:
+                    logger.error(f"Error stopping IRC task: {e}")
+        await self.pipeline.stop()
+        await self._close_writer(self.writer)
+        self.reader = self.writer = None
         logger.info("Disconnected from Twitch IRC")
 
 # Global instance
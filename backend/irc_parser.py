@@ -0,0 +1,123 @@
+from typing import Optional, Dict, List
+
+# IRCv3 tag value escapes (https://ircv3.net/specs/extensions/message-tags)
+_TAG_ESCAPES = {
+    ':': ';',
+    's': ' ',
+    '\\': '\\',
+    'r': '\r',
+    'n': '\n',
+}
+
+
+class IRCMessage:
+    """A single tokenized IRC line"""
+
+    __slots__ = ('tags', 'prefix', 'command', 'params', 'trailing')
+
+    def __init__(self, tags: Dict[str, str], prefix: str, command: str,
+                 params: List[str], trailing: Optional[str]):
+        self.tags = tags
+        self.prefix = prefix
+        self.command = command
+        self.params = params
+        self.trailing = trailing
+
+    @property
+    def nick(self) -> str:
+        """Nickname part of the prefix (nick!user@host)"""
+        bang = self.prefix.find('!')
+        return self.prefix[:bang] if bang != -1 else self.prefix
+
+    @property
+    def channel(self) -> str:
+        """First parameter without the leading '#' (empty if not a channel)"""
+        if self.params and self.params[0].startswith('#'):
+            return self.params[0][1:]
+        return ''
+
+
+def unescape_tag_value(value: str) -> str:
+    """Unescape an IRCv3 tag value"""
+    if '\\' not in value:
+        return value
+
+    out = []
+    i = 0
+    length = len(value)
+    while i < length:
+        backslash = value.find('\\', i)
+        if backslash == -1:
+            out.append(value[i:])
+            break
+        out.append(value[i:backslash])
+        if backslash + 1 < length:
+            escaped = value[backslash + 1]
+            out.append(_TAG_ESCAPES.get(escaped, escaped))
+        # A trailing lone backslash is dropped
+        i = backslash + 2
+    return ''.join(out)
+
+
+def parse_tags(tag_section: str) -> Dict[str, str]:
+    """Parse the tag section of a line (without the leading '@')"""
+    tags = {}
+    for tag in tag_section.split(';'):
+        key, _, value = tag.partition('=')
+        tags[key] = value
+    # Escapes are rare, so only pay for unescaping when the section has any
+    if '\\' in tag_section:
+        for key, value in tags.items():
+            if '\\' in value:
+                tags[key] = unescape_tag_value(value)
+    return tags
+
+
+def parse_irc_line(line: str) -> Optional[IRCMessage]:
+    """Tokenize one IRC line into tags, prefix, command, params and trailing text.
+
+    Walks the line once, left to right, using str.find to jump between
+    separators instead of running regular expressions over the whole line.
+    """
+    if not line:
+        return None
+
+    pos = 0
+    length = len(line)
+
+    tags: Dict[str, str] = {}
+    if line[0] == '@':
+        space = line.find(' ', 1)
+        if space == -1:
+            return None
+        tags = parse_tags(line[1:space])
+        pos = space + 1
+        while pos < length and line[pos] == ' ':
+            pos += 1
+
+    prefix = ''
+    if pos < length and line[pos] == ':':
+        space = line.find(' ', pos)
+        if space == -1:
+            return None
+        prefix = line[pos + 1:space]
+        pos = space + 1
+        while pos < length and line[pos] == ' ':
+            pos += 1
+
+    # Split off the trailing parameter before the middle params
+    trailing = None
+    trailing_start = line.find(' :', pos)
+    if trailing_start != -1:
+        trailing = line[trailing_start + 2:]
+        middle = line[pos:trailing_start]
+    elif pos < length and line[pos] == ':':
+        return None
+    else:
+        middle = line[pos:]
+
+    parts = middle.split()
+    if not parts:
+        return None
+
+    return IRCMessage(tags, prefix, parts[0].upper(), parts[1:], trailing)
@@ -0,0 +1,171 @@
+import os
+import asyncio
+import logging
+from typing import Optional, Callable, Dict, List
+from dotenv import load_dotenv
+from pathlib import Path
+from irc_chat_service import TwitchIRCChat, join_rate_limiter
+from rate_limit import SlidingWindowLimiter
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+
+class IRCConnectionPool:
+    """Follow many channels from one process by sharding them across a few IRC sockets.
+
+    Each shard is a supervised TwitchIRCChat connection. JOINs from every
+    shard go through one shared rate limiter, and parsed messages are routed
+    to per-channel histories and callbacks.
+    """
+
+    def __init__(self, channels_per_connection: int = 20, max_connections: int = 5,
+                 join_limiter: Optional[SlidingWindowLimiter] = None):
+        self.channels_per_connection = channels_per_connection
+        self.max_connections = max_connections
+        self.join_limiter = join_limiter or join_rate_limiter
+        self.shards: List[TwitchIRCChat] = []
+        self._shard_for: Dict[str, TwitchIRCChat] = {}
+        self._callbacks: Dict[str, List[Callable]] = {}
+        self.message_callback: Optional[Callable] = None
+        self.emote_service = None
+        self._lock = asyncio.Lock()
+
+    def set_message_callback(self, callback: Callable):
+        """Register callback for messages from every pooled channel"""
+        self.message_callback = callback
+
+    def set_emote_service(self, emote_service):
+        """Set reference to twitch_service for emote data"""
+        self.emote_service = emote_service
+        for shard in self.shards:
+            shard.set_emote_service(emote_service)
+
+    @staticmethod
+    def _normalize(channel: str) -> str:
+        return channel.strip().lower().lstrip('#')
+
+    def _pick_shard(self) -> Optional[TwitchIRCChat]:
+        """Least-loaded shard with room for another channel"""
+        open_shards = [shard for shard in self.shards if len(shard.channels) < self.channels_per_connection]
+        if not open_shards:
+            return None
+        return min(open_shards, key=lambda shard: len(shard.channels))
+
+    async def add_channel(self, channel: str, callback: Optional[Callable] = None) -> bool:
+        """Join a channel (no-op if already joined). Returns False when the pool is full."""
+        channel = self._normalize(channel)
+        if not channel:
+            return False
+
+        async with self._lock:
+            if channel in self._shard_for:
+                if callback:
+                    self._callbacks.setdefault(channel, []).append(callback)
+                return True
+
+            shard = self._pick_shard()
+            if shard is None:
+                if len(self.shards) >= self.max_connections:
+                    logger.warning(f"IRC pool is full; cannot join #{channel}")
+                    return False
+                shard = TwitchIRCChat(channels=[], join_limiter=self.join_limiter)
+                shard.set_message_callback(self._route)
+                shard.set_emote_service(self.emote_service)
+                self.shards.append(shard)
+                await shard.join(channel)
+                await shard.start()
+            else:
+                await shard.join(channel)
+
+            self._shard_for[channel] = shard
+            # Only once joined, so a rejected channel never gets messages routed to it
+            if callback:
+                self._callbacks.setdefault(channel, []).append(callback)
+            logger.info(f"Pool joined #{channel} on connection {self.shards.index(shard)}")
+            return True
+
+    async def remove_channel(self, channel: str) -> bool:
+        """Leave a channel; shuts down its connection when it was the last one on it"""
+        channel = self._normalize(channel)
+        async with self._lock:
+            shard = self._shard_for.pop(channel, None)
+            self._callbacks.pop(channel, None)
+            if shard is None:
+                return False
+
+            await shard.part(channel)
+            if not shard.channels:
+                self.shards.remove(shard)
+                await shard.disconnect()
+            logger.info(f"Pool left #{channel}")
+            return True
+
+    def add_callback(self, channel: str, callback: Callable) -> bool:
+        """Register a callback for one pooled channel. Returns False if the channel isn't joined."""
+        channel = self._normalize(channel)
+        if channel not in self._shard_for:
+            return False
+        self._callbacks.setdefault(channel, []).append(callback)
+        return True
+
+    async def _route(self, parsed: Dict):
+        """Shard pipeline consumer: fan a message out to its channel's callbacks"""
+        for callback in self._callbacks.get(parsed.get('channel'), ()):
+            try:
+                await callback(parsed)
+            except Exception as e:
+                logger.error(f"Error in #{parsed.get('channel')} callback: {e}")
+        if self.message_callback:
+            await self.message_callback(parsed)
+
+    def has_channel(self, channel: str) -> bool:
+        return self._normalize(channel) in self._shard_for
+
+    def get_recent_messages(self, channel: str, limit: int = 50, since: Optional[int] = None,
+                            since_id: Optional[str] = None) -> List[Dict]:
+        """Recent messages for one pooled channel (newest first)"""
+        channel = self._normalize(channel)
+        shard = self._shard_for.get(channel)
+        if shard is None:
+            return []
+        return shard.get_recent_messages(limit=limit, since=since, since_id=since_id, channel=channel)
+
+    def get_channels(self) -> List[Dict]:
+        """Pooled channels and the connection each one is on"""
+        return [
+            {
+                'channel': channel,
+                'connection': self.shards.index(shard),
+                'connected': shard.writer is not None
+            }
+            for channel, shard in sorted(self._shard_for.items())
+        ]
+
+    def get_metrics(self) -> Dict:
+        return {
+            'channels': len(self._shard_for),
+            'connections': len(self.shards),
+            'channels_per_connection': self.channels_per_connection,
+            'max_connections': self.max_connections,
+            'join_budget_available': self.join_limiter.available,
+            'shards': [shard.get_metrics() for shard in self.shards]
+        }
+
+    async def stop(self):
+        """Disconnect every shard"""
+        async with self._lock:
+            for shard in self.shards:
+                await shard.disconnect()
+            self.shards = []
+            self._shard_for.clear()
+
+
+# Global instance
+irc_pool = IRCConnectionPool(
+    channels_per_connection=int(os.getenv('IRC_POOL_CHANNELS_PER_CONNECTION', '20')),
+    max_connections=int(os.getenv('IRC_POOL_MAX_CONNECTIONS', '5'))
+)
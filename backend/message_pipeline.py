@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# What put() does when the queue is full
+DROP_OLDEST = 'drop_oldest'   # evict the oldest queued item to make room
+DROP_NEWEST = 'drop_newest'   # discard the incoming item
+BLOCK = 'block'               # wait for room (backpressure on the producer)
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class MessagePipeline:
+    """Bounded queue between a producer (e.g. a socket reader) and consumer tasks.
+
+    The producer only ever pays for a queue put, so a slow handler cannot
+    stall the read loop; overflow is resolved by the configured policy.
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[None]], maxsize: int = 1000,
+                 policy: str = DROP_OLDEST, consumers: int = 1, name: str = 'pipeline'):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.consumers = max(1, consumers)
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks: List[asyncio.Task] = []
+
+        # Metrics
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self):
+        """Start consumer tasks (no-op if already running)"""
+        if self.running:
+            return
+        self._tasks = [
+            asyncio.create_task(self._consume(), name=f"{self.name}-consumer-{i}")
+            for i in range(self.consumers)
+        ]
+
+    async def stop(self):
+        """Cancel consumer tasks; anything still queued is discarded"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+
+    async def put(self, item: Any) -> bool:
+        """Queue an item for the consumers. Returns False if it was dropped."""
+        entry = (time.monotonic(), item)
+
+        if self.queue.full():
+            if self.policy == BLOCK:
+                await self.queue.put(entry)
+            elif self.policy == DROP_NEWEST:
+                self.dropped += 1
+                return False
+            else:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+                self.queue.put_nowait(entry)
+        else:
+            self.queue.put_nowait(entry)
+
+        self.enqueued += 1
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+
+    async def _consume(self):
+        while True:
+            enqueued_at, item = await self.queue.get()
+            lag = time.monotonic() - enqueued_at
+            self.last_lag = lag
+            self._total_lag += lag
+            if lag > self.max_lag:
+                self.max_lag = lag
+            try:
+                await self.handler(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error in {self.name} handler: {e}")
+            finally:
+                self.processed += 1
+                self.queue.task_done()
+
+    def get_metrics(self) -> Dict:
+        """Queue depth, throughput and lag (seconds between enqueue and dequeue)"""
+        return {
+            'policy': self.policy,
+            'consumers': self.consumers,
+            'depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'capacity': self.maxsize,
+            'enqueued': self.enqueued,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'lag_ms': {
+                'last': round(self.last_lag * 1000, 2),
+                'avg': round(self._total_lag / self.processed * 1000, 2) if self.processed else 0.0,
+                'max': round(self.max_lag * 1000, 2)
+            }
+        }
@@ -1,11 +1,12 @@
 import os
-import httpx
 import logging
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict
 from jose import jwt
 from dotenv import load_dotenv
 from pathlib import Path
+from helix_client import helix
+from user_cache import user_cache
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -38,77 +39,74 @@ class OAuthService:
     
     async def exchange_code_for_token(self, code: str) -> Dict:
         """Exchange authorization code for access token"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    'https://id.twitch.tv/oauth2/token',
-                    data={
-                        'client_id': self.client_id,
-                        'client_secret': self.client_secret,
-                        'code': code,
-                        'grant_type': 'authorization_code',
-                        'redirect_uri': self.redirect_uri
-                    }
-                )
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                logger.error(f"Token exchange failed: {e}")
-                raise
+        try:
+            response = await helix.client.post(
+                'https://id.twitch.tv/oauth2/token',
+                data={
+                    'client_id': self.client_id,
+                    'client_secret': self.client_secret,
+                    'code': code,
+                    'grant_type': 'authorization_code',
+                    'redirect_uri': self.redirect_uri
+                }
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Token exchange failed: {e}")
+            raise
     
     async def refresh_access_token(self, refresh_token: str) -> Dict:
         """Refresh expired access token"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    'https://id.twitch.tv/oauth2/token',
-                    data={
-                        'client_id': self.client_id,
-                        'client_secret': self.client_secret,
-                        'refresh_token': refresh_token,
-                        'grant_type': 'refresh_token'
-                    }
-                )
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                logger.error(f"Token refresh failed: {e}")
-                raise
+        try:
+            response = await helix.client.post(
+                'https://id.twitch.tv/oauth2/token',
+                data={
+                    'client_id': self.client_id,
+                    'client_secret': self.client_secret,
+                    'refresh_token': refresh_token,
+                    'grant_type': 'refresh_token'
+                }
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Token refresh failed: {e}")
+            raise
     
     async def get_user_info(self, access_token: str) -> Optional[Dict]:
         """Get user information from Twitch"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    'https://api.twitch.tv/helix/users',
-                    headers={
-                        'Authorization': f'Bearer {access_token}',
-                        'Client-ID': self.client_id
-                    }
-                )
-                response.raise_for_status()
-                data = response.json()
-                if data.get('data'):
-                    return data['data'][0]
-                return None
-            except Exception as e:
-                logger.error(f"Failed to get user info: {e}")
-                return None
+        try:
+            response = await helix.client.get(
+                'https://api.twitch.tv/helix/users',
+                headers={
+                    'Authorization': f'Bearer {access_token}',
+                    'Client-ID': self.client_id
+                }
+            )
+            response.raise_for_status()
+            data = response.json()
+            if data.get('data'):
+                user_cache.put_helix(data['data'])
+                return data['data'][0]
+            return None
+        except Exception as e:
+            logger.error(f"Failed to get user info: {e}")
+            return None
     
     async def validate_token(self, access_token: str) -> Optional[Dict]:
         """Validate token with Twitch"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    'https://id.twitch.tv/oauth2/validate',
-                    headers={'Authorization': f'Bearer {access_token}'}
-                )
-                if response.status_code == 200:
-                    return response.json()
-                return None
-            except Exception as e:
-                logger.error(f"Token validation failed: {e}")
-                return None
+        try:
+            response = await helix.client.get(
+                'https://id.twitch.tv/oauth2/validate',
+                headers={'Authorization': f'Bearer {access_token}'}
+            )
+            if response.status_code == 200:
+                return response.json()
+            return None
+        except Exception as e:
+            logger.error(f"Token validation failed: {e}")
+            return None
     
     def create_session_token(self, user_id: str, expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT session token for frontend"""
@@ -0,0 +1,314 @@
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from websockets.asyncio.client import ClientConnection, connect
+
+logger = logging.getLogger(__name__)
+
+RPC_VERSION = 1
+
+# obs-websocket v5 message opcodes
+OP_HELLO = 0
+OP_IDENTIFY = 1
+OP_IDENTIFIED = 2
+OP_REIDENTIFY = 3
+OP_EVENT = 5
+OP_REQUEST = 6
+OP_REQUEST_RESPONSE = 7
+OP_REQUEST_BATCH = 8
+OP_REQUEST_BATCH_RESPONSE = 9
+
+# EventSubscription flags
+EVENTS_GENERAL = 1 << 0
+EVENTS_CONFIG = 1 << 1
+EVENTS_SCENES = 1 << 2
+EVENTS_INPUTS = 1 << 3
+EVENTS_TRANSITIONS = 1 << 4
+EVENTS_FILTERS = 1 << 5
+EVENTS_OUTPUTS = 1 << 6
+EVENTS_SCENE_ITEMS = 1 << 7
+EVENTS_MEDIA_INPUTS = 1 << 8
+EVENTS_VENDORS = 1 << 9
+EVENTS_UI = 1 << 10
+EVENTS_ALL = (EVENTS_GENERAL | EVENTS_CONFIG | EVENTS_SCENES | EVENTS_INPUTS | EVENTS_TRANSITIONS
+              | EVENTS_FILTERS | EVENTS_OUTPUTS | EVENTS_SCENE_ITEMS | EVENTS_MEDIA_INPUTS
+              | EVENTS_VENDORS | EVENTS_UI)
+# High-volume events are opt-in
+EVENTS_INPUT_VOLUME_METERS = 1 << 16
+EVENTS_INPUT_ACTIVE_STATE_CHANGED = 1 << 17
+EVENTS_INPUT_SHOW_STATE_CHANGED = 1 << 18
+EVENTS_SCENE_ITEM_TRANSFORM_CHANGED = 1 << 19
+
+# Events that each supersede the last, so dropping some under backpressure loses nothing lasting
+DROPPABLE_EVENTS = frozenset({'InputVolumeMeters'})
+
+# RequestBatchExecutionType
+BATCH_SERIAL_REALTIME = 0
+BATCH_SERIAL_FRAME = 1
+BATCH_PARALLEL = 2
+
+BatchRequest = Union[Tuple[str, Optional[Dict]], Dict]
+EventHandler = Callable[[Dict], Awaitable[None]]
+
+
+class OBSError(Exception):
+    """A request OBS answered with a failure status"""
+
+    def __init__(self, request_type: str, code: int, comment: Optional[str] = None):
+        self.request_type = request_type
+        self.code = code
+        self.comment = comment
+        super().__init__(f"{request_type} failed ({code}): {comment or 'no comment'}")
+
+
+def auth_string(password: str, salt: str, challenge: str) -> str:
+    """obs-websocket v5 authentication response"""
+    secret = base64.b64encode(hashlib.sha256((password + salt).encode()).digest())
+    return base64.b64encode(hashlib.sha256(secret + challenge.encode()).digest()).decode()
+
+
+class OBSClient:
+    """Native asyncio client for the obs-websocket v5 protocol.
+
+    Requests are matched to responses by requestId, so any number of calls
+    can be in flight on the one socket at once. Events are dispatched to
+    handlers registered with on(), in order, from their own task: a slow
+    handler delays later events but never responses, so handlers may make
+    OBS requests themselves. When handlers fall behind, meter events are
+    dropped first (past half of event_queue_size) so the rest of the queue
+    stays free for state changes. If even those overflow, the dropped change
+    can't be rebuilt from later events, so on_resync is awaited once the
+    dispatcher has caught up to the point of the drop.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 4455, password: str = '',
+                 event_subscriptions: int = EVENTS_ALL, request_timeout: float = 10.0,
+                 event_queue_size: int = 1000):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.event_subscriptions = event_subscriptions
+        self.request_timeout = request_timeout
+        self.ws: Optional[ClientConnection] = None
+        self.negotiated_rpc_version: Optional[int] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._handlers: Dict[str, List[EventHandler]] = {}
+        self._reader_task: Optional[asyncio.Task] = None
+        self.event_queue_size = event_queue_size
+        # Bounded by _queue_event, not maxsize, so the shutdown sentinel always fits
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._dispatcher_task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._queued = 0
+        self._dispatched = 0
+        self._resync_at: Optional[int] = None
+        self.dropped_events = 0
+        self.dropped_state_events = 0
+        self.on_disconnect: Optional[Callable[[], Awaitable[None]]] = None
+        self.on_resync: Optional[Callable[[], Awaitable[None]]] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._reader_task is not None and not self._reader_task.done()
+
+    async def connect(self, timeout: float = 10.0):
+        """Open the socket and complete the Hello/Identify handshake"""
+        self.ws = await asyncio.wait_for(
+            connect(f"ws://{self.host}:{self.port}", subprotocols=['obswebsocket.json'], max_size=None),
+            timeout
+        )
+        try:
+            hello = await asyncio.wait_for(self._receive(OP_HELLO), timeout)
+            identify = {'rpcVersion': RPC_VERSION, 'eventSubscriptions': self.event_subscriptions}
+            auth = hello.get('authentication')
+            if auth:
+                identify['authentication'] = auth_string(self.password, auth['salt'], auth['challenge'])
+            await self._send(OP_IDENTIFY, identify)
+            identified = await asyncio.wait_for(self._receive(OP_IDENTIFIED), timeout)
+        except Exception:
+            await self.ws.close()
+            self.ws = None
+            raise
+
+        self.negotiated_rpc_version = identified.get('negotiatedRpcVersion')
+        self._events = asyncio.Queue()
+        self._queued = self._dispatched = 0
+        self._resync_at = None
+        self._reader_task = asyncio.create_task(self._read(), name='obs-reader')
+        self._dispatcher_task = asyncio.create_task(self._dispatch_events(), name='obs-events')
+
+    async def disconnect(self):
+        for task in (self._reader_task, self._dispatcher_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._reader_task = self._dispatcher_task = None
+        if self.ws:
+            await self.ws.close()
+            self.ws = None
+        self._fail_pending(ConnectionError("OBS connection closed"))
+
+    async def _send(self, op: int, data: Dict):
+        await self.ws.send(json.dumps({'op': op, 'd': data}))
+
+    async def _receive(self, op: int) -> Dict:
+        """Next message during the handshake; a close here means OBS rejected us (e.g. bad password)"""
+        message = json.loads(await self.ws.recv())
+        if message.get('op') != op:
+            raise ConnectionError(f"Expected opcode {op} from OBS, got {message.get('op')}")
+        return message.get('d', {})
+
+    def on(self, event_type: str, handler: EventHandler):
+        """Register a coroutine called with the eventData of an OBS event type"""
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    async def reidentify(self, event_subscriptions: int):
+        """Change event subscriptions without reconnecting"""
+        self.event_subscriptions = event_subscriptions
+        await self._send(OP_REIDENTIFY, {'eventSubscriptions': event_subscriptions})
+
+    def _next_id(self) -> str:
+        return str(next(self._ids))
+
+    async def _request(self, op: int, data: Dict) -> Dict:
+        if not self.connected:
+            raise ConnectionError("Not connected to OBS")
+        request_id = data['requestId']
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._send(op, data)
+            # Not asyncio.wait_for: on 3.11 it drops a cancel that lands as the response
+            # arrives, which left stop_sampler() waiting on a sampler that never stopped
+            async with asyncio.timeout(self.request_timeout):
+                return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def call(self, request_type: str, data: Optional[Dict] = None) -> Dict:
+        """Send one request and return its responseData (raises OBSError on failure)"""
+        request = {'requestType': request_type, 'requestId': self._next_id()}
+        if data:
+            request['requestData'] = data
+        response = await self._request(OP_REQUEST, request)
+        status = response.get('requestStatus', {})
+        if not status.get('result'):
+            raise OBSError(request_type, status.get('code', 0), status.get('comment'))
+        return response.get('responseData') or {}
+
+    async def batch(self, requests: List[BatchRequest], halt_on_failure: bool = False,
+                    execution_type: int = BATCH_SERIAL_REALTIME) -> List[Dict]:
+        """Send several requests as one RequestBatch.
+
+        Each request is a (requestType, requestData) tuple or a raw request
+        dict. Returns the per-request results in order; failures are
+        reported in each result's requestStatus rather than raised.
+        """
+        batch_requests = []
+        for request in requests:
+            if isinstance(request, dict):
+                batch_requests.append(request)
+            else:
+                request_type, data = request
+                entry = {'requestType': request_type}
+                if data:
+                    entry['requestData'] = data
+                batch_requests.append(entry)
+
+        response = await self._request(OP_REQUEST_BATCH, {
+            'requestId': self._next_id(),
+            'haltOnFailure': halt_on_failure,
+            'executionType': execution_type,
+            'requests': batch_requests
+        })
+        return response.get('results', [])
+
+    async def _read(self):
+        try:
+            async for raw in self.ws:
+                message = json.loads(raw)
+                op = message.get('op')
+                data = message.get('d', {})
+                if op in (OP_REQUEST_RESPONSE, OP_REQUEST_BATCH_RESPONSE):
+                    future = self._pending.get(data.get('requestId'))
+                    if future and not future.done():
+                        future.set_result(data)
+                elif op == OP_EVENT:
+                    self._queue_event(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"OBS connection lost: {e}")
+        self._fail_pending(ConnectionError("OBS connection closed"))
+        self._queue_event(None)  # let the dispatcher finish what's queued and exit
+        if self.on_disconnect:
+            self._spawn(self.on_disconnect())
+
+    def _spawn(self, coro: Awaitable[None]):
+        """Run coro in a task that is kept referenced until done and whose errors get logged"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error in OBS client callback: {task.exception()}")
+
+    def _queue_event(self, event: Optional[Dict]):
+        if event is not None:
+            droppable = event.get('eventType') in DROPPABLE_EVENTS
+            limit = self.event_queue_size // 2 if droppable else self.event_queue_size
+            if self._events.qsize() >= limit:
+                self.dropped_events += 1
+                if not droppable:
+                    self.dropped_state_events += 1
+                    self._resync_at = self._queued  # once everything queued before the drop is handled
+                if self.dropped_events % 100 == 1:
+                    logger.warning(f"OBS event handlers are behind; dropped {self.dropped_events} events so far")
+                return
+            self._queued += 1
+        self._events.put_nowait(event)
+
+    async def _dispatch_events(self):
+        while True:
+            if self._resync_at is not None and self._dispatched >= self._resync_at:
+                self._resync_at = None
+                await self._resync()
+            event = await self._events.get()
+            if event is None:
+                return
+            self._dispatched += 1
+            await self._dispatch(event)
+
+    async def _resync(self):
+        logger.warning("Dropped OBS state events; resyncing")
+        if self.on_resync:
+            try:
+                await self.on_resync()
+            except Exception as e:
+                logger.error(f"Error resyncing OBS state: {e}")
+
+    async def _dispatch(self, event: Dict):
+        event_type = event.get('eventType')
+        event_data = event.get('eventData') or {}
+        for handler in self._handlers.get(event_type, ()):
+            try:
+                await handler(event_data)
+            except Exception as e:
+                logger.error(f"Error in OBS {event_type} handler: {e}")
+
+    def _fail_pending(self, error: Exception):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
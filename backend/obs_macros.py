@@ -0,0 +1,111 @@
+import os
+import json
+import shutil
+import logging
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# Shorthand macro actions -> (obs-websocket requestType, required step fields)
+MACRO_ACTIONS = {
+    'switch_scene': ('SetCurrentProgramScene', ('scene',)),
+    'mute': ('SetInputMute', ('input',)),
+    'unmute': ('SetInputMute', ('input',)),
+    'show_source': ('SetSceneItemEnabled', ('source',)),
+    'hide_source': ('SetSceneItemEnabled', ('source',)),
+    'sleep': ('Sleep', ('ms',)),
+    'start_stream': ('StartStream', ()),
+    'stop_stream': ('StopStream', ()),
+    'start_recording': ('StartRecord', ()),
+    'stop_recording': ('StopRecord', ()),
+    'start_replay_buffer': ('StartReplayBuffer', ()),
+    'stop_replay_buffer': ('StopReplayBuffer', ()),
+    'save_replay_buffer': ('SaveReplayBuffer', ()),
+}
+
+# Names taken by fixed routes under /obs/macros/ (POST /obs/macros/run runs an unsaved macro)
+RESERVED_NAMES = frozenset({'run'})
+
+
+def validate_steps(steps: List[Dict]):
+    """Raise ValueError describing the first malformed step.
+
+    A step is either a shorthand {"action": "switch_scene", "scene": "BRB"}
+    or a raw {"requestType": "...", "requestData": {...}} request.
+    """
+    if not steps:
+        raise ValueError("A macro needs at least one step")
+    for index, step in enumerate(steps):
+        if not isinstance(step, dict):
+            raise ValueError(f"Step {index + 1} must be an object")
+        if 'requestType' in step:
+            if not isinstance(step['requestType'], str):
+                raise ValueError(f"Step {index + 1}: requestType must be a string")
+            continue
+        action = step.get('action')
+        if action not in MACRO_ACTIONS:
+            raise ValueError(f"Step {index + 1}: unknown action '{action}'")
+        missing = [field for field in MACRO_ACTIONS[action][1] if step.get(field) in (None, '')]
+        if missing:
+            raise ValueError(f"Step {index + 1} ({action}) is missing {', '.join(missing)}")
+
+
+class MacroStore:
+    """Named OBS action sequences persisted to a JSON file"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.macros: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            if self.path.exists() and self.path.stat().st_size > 0:
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.warning(f"Error loading OBS macros: {e}")
+        return {}
+
+    def _save(self):
+        # Write to a temporary file first so a crash mid-write can't lose the macros
+        temp_file = self.path.with_suffix('.tmp')
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump(self.macros, f, indent=2)
+            shutil.move(str(temp_file), str(self.path))
+        except Exception as e:
+            logger.error(f"Failed to save OBS macros: {e}")
+            if temp_file.exists():
+                temp_file.unlink()
+            raise
+
+    def list(self) -> Dict[str, Dict]:
+        return {name: dict(macro) for name, macro in self.macros.items()}
+
+    def get(self, name: str) -> Optional[Dict]:
+        return self.macros.get(name)
+
+    def put(self, name: str, steps: List[Dict], description: Optional[str] = None,
+            halt_on_failure: bool = False) -> Dict:
+        if name.lower() in RESERVED_NAMES:
+            raise ValueError(f"'{name}' is reserved and can't be used as a macro name")
+        validate_steps(steps)
+        macro = {'steps': steps, 'description': description, 'halt_on_failure': halt_on_failure}
+        self.macros[name] = macro
+        self._save()
+        return macro
+
+    def delete(self, name: str) -> bool:
+        if self.macros.pop(name, None) is None:
+            return False
+        self._save()
+        return True
+
+
+macro_store = MacroStore(Path(os.getenv('OBS_MACROS_FILE', str(ROOT_DIR / 'obs_macros.json'))))
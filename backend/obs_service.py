@@ -1,8 +1,11 @@
 import os
-import logging
 import asyncio
-from typing import Optional, Dict, List
-from obswebsocket import obsws, requests, events
+import logging
+import time
+from typing import Awaitable, Callable, Optional, Dict, List, Tuple
+from obs_client import OBSClient, OBSError, BATCH_SERIAL_REALTIME, EVENTS_ALL, EVENTS_INPUT_VOLUME_METERS
+from obs_macros import MACRO_ACTIONS, validate_steps
+from obs_stats import AudioMeter, StatsHistory, derive
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -17,7 +20,7 @@ class OBSService:
         self.host = os.getenv('OBS_WEBSOCKET_HOST', 'localhost')
         self.port = int(os.getenv('OBS_WEBSOCKET_PORT', '4455'))
         self.password = os.getenv('OBS_WEBSOCKET_PASSWORD', '')
-        self.ws: Optional[obsws] = None
+        self.ws: Optional[OBSClient] = None
         self.connected = False
         self.current_stats = {
             'streaming': False,
@@ -26,101 +29,521 @@ class OBSService:
             'fps': 0,
             'cpu_usage': 0,
             'memory_usage': 0,
-            'output_bitrate': 0,
-            'dropped_frames': 0
+            'output_bitrate': 0,  # kbps over the last sample interval, from outputBytes deltas
+            'output_bytes': 0,
+            'dropped_frames': 0,
+            'dropped_pct': 0.0,
+            'render_skipped_pct': 0.0,
+            'frame_render_ms': 0.0
         }
         
+        # Event-driven state: scene names in OBS order, and scene items per scene by sceneItemId
+        self.scenes: List[str] = []
+        self.scene_items: Dict[str, Dict[int, Dict]] = {}
+        # (scene, source name) -> sceneItemId, so a toggle is a single request
+        self.scene_item_ids: Dict[str, Dict[str, int]] = {}
+        self.state_callback: Optional[Callable[[str, Dict], Awaitable[None]]] = None
+        
+        # Counters without events (fps, cpu, bytes) are refreshed on read once this old
+        self.stats_max_age = float(os.getenv('OBS_STATS_MAX_AGE', '1'))
+        self._stats_updated = 0.0
+        
+        # Background sampler feeding the stats history
+        self.sample_interval = float(os.getenv('OBS_SAMPLE_INTERVAL', '1'))
+        self.stats_history = StatsHistory(int(os.getenv('OBS_HISTORY_SIZE', '3600')))
+        self._sampler_task: Optional[asyncio.Task] = None
+        self.counters: Optional[Dict[str, float]] = None  # latest raw output/render counters
+        self._sampled_counters: Optional[Dict[str, float]] = None  # counters at the previous sample
+        
+        # Audio meters are a high-volume (~20 Hz) subscription, so they are opt-in
+        self.audio_meters = os.getenv('OBS_AUDIO_METERS', 'false').lower() == 'true'
+        self.audio_interval = float(os.getenv('OBS_AUDIO_METERS_INTERVAL_MS', '100')) / 1000
+        self.audio_meter = AudioMeter()
+        self.audio_levels: Dict[str, Dict[str, List[float]]] = {}
+        self.audio_callback: Optional[Callable[[Dict], Awaitable[None]]] = None
+        self._audio_task: Optional[asyncio.Task] = None
+        
+    def set_state_callback(self, callback: Callable[[str, Dict], Awaitable[None]]):
+        """Register callback(event_type, event_data) for OBS state changes"""
+        self.state_callback = callback
+        
+    def set_audio_callback(self, callback: Callable[[Dict], Awaitable[None]]):
+        """Register callback(levels) for downsampled audio levels"""
+        self.audio_callback = callback
+        
+    def _event_subscriptions(self) -> int:
+        return EVENTS_ALL | (EVENTS_INPUT_VOLUME_METERS if self.audio_meters else 0)
+        
     async def connect(self):
         """Connect to OBS WebSocket"""
         try:
             logger.info(f"Connecting to OBS at {self.host}:{self.port}")
             
-            # Run connection in executor since obsws is synchronous
-            loop = asyncio.get_event_loop()
-            self.ws = await loop.run_in_executor(
-                None,
-                lambda: obsws(self.host, self.port, self.password)
-            )
-            
-            await loop.run_in_executor(None, self.ws.connect)
+            self.ws = OBSClient(self.host, self.port, self.password, self._event_subscriptions())
+            self.ws.on_disconnect = self._on_disconnect
+            self.ws.on_resync = self._on_resync
+            self._register_event_handlers()
+            await self.ws.connect()
             
             self.connected = True
             logger.info("Successfully connected to OBS WebSocket")
             
-            # Get initial state
-            await self.update_stats()
+            # Get initial state; events keep it current from here on
+            await self.sync_state()
+            self.start_sampler()
+            if self.audio_meters:
+                self.start_audio_meters()
             
         except Exception as e:
             logger.error(f"Failed to connect to OBS: {e}")
             self.connected = False
     
+    async def _on_disconnect(self):
+        """OBS closed the socket (OBS quit or websocket server restarted)"""
+        logger.warning("Lost connection to OBS")
+        self.connected = False
+    
+    async def _on_resync(self):
+        """The client had to drop state events under load; reload the state and push it"""
+        await self.sync_state()
+        if self.state_callback:
+            await self.state_callback('StateResynced', {'scenes': self.scenes})
+    
     async def disconnect(self):
         """Disconnect from OBS"""
+        await self.stop_sampler()
+        await self.stop_audio_meters()
         if self.ws:
             try:
-                loop = asyncio.get_event_loop()
-                await loop.run_in_executor(None, self.ws.disconnect)
+                await self.ws.disconnect()
                 logger.info("Disconnected from OBS")
             except Exception as e:
                 logger.error(f"Error disconnecting from OBS: {e}")
         self.connected = False
     
-    async def _execute_request(self, request_obj):
-        """Execute an OBS request in executor"""
+    async def _execute_request(self, request_type: str, data: Optional[Dict] = None) -> Optional[Dict]:
+        """Execute an OBS request; returns its response data, or None if it failed"""
         if not self.connected or not self.ws:
             return None
         
         try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(None, self.ws.call, request_obj)
-            return response
-        except Exception as e:
+            return await self.ws.call(request_type, data)
+        except OBSError as e:
             logger.error(f"OBS request failed: {e}")
             return None
+        except Exception as e:
+            logger.error(f"OBS request {request_type} failed: {e}")
+            return None
+    
+    async def execute_batch(self, batch_requests: List[Tuple[str, Optional[Dict]]],
+                            halt_on_failure: bool = False) -> List[Optional[Dict]]:
+        """Execute several requests in one round trip.
+
+        Returns each request's response data in order, or None for requests
+        that failed (or all of them if the batch could not be sent).
+        """
+        if not self.connected or not self.ws:
+            return [None] * len(batch_requests)
+        
+        try:
+            results = await self.ws.batch(batch_requests, halt_on_failure=halt_on_failure)
+        except Exception as e:
+            logger.error(f"OBS request batch failed: {e}")
+            return [None] * len(batch_requests)
+        
+        responses: List[Optional[Dict]] = []
+        for result in results:
+            status = result.get('requestStatus', {})
+            if status.get('result'):
+                responses.append(result.get('responseData') or {})
+            else:
+                logger.error(f"OBS request {result.get('requestType')} failed "
+                             f"({status.get('code')}): {status.get('comment')}")
+                responses.append(None)
+        # Requests skipped by haltOnFailure get no result
+        responses.extend([None] * (len(batch_requests) - len(responses)))
+        return responses
+    
+    async def _macro_request(self, step: Dict, current_scene: str) -> Dict:
+        """Turn a macro step into a batch request (raises ValueError if it can't be resolved).
+        
+        current_scene is the program scene this step will run in, after any earlier
+        switch in the same macro; sources without a scene are looked up there.
+        """
+        if 'requestType' in step:
+            request = {'requestType': step['requestType']}
+            if step.get('requestData'):
+                request['requestData'] = step['requestData']
+            return request
+        
+        action = step['action']
+        request_type = MACRO_ACTIONS[action][0]
+        if action == 'switch_scene':
+            data = {'sceneName': step['scene']}
+        elif action in ('mute', 'unmute'):
+            data = {'inputName': step['input'], 'inputMuted': action == 'mute'}
+        elif action in ('show_source', 'hide_source'):
+            scene_name = step.get('scene') or current_scene
+            item_id = await self.get_scene_item_id(scene_name, step['source'])
+            if item_id is None:
+                raise ValueError(f"Source '{step['source']}' not found in scene '{scene_name}'")
+            data = {'sceneName': scene_name, 'sceneItemId': item_id, 'sceneItemEnabled': action == 'show_source'}
+        elif action == 'sleep':
+            data = {'sleepMillis': int(step['ms'])}
+        else:
+            data = None
+        
+        request = {'requestType': request_type}
+        if data:
+            request['requestData'] = data
+        return request
+    
+    async def run_macro(self, steps: List[Dict], halt_on_failure: bool = False) -> Dict:
+        """Run a sequence of actions as one RequestBatch (sleep steps are honoured by OBS).
+        
+        Nothing is sent unless every step resolves (e.g. all sources exist).
+        """
+        validate_steps(steps)
+        if not self.connected or not self.ws:
+            return {'success': False, 'error': 'OBS not connected', 'latency_ms': 0.0, 'steps': []}
+        
+        start = time.perf_counter()
+        try:
+            batch_requests = []
+            scene = self.current_stats['current_scene']
+            for step in steps:
+                request = await self._macro_request(step, scene)
+                if request['requestType'] == 'SetCurrentProgramScene':
+                    scene = (request.get('requestData') or {}).get('sceneName', scene)
+                batch_requests.append(request)
+        except ValueError as e:
+            return {'success': False, 'error': str(e), 'latency_ms': 0.0, 'steps': []}
+        
+        try:
+            results = await self.ws.batch(batch_requests, halt_on_failure=halt_on_failure,
+                                          execution_type=BATCH_SERIAL_REALTIME)
+        except Exception as e:
+            logger.error(f"OBS macro failed: {e}")
+            return {'success': False, 'error': str(e), 'latency_ms': 0.0, 'steps': []}
+        latency = time.perf_counter() - start
+        
+        step_results = []
+        for index, request in enumerate(batch_requests):
+            if index < len(results):
+                status = results[index].get('requestStatus', {})
+                ok = bool(status.get('result'))
+                error = None if ok else status.get('comment') or f"code {status.get('code')}"
+            else:
+                ok, error = False, 'skipped (halted on earlier failure)'
+            step_results.append({'step': index + 1, 'requestType': request['requestType'], 'ok': ok, 'error': error})
+        
+        return {
+            'success': all(step['ok'] for step in step_results),
+            'latency_ms': round(latency * 1000, 2),
+            'steps': step_results
+        }
     
     async def update_stats(self):
-        """Update OBS statistics"""
+        """Update OBS statistics (one RequestBatch round trip)"""
         if not self.connected:
             return
         
         try:
-            # Get streaming status
-            stream_status = await self._execute_request(requests.GetStreamStatus())
+            stream_status, record_status, stats, current_scene = await self.execute_batch([
+                ('GetStreamStatus', None),
+                ('GetRecordStatus', None),
+                ('GetStats', None),
+                ('GetCurrentProgramScene', None)
+            ])
+            
+            # Streaming status
             if stream_status:
-                self.current_stats['streaming'] = stream_status.datain.get('outputActive', False)
-                self.current_stats['output_bitrate'] = stream_status.datain.get('outputBytes', 0)
-                self.current_stats['dropped_frames'] = stream_status.datain.get('outputSkippedFrames', 0)
+                self.current_stats['streaming'] = stream_status.get('outputActive', False)
+                self.current_stats['output_bytes'] = stream_status.get('outputBytes', 0)
+                self.current_stats['dropped_frames'] = stream_status.get('outputSkippedFrames', 0)
             
-            # Get recording status
-            record_status = await self._execute_request(requests.GetRecordStatus())
+            # Recording status
             if record_status:
-                self.current_stats['recording'] = record_status.datain.get('outputActive', False)
+                self.current_stats['recording'] = record_status.get('outputActive', False)
             
-            # Get stats
-            stats = await self._execute_request(requests.GetStats())
+            # Stats
             if stats:
-                self.current_stats['fps'] = int(stats.datain.get('activeFps', 0))
-                self.current_stats['cpu_usage'] = stats.datain.get('cpuUsage', 0)
-                self.current_stats['memory_usage'] = stats.datain.get('memoryUsage', 0)
+                self.current_stats['fps'] = int(stats.get('activeFps', 0))
+                self.current_stats['cpu_usage'] = stats.get('cpuUsage', 0)
+                self.current_stats['memory_usage'] = stats.get('memoryUsage', 0)
+                self.current_stats['frame_render_ms'] = stats.get('averageFrameRenderTime', 0.0)
             
-            # Get current scene
-            current_scene = await self._execute_request(requests.GetCurrentProgramScene())
+            # Raw counters; rates are derived by the sampler at its own fixed cadence, since
+            # get_stats() and the watchdog also refresh at irregular times
+            if stream_status and stats:
+                self.counters = {
+                    'time': time.monotonic(),
+                    'output_bytes': stream_status.get('outputBytes', 0),
+                    'output_skipped': stream_status.get('outputSkippedFrames', 0),
+                    'output_total': stream_status.get('outputTotalFrames', 0),
+                    'render_skipped': stats.get('renderSkippedFrames', 0),
+                    'render_total': stats.get('renderTotalFrames', 0)
+                }
+            
+            # Current scene
             if current_scene:
-                self.current_stats['current_scene'] = current_scene.datain.get('currentProgramSceneName', 'Unknown')
+                self.current_stats['current_scene'] = current_scene.get('currentProgramSceneName', 'Unknown')
+            
+            self._stats_updated = time.monotonic()
                 
         except Exception as e:
             logger.error(f"Error updating OBS stats: {e}")
     
     async def get_stats(self) -> Dict:
-        """Get current OBS stats"""
-        await self.update_stats()
+        """Get current OBS stats (scene/stream/record state is kept current by events)"""
+        if time.monotonic() - self._stats_updated > self.stats_max_age:
+            await self.update_stats()
         return self.current_stats.copy()
     
+    def start_sampler(self):
+        """Start sampling stats into the history every sample_interval seconds"""
+        if self._sampler_task and not self._sampler_task.done():
+            return
+        self._sampled_counters = None
+        self._sampler_task = asyncio.create_task(self._sample_loop(), name='obs-stats-sampler')
+    
+    async def stop_sampler(self):
+        if self._sampler_task:
+            self._sampler_task.cancel()
+            try:
+                await self._sampler_task
+            except asyncio.CancelledError:
+                pass
+            self._sampler_task = None
+    
+    async def _sample_loop(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            if self.connected:
+                await self.update_stats()
+                self._update_rates()
+                self.stats_history.append({
+                    'fps': self.current_stats['fps'],
+                    'cpu_usage': self.current_stats['cpu_usage'],
+                    'memory_usage': self.current_stats['memory_usage'],
+                    'kbps': self.current_stats['output_bitrate'],
+                    'dropped_pct': self.current_stats['dropped_pct'],
+                    'render_skipped_pct': self.current_stats['render_skipped_pct'],
+                    'frame_render_ms': self.current_stats['frame_render_ms']
+                })
+            # Fixed cadence regardless of how long the refresh took
+            next_tick += self.sample_interval
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+    
+    def _update_rates(self):
+        """Bitrate and dropped/render-skipped % between this sample's counters and the previous one's"""
+        counters = self.counters
+        if counters is None or counters is self._sampled_counters:
+            return  # refresh failed; keep the last rates
+        derived = derive(self._sampled_counters, counters)
+        self._sampled_counters = counters
+        self.current_stats['output_bitrate'] = int(round(derived['kbps']))
+        self.current_stats['dropped_pct'] = round(derived['dropped_pct'], 3)
+        self.current_stats['render_skipped_pct'] = round(derived['render_skipped_pct'], 3)
+    
+    def get_stats_history(self, seconds: Optional[float] = None, points: int = 120) -> Dict:
+        """Sampled stats for the last `seconds`, downsampled to at most `points` points"""
+        history = self.stats_history.window(seconds, points)
+        history['interval'] = self.sample_interval
+        return history
+    
+    async def set_audio_meters(self, enabled: bool) -> bool:
+        """Turn the InputVolumeMeters subscription on or off without reconnecting"""
+        self.audio_meters = enabled
+        if not self.connected or not self.ws:
+            return True  # applied on the next connect
+        try:
+            await self.ws.reidentify(self._event_subscriptions())
+        except Exception as e:
+            logger.error(f"Failed to change OBS event subscriptions: {e}")
+            return False
+        if enabled:
+            self.start_audio_meters()
+        else:
+            await self.stop_audio_meters()
+        return True
+    
+    def start_audio_meters(self):
+        """Start publishing downsampled audio levels every audio_interval seconds"""
+        if self._audio_task and not self._audio_task.done():
+            return
+        self.audio_meter.summarize()  # drop anything buffered while stopped
+        self._audio_task = asyncio.create_task(self._audio_loop(), name='obs-audio-meters')
+    
+    async def stop_audio_meters(self):
+        if self._audio_task:
+            self._audio_task.cancel()
+            try:
+                await self._audio_task
+            except asyncio.CancelledError:
+                pass
+            self._audio_task = None
+        self.audio_levels = {}
+    
+    async def _audio_loop(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.audio_interval
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            levels = self.audio_meter.summarize()
+            if not levels:
+                continue
+            self.audio_levels = levels
+            if self.audio_callback:
+                try:
+                    await self.audio_callback(levels)
+                except Exception as e:
+                    logger.error(f"Error publishing audio levels: {e}")
+    
+    def _on_input_volume_meters(self, data: Dict):
+        self.audio_meter.add(data.get('inputs', []))
+    
+    async def sync_state(self):
+        """Load the full state (stats, scene list, every scene's items) in two round trips"""
+        scene_list, = await self.execute_batch([('GetSceneList', None)])
+        await self.update_stats()
+        if scene_list is None:
+            return
+        
+        self.scenes = [scene['sceneName'] for scene in scene_list.get('scenes', [])]
+        item_lists = await self.execute_batch([
+            ('GetSceneItemList', {'sceneName': scene_name}) for scene_name in self.scenes
+        ])
+        self.scene_items = {}
+        for scene_name, response in zip(self.scenes, item_lists):
+            if response is not None:
+                self._set_scene_items(scene_name, response.get('sceneItems', []))
+    
+    def _set_scene_items(self, scene_name: str, items: List[Dict]):
+        self.scene_items[scene_name] = {
+            item['sceneItemId']: {
+                'sourceName': item.get('sourceName', ''),
+                'sceneItemEnabled': item.get('sceneItemEnabled', False)
+            }
+            for item in items
+        }
+        ids: Dict[str, int] = {}
+        for item in items:
+            # Same lookup as before the cache: first item with the name wins
+            ids.setdefault(item.get('sourceName', ''), item['sceneItemId'])
+        self.scene_item_ids[scene_name] = ids
+    
+    def _drop_scene_items(self, scene_name: str):
+        """Forget a scene's items; they are refetched on next use"""
+        self.scene_items.pop(scene_name, None)
+        self.scene_item_ids.pop(scene_name, None)
+    
+    def _rename_source(self, old_name: str, new_name: str):
+        """Follow a renamed input or nested scene in every cached scene"""
+        for scene_name, items in self.scene_items.items():
+            for item in items.values():
+                if item['sourceName'] == old_name:
+                    item['sourceName'] = new_name
+            ids = self.scene_item_ids.get(scene_name, {})
+            if old_name in ids:
+                ids[new_name] = ids.pop(old_name)
+    
+    async def get_scene_item_id(self, scene_name: str, source_name: str) -> Optional[int]:
+        """sceneItemId of a source in a scene, from the cache when possible"""
+        if await self._load_scene_items(scene_name) is None:
+            return None
+        return self.scene_item_ids.get(scene_name, {}).get(source_name)
+    
+    async def _load_scene_items(self, scene_name: str) -> Optional[Dict[int, Dict]]:
+        """Scene items from the cache, fetching the scene on a miss"""
+        items = self.scene_items.get(scene_name)
+        if items is None:
+            response = await self._execute_request('GetSceneItemList', {'sceneName': scene_name})
+            if response is None:
+                return None
+            self._set_scene_items(scene_name, response.get('sceneItems', []))
+            items = self.scene_items[scene_name]
+        return items
+    
+    def _register_event_handlers(self):
+        handlers = {
+            'CurrentProgramSceneChanged': self._on_program_scene_changed,
+            'StreamStateChanged': self._on_stream_state_changed,
+            'RecordStateChanged': self._on_record_state_changed,
+            'SceneItemEnableStateChanged': self._on_scene_item_enable_state_changed,
+            'SceneListChanged': self._on_scene_list_changed,
+            'SceneNameChanged': self._on_scene_name_changed,
+            'SceneRemoved': self._on_scene_removed,
+            'SceneItemCreated': self._on_scene_items_changed,
+            'SceneItemRemoved': self._on_scene_items_changed,
+            'SceneItemListReindexed': self._on_scene_items_changed,
+            'InputNameChanged': self._on_input_name_changed,
+        }
+        for event_type, handler in handlers.items():
+            self.ws.on(event_type, self._publishing(event_type, handler))
+        
+        # Meter events are buffered and published at audio_interval, not per event
+        async def on_volume_meters(data: Dict):
+            self._on_input_volume_meters(data)
+        self.ws.on('InputVolumeMeters', on_volume_meters)
+    
+    def _publishing(self, event_type: str, handler: Callable[[Dict], None]):
+        """Wrap a state update so the change is pushed to state_callback afterwards"""
+        async def on_event(data: Dict):
+            handler(data)
+            if self.state_callback:
+                await self.state_callback(event_type, data)
+        return on_event
+    
+    def _on_program_scene_changed(self, data: Dict):
+        self.current_stats['current_scene'] = data.get('sceneName', 'Unknown')
+    
+    def _on_stream_state_changed(self, data: Dict):
+        self.current_stats['streaming'] = data.get('outputActive', False)
+    
+    def _on_record_state_changed(self, data: Dict):
+        self.current_stats['recording'] = data.get('outputActive', False)
+    
+    def _on_scene_item_enable_state_changed(self, data: Dict):
+        item = self.scene_items.get(data.get('sceneName'), {}).get(data.get('sceneItemId'))
+        if item is not None:
+            item['sceneItemEnabled'] = data.get('sceneItemEnabled', False)
+    
+    def _on_scene_list_changed(self, data: Dict):
+        self.scenes = [scene['sceneName'] for scene in data.get('scenes', [])]
+        for scene_name in list(self.scene_items):
+            if scene_name not in self.scenes:
+                self._drop_scene_items(scene_name)
+    
+    def _on_scene_name_changed(self, data: Dict):
+        old_name, new_name = data.get('oldSceneName'), data.get('sceneName')
+        self.scenes = [new_name if scene == old_name else scene for scene in self.scenes]
+        if old_name in self.scene_items:
+            self.scene_items[new_name] = self.scene_items.pop(old_name)
+        if old_name in self.scene_item_ids:
+            self.scene_item_ids[new_name] = self.scene_item_ids.pop(old_name)
+        # Scenes can be nested in other scenes as sources
+        self._rename_source(old_name, new_name)
+        if self.current_stats['current_scene'] == old_name:
+            self.current_stats['current_scene'] = new_name
+    
+    def _on_scene_removed(self, data: Dict):
+        scene_name = data.get('sceneName')
+        self.scenes = [scene for scene in self.scenes if scene != scene_name]
+        self._drop_scene_items(scene_name)
+    
+    def _on_scene_items_changed(self, data: Dict):
+        self._drop_scene_items(data.get('sceneName'))
+    
+    def _on_input_name_changed(self, data: Dict):
+        self._rename_source(data.get('oldInputName'), data.get('inputName'))
+    
     async def start_streaming(self) -> bool:
         """Start streaming"""
         try:
-            response = await self._execute_request(requests.StartStream())
-            await self.update_stats()
+            response = await self._execute_request('StartStream')
             return response is not None
         except Exception as e:
             logger.error(f"Failed to start stream: {e}")
@@ -129,8 +552,7 @@ class OBSService:
     async def stop_streaming(self) -> bool:
         """Stop streaming"""
         try:
-            response = await self._execute_request(requests.StopStream())
-            await self.update_stats()
+            response = await self._execute_request('StopStream')
             return response is not None
         except Exception as e:
             logger.error(f"Failed to stop stream: {e}")
@@ -139,8 +561,7 @@ class OBSService:
     async def start_recording(self) -> bool:
         """Start recording"""
         try:
-            response = await self._execute_request(requests.StartRecord())
-            await self.update_stats()
+            response = await self._execute_request('StartRecord')
             return response is not None
         except Exception as e:
             logger.error(f"Failed to start recording: {e}")
@@ -149,8 +570,7 @@ class OBSService:
     async def stop_recording(self) -> bool:
         """Stop recording"""
         try:
-            response = await self._execute_request(requests.StopRecord())
-            await self.update_stats()
+            response = await self._execute_request('StopRecord')
             return response is not None
         except Exception as e:
             logger.error(f"Failed to stop recording: {e}")
@@ -158,11 +578,13 @@ class OBSService:
     
     async def get_scenes(self) -> List[str]:
         """Get list of scenes"""
+        if self.scenes:
+            return list(self.scenes)
         try:
-            response = await self._execute_request(requests.GetSceneList())
+            response = await self._execute_request('GetSceneList')
             if response:
-                scenes = response.datain.get('scenes', [])
-                return [scene['sceneName'] for scene in scenes]
+                self.scenes = [scene['sceneName'] for scene in response.get('scenes', [])]
+                return list(self.scenes)
             return []
         except Exception as e:
             logger.error(f"Failed to get scenes: {e}")
@@ -172,9 +594,11 @@ class OBSService:
         """Switch to a different scene"""
         try:
             response = await self._execute_request(
-                requests.SetCurrentProgramScene(sceneName=scene_name)
+                'SetCurrentProgramScene', {'sceneName': scene_name}
             )
-            await self.update_stats()
+            if response is not None:
+                # Don't wait for CurrentProgramSceneChanged to report the new scene
+                self.current_stats['current_scene'] = scene_name
             return response is not None
         except Exception as e:
             logger.error(f"Failed to switch scene: {e}")
@@ -186,20 +610,16 @@ class OBSService:
             if not scene_name:
                 scene_name = self.current_stats['current_scene']
             
-            response = await self._execute_request(
-                requests.GetSceneItemList(sceneName=scene_name)
-            )
+            items = await self._load_scene_items(scene_name)
+            if items is None:
+                return {}
             
-            if response:
-                items = response.datain.get('sceneItems', [])
-                sources = {}
-                for item in items:
-                    source_name = item.get('sourceName', '')
-                    enabled = item.get('sceneItemEnabled', False)
-                    if source_name:
-                        sources[source_name] = enabled
-                return sources
-            return {}
+            sources = {}
+            for item in items.values():
+                source_name = item['sourceName']
+                if source_name:
+                    sources[source_name] = item['sceneItemEnabled']
+            return sources
         except Exception as e:
             logger.error(f"Failed to get sources: {e}")
             return {}
@@ -210,38 +630,37 @@ class OBSService:
             if not scene_name:
                 scene_name = self.current_stats['current_scene']
             
-            # Get scene item ID
-            response = await self._execute_request(
-                requests.GetSceneItemList(sceneName=scene_name)
-            )
-            
-            if response:
-                items = response.datain.get('sceneItems', [])
-                item_id = None
-                for item in items:
-                    if item.get('sourceName') == source_name:
-                        item_id = item.get('sceneItemId')
-                        break
-                
-                if item_id is not None:
-                    toggle_response = await self._execute_request(
-                        requests.SetSceneItemEnabled(
-                            sceneName=scene_name,
-                            sceneItemId=item_id,
-                            sceneItemEnabled=visible
-                        )
-                    )
-                    return toggle_response is not None
+            cached = scene_name in self.scene_item_ids
+            item_id = await self.get_scene_item_id(scene_name, source_name)
+            if item_id is None:
+                return False
             
-            return False
+            toggle_response = await self._set_scene_item_enabled(scene_name, item_id, visible)
+            if toggle_response is None and cached:
+                # The cached ID may have gone stale without an event reaching us; refetch once
+                self._drop_scene_items(scene_name)
+                fresh_id = await self.get_scene_item_id(scene_name, source_name)
+                if fresh_id is not None and fresh_id != item_id:
+                    toggle_response = await self._set_scene_item_enabled(scene_name, fresh_id, visible)
+            return toggle_response is not None
         except Exception as e:
             logger.error(f"Failed to toggle source: {e}")
             return False
     
+    async def _set_scene_item_enabled(self, scene_name: str, item_id: int, visible: bool) -> Optional[Dict]:
+        return await self._execute_request(
+            'SetSceneItemEnabled',
+            {
+                'sceneName': scene_name,
+                'sceneItemId': item_id,
+                'sceneItemEnabled': visible
+            }
+        )
+    
     async def save_replay_buffer(self) -> bool:
         """Save replay buffer (if enabled)"""
         try:
-            response = await self._execute_request(requests.SaveReplayBuffer())
+            response = await self._execute_request('SaveReplayBuffer')
             return response is not None
         except Exception as e:
             logger.error(f"Failed to save replay buffer: {e}")
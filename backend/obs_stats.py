@@ -0,0 +1,168 @@
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Sampled series, in column order
+STATS_FIELDS = (
+    'fps',
+    'cpu_usage',
+    'memory_usage',
+    'kbps',
+    'dropped_pct',
+    'render_skipped_pct',
+    'frame_render_ms',
+)
+
+
+class StatsHistory:
+    """Fixed-size time series of OBS samples in preallocated NumPy arrays.
+
+    Appends overwrite the oldest row, so memory stays constant however long
+    the stream runs; reads slice the buffer and reduce it with vectorized
+    bucket means.
+    """
+
+    def __init__(self, capacity: int = 3600, fields: Sequence[str] = STATS_FIELDS):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._columns = {name: i for i, name in enumerate(self.fields)}
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._values = np.full((capacity, len(self.fields)), np.nan, dtype=np.float64)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, sample: Dict[str, float], timestamp: Optional[float] = None):
+        index = self._next
+        self._times[index] = time.time() if timestamp is None else timestamp
+        row = self._values[index]
+        for name, column in self._columns.items():
+            value = sample.get(name)
+            row[column] = np.nan if value is None else value
+        self._next = (index + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def _ordered(self):
+        """Timestamps and values, oldest first"""
+        if self._count < self.capacity:
+            return self._times[:self._count], self._values[:self._count]
+        order = np.r_[self._next:self.capacity, 0:self._next]
+        return self._times[order], self._values[order]
+
+    def window(self, seconds: Optional[float] = None, points: int = 120) -> Dict:
+        """Samples from the last `seconds` (all when None), averaged down to at most `points` buckets"""
+        times, values = self._ordered()
+        if seconds is not None and len(times):
+            start = np.searchsorted(times, times[-1] - seconds, side='left')
+            times, values = times[start:], values[start:]
+
+        points = max(1, points)
+        if len(times) > points:
+            # Equal-sized buckets; reduceat sums each one in a single pass
+            edges = np.linspace(0, len(times), points + 1).astype(np.int64)[:-1]
+            sizes = np.diff(np.append(edges, len(times)))
+            times = np.add.reduceat(times, edges) / sizes
+            valid = ~np.isnan(values)
+            sums = np.add.reduceat(np.where(valid, values, 0.0), edges, axis=0)
+            counts = np.add.reduceat(valid.astype(np.int64), edges, axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = sums / counts
+
+        return {
+            'fields': list(self.fields),
+            'timestamps': np.round(times, 3).tolist(),
+            'series': {
+                name: [None if np.isnan(v) else round(float(v), 3) for v in values[:, column]]
+                for name, column in self._columns.items()
+            }
+        }
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        if not self._count:
+            return None
+        row = self._values[(self._next - 1) % self.capacity]
+        return {name: float(row[column]) for name, column in self._columns.items()}
+
+
+# Level reported for silence (linear 0), in dBFS
+SILENCE_DB = -100.0
+
+
+def to_db(levels: np.ndarray) -> np.ndarray:
+    """Linear amplitude (0..1) to dBFS, floored at SILENCE_DB"""
+    return 20.0 * np.log10(np.maximum(levels, 10.0 ** (SILENCE_DB / 20.0)))
+
+
+class AudioMeter:
+    """Per-input audio levels downsampled from InputVolumeMeters events.
+
+    OBS reports [magnitude, peak, input peak] per channel for every input
+    about 20 times a second. Events are only buffered as they arrive;
+    summarize() reduces everything since the last call in one vectorized
+    pass per input (max of peaks, RMS of magnitudes) and starts over.
+    """
+
+    def __init__(self, max_frames: int = 200):
+        self.max_frames = max_frames
+        self._frames: Dict[str, List[np.ndarray]] = {}
+
+    def add(self, inputs: List[Dict]):
+        for entry in inputs:
+            levels = np.asarray(entry.get('inputLevelsMul') or (), dtype=np.float64)
+            if levels.ndim != 2 or levels.shape[1] < 2:
+                continue  # inputs without audio report no channels
+            frames = self._frames.setdefault(entry.get('inputName', ''), [])
+            if frames and frames[0].shape != levels.shape:
+                frames.clear()  # channel layout changed; keep only the new one
+            if len(frames) < self.max_frames:
+                frames.append(levels)
+
+    def summarize(self) -> Dict[str, Dict[str, List[float]]]:
+        """Peak and RMS per channel in dBFS for each input heard since the last call"""
+        buffered, self._frames = self._frames, {}
+        levels = {}
+        for name, frames in buffered.items():
+            if not frames:
+                continue
+            stacked = np.stack(frames)  # (frames, channels, values)
+            peak = stacked[:, :, 1].max(axis=0)
+            rms = np.sqrt(np.mean(np.square(stacked[:, :, 0]), axis=0))
+            levels[name] = {
+                'peak_db': np.round(to_db(peak), 1).tolist(),
+                'rms_db': np.round(to_db(rms), 1).tolist()
+            }
+        return levels
+
+
+def rate(current: float, previous: float, elapsed: float) -> float:
+    """Per-second rate of a cumulative counter (0 across resets, e.g. stream restart)"""
+    if elapsed <= 0 or current < previous:
+        return 0.0
+    return (current - previous) / elapsed
+
+
+def ratio_pct(part_delta: float, total_delta: float) -> float:
+    """Share of a counter delta, as a percentage"""
+    if total_delta <= 0 or part_delta < 0:
+        return 0.0
+    return 100.0 * part_delta / total_delta
+
+
+def derive(previous: Optional[Dict[str, float]], current: Dict[str, float]) -> Dict[str, float]:
+    """Bitrate, dropped-frame and render-lag percentages from two raw counter snapshots"""
+    if previous is None:
+        return {'kbps': 0.0, 'dropped_pct': 0.0, 'render_skipped_pct': 0.0}
+    elapsed = current['time'] - previous['time']
+    return {
+        'kbps': rate(current['output_bytes'], previous['output_bytes'], elapsed) * 8 / 1000,
+        'dropped_pct': ratio_pct(current['output_skipped'] - previous['output_skipped'],
+                                 current['output_total'] - previous['output_total']),
+        'render_skipped_pct': ratio_pct(current['render_skipped'] - previous['render_skipped'],
+                                        current['render_total'] - previous['render_total']),
+    }
+
@@ -0,0 +1,170 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from rate_limit import SlidingWindowLimiter
+
+logger = logging.getLogger(__name__)
+
+# Lower value = sent first
+PRIORITY_HIGH = 0     # moderator notices, replies to mods
+PRIORITY_NORMAL = 1   # regular command replies
+PRIORITY_LOW = 2      # fluff (!grwm, !help)
+
+
+class _Pending:
+    __slots__ = ('text', 'priority', 'enqueued_at', 'merged', 'cancelled', 'attempts')
+
+    def __init__(self, text: str, priority: int):
+        self.text = text
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.merged = 0
+        self.cancelled = False
+        self.attempts = 0
+
+
+class OutboundChatQueue:
+    """Prioritized, rate-limited queue for outgoing chat messages.
+
+    A single worker sends one message at a time within the limiter's budget.
+    Queuing text that is already pending merges into the pending message
+    (promoting it if the new request has higher priority) instead of
+    sending it twice.
+
+    A failed send is requeued after retry_delay seconds, up to max_retries
+    times, then dropped, so delivery is best effort (at most max_retries + 1
+    attempts). Every attempt spends a rate-limit slot, since a write that
+    failed may still have reached Twitch.
+    """
+
+    def __init__(self, send: Callable[[str], Awaitable[bool]], limiter: SlidingWindowLimiter,
+                 max_pending: int = 100, max_retries: int = 2, retry_delay: float = 1.0):
+        self.send = send
+        self.limiter = limiter
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._pending: Dict[str, _Pending] = {}
+        self._counter = itertools.count()
+        self._worker: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.sent = 0
+        self.merged = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retried = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+
+    def start(self):
+        if self._worker and not self._worker.done():
+            return
+        self._worker = asyncio.create_task(self._run(), name='outbound-chat')
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def enqueue(self, text: str, priority: int = PRIORITY_NORMAL) -> bool:
+        """Queue a message. Returns False if it was merged into a pending one or dropped."""
+        existing = self._pending.get(text)
+        if existing is not None:
+            self.merged += 1
+            existing.merged += 1
+            if priority < existing.priority:
+                # Re-queue at the higher priority, keeping the original enqueue time
+                existing.cancelled = True
+                promoted = _Pending(text, priority)
+                promoted.enqueued_at = existing.enqueued_at
+                promoted.merged = existing.merged
+                self._pending[text] = promoted
+                self._queue.put_nowait((priority, next(self._counter), promoted))
+            return False
+
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            logger.warning(f"Outbound chat queue full; dropping message: {text}")
+            return False
+
+        entry = _Pending(text, priority)
+        self._pending[text] = entry
+        self._queue.put_nowait((priority, next(self._counter), entry))
+        self.start()
+        return True
+
+    async def _run(self):
+        while True:
+            # Wait for budget before taking a message off the queue, so messages
+            # queued (or promoted) meanwhile still compete on priority
+            while self.limiter.available <= 0:
+                await asyncio.sleep(self.limiter.time_until_available())
+            _, _, entry = await self._queue.get()
+            if entry.cancelled:
+                continue
+            if not self.limiter.try_acquire():
+                # Budget spent elsewhere since the check; put it back and wait again
+                self._queue.put_nowait((entry.priority, next(self._counter), entry))
+                continue
+            if self._pending.get(entry.text) is entry:
+                del self._pending[entry.text]
+
+            try:
+                ok = await self.send(entry.text)
+            except Exception as e:
+                logger.error(f"Error sending chat message: {e}")
+                ok = False
+
+            if not ok:
+                self._retry(entry)
+                continue
+
+            latency = time.monotonic() - entry.enqueued_at
+            self.sent += 1
+            self.last_latency = latency
+            self._total_latency += latency
+            if latency > self.max_latency:
+                self.max_latency = latency
+
+    def _retry(self, entry: _Pending):
+        entry.attempts += 1
+        if entry.attempts > self.max_retries:
+            self.failed += 1
+            logger.warning(f"Giving up on chat message after {entry.attempts} attempts: {entry.text}")
+            return
+        if entry.text in self._pending:
+            # Queued again meanwhile; that copy goes out instead
+            self._pending[entry.text].merged += 1
+            return
+        self.retried += 1
+        self._pending[entry.text] = entry
+        asyncio.get_running_loop().call_later(
+            self.retry_delay, self._queue.put_nowait, (entry.priority, next(self._counter), entry)
+        )
+
+    def get_metrics(self) -> Dict:
+        """Queue state and delivery latency (enqueue to socket write)"""
+        return {
+            'pending': len(self._pending),
+            'sent': self.sent,
+            'merged': self.merged,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'retried': self.retried,
+            'budget_available': self.limiter.available,
+            'latency_ms': {
+                'last': round(self.last_latency * 1000, 2),
+                'avg': round(self._total_latency / self.sent * 1000, 2) if self.sent else 0.0,
+                'max': round(self.max_latency * 1000, 2)
+            }
+        }
@@ -0,0 +1,55 @@
+import asyncio
+import time
+from collections import deque
+
+
+class SlidingWindowLimiter:
+    """Allow at most `limit` events in any `period`-second window.
+
+    Twitch counts chat JOINs and PRIVMSGs over a rolling window, so this is
+    stricter than a continuously refilling bucket, which could let almost
+    twice the limit through when a burst straddles a refill.
+    """
+
+    def __init__(self, limit: int, period: float):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+        self.period = period
+        self._events: deque = deque()
+        self._lock = asyncio.Lock()
+
+    def _prune(self, now: float):
+        cutoff = now - self.period
+        events = self._events
+        while events and events[0] <= cutoff:
+            events.popleft()
+
+    @property
+    def available(self) -> int:
+        """Events that could happen right now without waiting"""
+        self._prune(time.monotonic())
+        return self.limit - len(self._events)
+
+    def time_until_available(self) -> float:
+        """Seconds until the next event is allowed (0 if allowed now)"""
+        now = time.monotonic()
+        self._prune(now)
+        if len(self._events) < self.limit:
+            return 0.0
+        return max(0.0, self._events[0] + self.period - now)
+
+    def try_acquire(self) -> bool:
+        """Record an event if the window has room; never waits"""
+        now = time.monotonic()
+        self._prune(now)
+        if len(self._events) < self.limit:
+            self._events.append(now)
+            return True
+        return False
+
+    async def acquire(self):
+        """Wait until the window has room, then record an event"""
+        async with self._lock:
+            while not self.try_acquire():
+                await asyncio.sleep(self.time_until_available())
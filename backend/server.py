@@ -7,23 +7,30 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
 import random
 import asyncio
 from contextlib import asynccontextmanager
-import httpx
 import json
 
 from twitch_service import twitch_service
 from obs_service import obs_service
+from obs_macros import macro_store
+from stream_watchdog import create_watchdog
 from irc_chat_service import irc_chat
+from irc_pool import irc_pool
 from oauth_database import TokenData, create_db_and_tables, get_session
 from sqlmodel import Session
 from oauth_service import oauth_service
+from helix_client import helix, BACKGROUND, PRIORITY_BACKGROUND
+from token_manager import token_manager
+from user_cache import user_cache
+from bulk_lookup import bulk_lookup
 from discord_service import discord_manager
 from chat_bot_service import chat_bot
+from websocket_manager import manager, parse_topics
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -33,6 +40,9 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Stream health watchdog (None unless STREAM_WATCHDOG_FALLBACK_SCENE is set)
+stream_watchdog = create_watchdog(obs_service)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -40,31 +50,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-    
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"WebSocket connected. Total: {len(self.active_connections)}")
-    
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            logger.info(f"WebSocket disconnected. Total: {len(self.active_connections)}")
-    
-    async def broadcast(self, data: dict):
-        """Broadcast message to all connected clients"""
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(data)
-            except Exception as e:
-                logger.error(f"Error broadcasting: {e}")
-
-manager = ConnectionManager()
-
 # Lifespan management
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -74,6 +59,9 @@ async def lifespan(app: FastAPI):
     create_db_and_tables()
     logger.info("OAuth database initialized")
     
+    # Keep the OAuth token in memory and refresh it ahead of expiry
+    await token_manager.start()
+    
     try:
         logger.info("Starting Twitch integration...")
         await twitch_service.initialize()
@@ -94,7 +82,31 @@ async def lifespan(app: FastAPI):
     # Start OBS integration
     try:
         logger.info("Starting OBS integration...")
+        
+        # Push OBS state changes to WebSocket clients as they happen
+        async def on_obs_state(event_type, data):
+            await manager.broadcast({
+                'type': 'obs_state',
+                'event': event_type,
+                'data': data,
+                'stats': obs_service.current_stats.copy()
+            })
+        
+        obs_service.set_state_callback(on_obs_state)
+        
+        # Downsampled audio levels; only clients subscribed to audio_levels receive them
+        async def on_audio_levels(levels):
+            await manager.broadcast({'type': 'audio_levels', 'data': levels})
+        
+        obs_service.set_audio_callback(on_audio_levels)
         await obs_service.connect()
+        
+        if stream_watchdog:
+            async def on_stream_health(alert):
+                await manager.broadcast({'type': 'stream_health_alert', 'data': alert})
+            
+            stream_watchdog.set_alert_callback(on_stream_health)
+            stream_watchdog.start()
         logger.info("OBS integration started successfully")
     except Exception as e:
         logger.error(f"Failed to start OBS integration: {e}")
@@ -107,10 +119,8 @@ async def lifespan(app: FastAPI):
         async def on_irc_message(msg):
             await manager.broadcast({'type': 'chat_message', 'data': msg})
             
-            # Process message for bot commands
-            response = await chat_bot.process_message(msg)
-            if response:
-                await chat_bot.send_message(response)
+            # Process message for bot commands (replies go through the rate-limited sender)
+            await chat_bot.handle_message(msg)
         
         irc_chat.set_message_callback(on_irc_message)
         
@@ -118,32 +128,53 @@ async def lifespan(app: FastAPI):
         irc_chat.set_emote_service(twitch_service)
         
         # Try to get OAuth token for authenticated IRC (to send messages)
-        try:
-            from sqlmodel import select
-            with next(get_session()) as session:
-                token_data = session.exec(select(TokenData)).first()
-                if token_data and token_data.access_token:
-                    irc_chat.set_oauth_token(token_data.access_token)
-                    logger.info("IRC chat configured with authenticated access")
-                else:
-                    logger.warning("No OAuth token found. Bot will run in read-only mode.")
-        except Exception as e:
-            logger.warning(f"Could not get OAuth token for IRC: {e}. Bot will run in read-only mode.")
+        token_data = await token_manager.get_token()
+        if token_data and token_data.access_token:
+            irc_chat.set_oauth_token(token_data.access_token)
+            logger.info("IRC chat configured with authenticated access")
+        else:
+            logger.warning("No OAuth token found. Bot will run in read-only mode.")
+        
+        # Reconnects pick up the refreshed token
+        async def on_token_refreshed(token):
+            irc_chat.set_oauth_token(token.access_token)
+        
+        token_manager.set_refresh_callback(on_token_refreshed)
         
         # Configure chat bot
         chat_bot.set_discord_manager(discord_manager)
         chat_bot.set_irc_chat(irc_chat)
         
-        # Start IRC in background
-        asyncio.create_task(irc_chat.connect())
+        # WebSocket clients too far behind to replay get recent chat instead
+        manager.set_snapshot_provider(lambda: {'chat': irc_chat.get_recent_messages(limit=50)})
+        
+        # Start IRC connection supervisor in background
+        await irc_chat.start()
         
         logger.info("IRC chat integration started")
     except Exception as e:
         logger.error(f"Failed to start IRC chat: {e}")
     
+    # Start pooled IRC connections for additional channels (co-streams, raid targets)
+    try:
+        async def on_pool_message(msg):
+            await manager.broadcast({'type': 'channel_chat_message', 'channel': msg['channel'], 'data': msg})
+        
+        irc_pool.set_message_callback(on_pool_message)
+        irc_pool.set_emote_service(twitch_service)
+        
+        extra_channels = [c for c in os.getenv('TWITCH_EXTRA_CHANNELS', '').split(',') if c.strip()]
+        for channel in extra_channels:
+            await irc_pool.add_channel(channel)
+        if extra_channels:
+            logger.info(f"IRC pool following {len(extra_channels)} extra channels")
+    except Exception as e:
+        logger.error(f"Failed to start IRC pool: {e}")
+    
     # Start Discord bot
     try:
         logger.info("Starting Discord integration...")
+        discord_manager.set_queue_callback(publish_queue_update)
         asyncio.create_task(discord_manager.start())
         logger.info("Discord bot started")
     except Exception as e:
@@ -154,9 +185,16 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down integrations...")
     await twitch_service.stop()
+    if stream_watchdog:
+        await stream_watchdog.stop()
     await obs_service.disconnect()
     await irc_chat.disconnect()
+    await irc_pool.stop()
+    await chat_bot.stop()
     await discord_manager.stop()
+    await manager.close_all()
+    await token_manager.stop()
+    await helix.close()
     logger.info("Shutdown complete")
 
 # Create the main app
@@ -205,6 +243,17 @@ class StreamCategoryUpdate(BaseModel):
 class StreamTagsUpdate(BaseModel):
     tags: List[str]
 
+class OBSMacro(BaseModel):
+    steps: List[Dict[str, Any]]
+    description: Optional[str] = None
+    halt_on_failure: bool = False
+
+class AudioMetersToggle(BaseModel):
+    enabled: bool
+
+class ChannelJoin(BaseModel):
+    channel: str
+
 # Music Queue Models
 class MusicSubmission(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -247,9 +296,16 @@ obs_state = {
 async def root():
     return {"message": "Kallie's Dashboard API - Twitch Connected"}
 
+async def require_token() -> TokenData:
+    """Active OAuth token for Helix calls (401 when not logged in or it could not be refreshed)"""
+    token_data = await token_manager.get_token()
+    if not token_data:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return token_data
+
 # Twitch Real Endpoints
 @api_router.get("/twitch/stats")
-async def get_twitch_stats(session: Session = Depends(get_session)):
+async def get_twitch_stats():
     """Get real Twitch stream stats"""
     try:
         stream_info = await twitch_service.get_stream_info()
@@ -258,42 +314,23 @@ async def get_twitch_stats(session: Session = Depends(get_session)):
         
         # Try to get subscriber count if authenticated
         subscriber_count = 487  # Default mock
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
+        token_data = await token_manager.get_token()
         
         if token_data:
-            # Refresh token if needed (make expires_at timezone-aware if needed)
-            expires_at = token_data.expires_at
-            if expires_at.tzinfo is None:
-                expires_at = expires_at.replace(tzinfo=timezone.utc)
-            
-            if expires_at < datetime.now(timezone.utc):
-                try:
-                    new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-                    token_data.access_token = new_token_response['access_token']
-                    token_data.refresh_token = new_token_response['refresh_token']
-                    token_data.expires_at = datetime.now(timezone.utc) + timedelta(
-                        seconds=new_token_response.get('expires_in', 3600)
-                    )
-                    session.add(token_data)
-                    session.commit()
-                except Exception as e:
-                    logger.error(f"Failed to refresh token: {e}")
-                    pass
-            
             # Try to get real subscriber count
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(
-                        f"https://api.twitch.tv/helix/subscriptions?broadcaster_id={token_data.user_id}&first=1",
-                        headers={
-                            'Authorization': f'Bearer {token_data.access_token}',
-                            'Client-ID': os.getenv('TWITCH_CLIENT_ID')
-                        }
-                    )
-                    if response.status_code == 200:
-                        data = response.json()
-                        subscriber_count = data.get('total', 487)
+                client = helix.client
+                response = await client.get(
+                    f"https://api.twitch.tv/helix/subscriptions?broadcaster_id={token_data.user_id}&first=1",
+                    headers={
+                        'Authorization': f'Bearer {token_data.access_token}',
+                        'Client-ID': os.getenv('TWITCH_CLIENT_ID')
+                    },
+                    extensions=BACKGROUND  # polled by the dashboard; mod actions go first
+                )
+                if response.status_code == 200:
+                    data = response.json()
+                    subscriber_count = data.get('total', 487)
             except Exception as e:
                 logger.error(f"Failed to get subscriber count: {e}")
         
@@ -329,11 +366,65 @@ async def get_twitch_stats(session: Session = Depends(get_session)):
         }
 
 @api_router.get("/twitch/chat")
-async def get_chat_messages():
-    """Get recent chat messages from IRC"""
-    messages = irc_chat.get_recent_messages()
+async def get_chat_messages(limit: int = 50, since: Optional[int] = None, since_id: Optional[str] = None):
+    """Get recent chat messages from IRC (newest first).
+    
+    Pass `since` (a message `seq`) or `since_id` (a message `id`) to only
+    receive messages that arrived after it.
+    """
+    limit = max(1, min(limit, irc_chat.history.capacity))
+    messages = irc_chat.get_recent_messages(limit=limit, since=since, since_id=since_id)
     return messages
 
+@api_router.get("/twitch/chat/metrics")
+async def get_chat_metrics():
+    """IRC chat metrics (connection, inbound pipeline, outbound bot queue)"""
+    metrics = irc_chat.get_metrics()
+    metrics['outbound'] = chat_bot.get_metrics()
+    return metrics
+
+@api_router.get("/twitch/channels")
+async def get_pooled_channels():
+    """Additional channels followed through the IRC connection pool"""
+    return {"channels": irc_pool.get_channels()}
+
+@api_router.post("/twitch/channels")
+async def join_pooled_channel(request: ChannelJoin):
+    """Start following another channel's chat"""
+    if not await irc_pool.add_channel(request.channel):
+        raise HTTPException(status_code=429, detail="IRC connection pool is full")
+    return {"success": True, "channels": irc_pool.get_channels()}
+
+@api_router.delete("/twitch/channels/{channel}")
+async def leave_pooled_channel(channel: str):
+    """Stop following a pooled channel"""
+    if not await irc_pool.remove_channel(channel):
+        raise HTTPException(status_code=404, detail="Channel not joined")
+    return {"success": True, "channels": irc_pool.get_channels()}
+
+@api_router.get("/twitch/users/metrics")
+async def get_user_cache_metrics():
+    """Login/user ID cache metrics (size, hit rate, Helix lookups)"""
+    return user_cache.get_metrics()
+
+@api_router.get("/twitch/helix/metrics")
+async def get_helix_metrics():
+    """Helix scheduler metrics (per-token bucket, delays, 429 retries)"""
+    return helix.get_metrics()
+
+@api_router.get("/twitch/channels/metrics")
+async def get_pool_metrics():
+    """IRC connection pool metrics"""
+    return irc_pool.get_metrics()
+
+@api_router.get("/twitch/channels/{channel}/chat")
+async def get_pooled_chat(channel: str, limit: int = 50, since: Optional[int] = None, since_id: Optional[str] = None):
+    """Recent chat for a pooled channel (newest first)"""
+    if not irc_pool.has_channel(channel):
+        raise HTTPException(status_code=404, detail="Channel not joined")
+    limit = max(1, min(limit, 1000))
+    return irc_pool.get_recent_messages(channel, limit=limit, since=since, since_id=since_id)
+
 @api_router.get("/twitch/emotes")
 async def get_emotes():
     """Get channel and global emote cache"""
@@ -360,297 +451,234 @@ async def find_matching_twitch_user(discord_username: str):
         }
     return {'matched': False, 'twitch_username': None}
 
+class BulkLoginsRequest(BaseModel):
+    logins: List[str]
+
+class BulkDiscordUsersRequest(BaseModel):
+    discord_usernames: List[str]
+
+@api_router.post("/twitch/users/bulk")
+async def get_users_bulk(request: BulkLoginsRequest):
+    """Resolve many logins at once (100 per helix/users call; null for unknown logins)"""
+    token_data = await require_token()
+    try:
+        users = await user_cache.get_users(request.logins, token_data.access_token, PRIORITY_BACKGROUND)
+        return {'users': users, 'count': sum(1 for user in users.values() if user)}
+    except Exception as e:
+        logger.error(f"Error resolving users in bulk: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/twitch/subscriptions/bulk")
+async def get_subscriptions_bulk(request: BulkLoginsRequest):
+    """Subscription status and tier for many logins (100 per helix/subscriptions call)"""
+    token_data = await require_token()
+    try:
+        subs = await bulk_lookup.get_user_subscriptions(request.logins, token_data.user_id, token_data.access_token)
+        return {'subscriptions': subs}
+    except Exception as e:
+        logger.error(f"Error checking subscriptions in bulk: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/twitch/find-users/bulk")
+async def find_matching_twitch_users(request: BulkDiscordUsersRequest):
+    """Auto-match many Discord usernames to Twitch users, with their sub status"""
+    token_data = await require_token()
+    try:
+        matches = await bulk_lookup.find_matching_users(request.discord_usernames, token_data.access_token)
+        subs = await bulk_lookup.get_subscriptions(
+            [user['id'] for user in matches.values() if user], token_data.user_id, token_data.access_token
+        )
+        return {'matches': {
+            name: {'matched': True, 'twitch_username': user['login'], 'subscription': subs[user['id']]}
+            if user else {'matched': False, 'twitch_username': None}
+            for name, user in matches.items()
+        }}
+    except Exception as e:
+        logger.error(f"Error matching Twitch users in bulk: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/twitch/bulk/metrics")
+async def get_bulk_lookup_metrics():
+    """Bulk user/subscription lookup metrics"""
+    return bulk_lookup.get_metrics()
+
 @api_router.post("/twitch/title")
-async def update_stream_title(update: StreamTitleUpdate, session: Session = Depends(get_session)):
+async def update_stream_title(update: StreamTitleUpdate):
     """Update stream title using OAuth"""
-    from sqlmodel import select
-    token_data = session.exec(select(TokenData)).first()
-    
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Refresh token if needed (make expires_at timezone-aware if needed)
-    expires_at = token_data.expires_at
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    
-    if expires_at < datetime.now(timezone.utc):
-        try:
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.refresh_token = new_token_response['refresh_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(
-                seconds=new_token_response.get('expires_in', 3600)
-            )
-            session.add(token_data)
-            session.commit()
-        except:
-            raise HTTPException(status_code=401, detail="Token refresh failed")
+    token_data = await require_token()
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(
-                f"https://api.twitch.tv/helix/channels?broadcaster_id={token_data.user_id}",
-                headers={
-                    'Authorization': f'Bearer {token_data.access_token}',
-                    'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                    'Content-Type': 'application/json'
-                },
-                json={"title": update.title}
-            )
-            
-            if response.status_code == 204:
-                return {"success": True, "title": update.title}
-            else:
-                return {"success": False, "error": "Failed to update title"}
+        client = helix.client
+        response = await client.patch(
+            f"https://api.twitch.tv/helix/channels?broadcaster_id={token_data.user_id}",
+            headers={
+                'Authorization': f'Bearer {token_data.access_token}',
+                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
+                'Content-Type': 'application/json'
+            },
+            json={"title": update.title}
+        )
+        
+        if response.status_code == 204:
+            return {"success": True, "title": update.title}
+        else:
+            return {"success": False, "error": "Failed to update title"}
     except Exception as e:
         logger.error(f"Failed to update stream title: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/category")
-async def update_stream_category(update: StreamCategoryUpdate, session: Session = Depends(get_session)):
+async def update_stream_category(update: StreamCategoryUpdate):
     """Update stream category using OAuth"""
-    from sqlmodel import select
-    token_data = session.exec(select(TokenData)).first()
-    
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Refresh token if needed
-    expires_at = token_data.expires_at
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    
-    if expires_at < datetime.now(timezone.utc):
-        try:
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.refresh_token = new_token_response['refresh_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(
-                seconds=new_token_response.get('expires_in', 3600)
-            )
-            session.add(token_data)
-            session.commit()
-        except:
-            raise HTTPException(status_code=401, detail="Token refresh failed")
+    token_data = await require_token()
     
     try:
         # First, search for the game/category ID
-        async with httpx.AsyncClient() as client:
-            # Search for the category
-            search_response = await client.get(
-                f"https://api.twitch.tv/helix/search/categories?query={update.category}",
-                headers={
-                    'Authorization': f'Bearer {token_data.access_token}',
-                    'Client-ID': os.getenv('TWITCH_CLIENT_ID')
-                }
-            )
-            
-            if search_response.status_code != 200:
-                return {"success": False, "error": "Failed to find category"}
-            
-            categories = search_response.json().get('data', [])
-            if not categories:
-                return {"success": False, "error": f"Category '{update.category}' not found"}
-            
-            # Get the first matching category ID
-            game_id = categories[0]['id']
-            
-            # Update the stream category
-            update_response = await client.patch(
-                f"https://api.twitch.tv/helix/channels?broadcaster_id={token_data.user_id}",
-                headers={
-                    'Authorization': f'Bearer {token_data.access_token}',
-                    'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                    'Content-Type': 'application/json'
-                },
-                json={"game_id": game_id}
-            )
-            
-            if update_response.status_code == 204:
-                return {"success": True, "category": update.category}
-            else:
-                return {"success": False, "error": "Failed to update category"}
+        client = helix.client
+        # Search for the category
+        search_response = await client.get(
+            f"https://api.twitch.tv/helix/search/categories?query={update.category}",
+            headers={
+                'Authorization': f'Bearer {token_data.access_token}',
+                'Client-ID': os.getenv('TWITCH_CLIENT_ID')
+            }
+        )
+        
+        if search_response.status_code != 200:
+            return {"success": False, "error": "Failed to find category"}
+        
+        categories = search_response.json().get('data', [])
+        if not categories:
+            return {"success": False, "error": f"Category '{update.category}' not found"}
+        
+        # Get the first matching category ID
+        game_id = categories[0]['id']
+        
+        # Update the stream category
+        update_response = await client.patch(
+            f"https://api.twitch.tv/helix/channels?broadcaster_id={token_data.user_id}",
+            headers={
+                'Authorization': f'Bearer {token_data.access_token}',
+                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
+                'Content-Type': 'application/json'
+            },
+            json={"game_id": game_id}
+        )
+        
+        if update_response.status_code == 204:
+            return {"success": True, "category": update.category}
+        else:
+            return {"success": False, "error": "Failed to update category"}
     except Exception as e:
         logger.error(f"Failed to update stream category: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.get("/twitch/tags")
-async def get_stream_tags(session: Session = Depends(get_session)):
+async def get_stream_tags():
     """Get current stream tags"""
-    from sqlmodel import select
-    token_data = session.exec(select(TokenData)).first()
-    
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+    token_data = await require_token()
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"https://api.twitch.tv/helix/channels?broadcaster_id={token_data.user_id}",
-                headers={
-                    'Authorization': f'Bearer {token_data.access_token}',
-                    'Client-ID': os.getenv('TWITCH_CLIENT_ID')
-                }
-            )
-            
-            if response.status_code == 200:
-                data = response.json().get('data', [])
-                if data:
-                    tags = data[0].get('tags', [])
-                    return {"success": True, "tags": tags}
-            
-            return {"success": False, "tags": []}
+        client = helix.client
+        response = await client.get(
+            f"https://api.twitch.tv/helix/channels?broadcaster_id={token_data.user_id}",
+            headers={
+                'Authorization': f'Bearer {token_data.access_token}',
+                'Client-ID': os.getenv('TWITCH_CLIENT_ID')
+            }
+        )
+        
+        if response.status_code == 200:
+            data = response.json().get('data', [])
+            if data:
+                tags = data[0].get('tags', [])
+                return {"success": True, "tags": tags}
+        
+        return {"success": False, "tags": []}
     except Exception as e:
         logger.error(f"Failed to get stream tags: {e}")
         return {"success": False, "tags": [], "error": str(e)}
 
 @api_router.post("/twitch/tags")
-async def update_stream_tags(update: StreamTagsUpdate, session: Session = Depends(get_session)):
+async def update_stream_tags(update: StreamTagsUpdate):
     """Update stream tags using OAuth"""
-    from sqlmodel import select
-    token_data = session.exec(select(TokenData)).first()
-    
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Refresh token if needed
-    expires_at = token_data.expires_at
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    
-    if expires_at < datetime.now(timezone.utc):
-        try:
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.refresh_token = new_token_response['refresh_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(
-                seconds=new_token_response.get('expires_in', 3600)
-            )
-            session.add(token_data)
-            session.commit()
-        except:
-            raise HTTPException(status_code=401, detail="Token refresh failed")
+    token_data = await require_token()
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Twitch API allows up to 10 tags, each max 25 characters
-            tags = [tag[:25] for tag in update.tags[:10]]
-            
-            response = await client.patch(
-                f"https://api.twitch.tv/helix/channels?broadcaster_id={token_data.user_id}",
-                headers={
-                    'Authorization': f'Bearer {token_data.access_token}',
-                    'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                    'Content-Type': 'application/json'
-                },
-                json={"tags": tags}
-            )
-            
-            if response.status_code == 204:
-                return {"success": True, "tags": tags}
-            else:
-                return {"success": False, "error": "Failed to update tags"}
+        client = helix.client
+        # Twitch API allows up to 10 tags, each max 25 characters
+        tags = [tag[:25] for tag in update.tags[:10]]
+        
+        response = await client.patch(
+            f"https://api.twitch.tv/helix/channels?broadcaster_id={token_data.user_id}",
+            headers={
+                'Authorization': f'Bearer {token_data.access_token}',
+                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
+                'Content-Type': 'application/json'
+            },
+            json={"tags": tags}
+        )
+        
+        if response.status_code == 204:
+            return {"success": True, "tags": tags}
+        else:
+            return {"success": False, "error": "Failed to update tags"}
     except Exception as e:
         logger.error(f"Failed to update stream tags: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/marker")
-async def create_marker(session: Session = Depends(get_session)):
+async def create_marker():
     """Create stream marker using OAuth"""
-    from sqlmodel import select
-    token_data = session.exec(select(TokenData)).first()
-    
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Refresh token if needed (make expires_at timezone-aware if needed)
-    expires_at = token_data.expires_at
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    
-    if expires_at < datetime.now(timezone.utc):
-        try:
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.refresh_token = new_token_response['refresh_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(
-                seconds=new_token_response.get('expires_in', 3600)
-            )
-            session.add(token_data)
-            session.commit()
-        except:
-            raise HTTPException(status_code=401, detail="Token refresh failed")
+    token_data = await require_token()
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.twitch.tv/helix/streams/markers",
-                headers={
-                    'Authorization': f'Bearer {token_data.access_token}',
-                    'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
-                    'Content-Type': 'application/json'
-                },
-                json={"user_id": token_data.user_id, "description": "Dashboard marker"}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {"success": True, "message": "Stream marker created", "data": data}
-            else:
-                return {"success": False, "error": "Failed to create marker"}
+        client = helix.client
+        response = await client.post(
+            "https://api.twitch.tv/helix/streams/markers",
+            headers={
+                'Authorization': f'Bearer {token_data.access_token}',
+                'Client-ID': os.getenv('TWITCH_CLIENT_ID'),
+                'Content-Type': 'application/json'
+            },
+            json={"user_id": token_data.user_id, "description": "Dashboard marker"}
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            return {"success": True, "message": "Stream marker created", "data": data}
+        else:
+            return {"success": False, "error": "Failed to create marker"}
     except Exception as e:
         logger.error(f"Failed to create marker: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/clip")
-async def create_twitch_clip(session: Session = Depends(get_session)):
+async def create_twitch_clip():
     """Create a Twitch clip using OAuth"""
-    from sqlmodel import select
-    token_data = session.exec(select(TokenData)).first()
-    
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Refresh token if needed (make expires_at timezone-aware if needed)
-    expires_at = token_data.expires_at
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    
-    if expires_at < datetime.now(timezone.utc):
-        try:
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.refresh_token = new_token_response['refresh_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(
-                seconds=new_token_response.get('expires_in', 3600)
-            )
-            session.add(token_data)
-            session.commit()
-        except:
-            raise HTTPException(status_code=401, detail="Token refresh failed")
+    token_data = await require_token()
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://api.twitch.tv/helix/clips?broadcaster_id={token_data.user_id}",
-                headers={
-                    'Authorization': f'Bearer {token_data.access_token}',
-                    'Client-ID': os.getenv('TWITCH_CLIENT_ID')
-                }
-            )
-            
-            if response.status_code == 202:
-                data = response.json()
-                clip_data = data.get('data', [{}])[0]
-                return {
-                    "success": True,
-                    "message": "Clip created!",
-                    "clip_id": clip_data.get('id'),
-                    "edit_url": clip_data.get('edit_url')
-                }
-            else:
-                return {"success": False, "error": "Failed to create clip"}
+        client = helix.client
+        response = await client.post(
+            f"https://api.twitch.tv/helix/clips?broadcaster_id={token_data.user_id}",
+            headers={
+                'Authorization': f'Bearer {token_data.access_token}',
+                'Client-ID': os.getenv('TWITCH_CLIENT_ID')
+            }
+        )
+        
+        if response.status_code == 202:
+            data = response.json()
+            clip_data = data.get('data', [{}])[0]
+            return {
+                "success": True,
+                "message": "Clip created!",
+                "clip_id": clip_data.get('id'),
+                "edit_url": clip_data.get('edit_url')
+            }
+        else:
+            return {"success": False, "error": "Failed to create clip"}
     except Exception as e:
         logger.error(f"Failed to create clip: {e}")
         return {"success": False, "error": str(e)}
@@ -661,23 +689,10 @@ async def get_alerts():
     return []
 
 @api_router.post("/twitch/ad")
-async def run_ad(duration: dict, session: Session = Depends(get_session)):
+async def run_ad(duration: dict):
     """Run a Twitch ad"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         # Run ad using Twitch API
         headers = {
@@ -686,15 +701,15 @@ async def run_ad(duration: dict, session: Session = Depends(get_session)):
             'Content-Type': 'application/json'
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://api.twitch.tv/helix/channels/commercial",
-                headers=headers,
-                json={
-                    "broadcaster_id": token_data.user_id,
-                    "length": duration.get('duration', 30)
-                }
-            )
+        client = helix.client
+        response = await client.post(
+            f"https://api.twitch.tv/helix/channels/commercial",
+            headers=headers,
+            json={
+                "broadcaster_id": token_data.user_id,
+                "length": duration.get('duration', 30)
+            }
+        )
         
         if response.status_code == 200:
             return {"success": True, "message": f"Ad started ({duration.get('duration')}s)"}
@@ -705,23 +720,10 @@ async def run_ad(duration: dict, session: Session = Depends(get_session)):
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/poll")
-async def create_poll(poll_data: dict, session: Session = Depends(get_session)):
+async def create_poll(poll_data: dict):
     """Create a Twitch poll"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         headers = {
             'Authorization': f'Bearer {token_data.access_token}',
@@ -729,17 +731,17 @@ async def create_poll(poll_data: dict, session: Session = Depends(get_session)):
             'Content-Type': 'application/json'
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.twitch.tv/helix/polls",
-                headers=headers,
-                json={
-                    "broadcaster_id": token_data.user_id,
-                    "title": poll_data.get('title', 'New Poll'),
-                    "choices": poll_data.get('choices', [{"title": "Yes"}, {"title": "No"}]),
-                    "duration": poll_data.get('duration', 60)
-                }
-            )
+        client = helix.client
+        response = await client.post(
+            "https://api.twitch.tv/helix/polls",
+            headers=headers,
+            json={
+                "broadcaster_id": token_data.user_id,
+                "title": poll_data.get('title', 'New Poll'),
+                "choices": poll_data.get('choices', [{"title": "Yes"}, {"title": "No"}]),
+                "duration": poll_data.get('duration', 60)
+            }
+        )
         
         if response.status_code == 200:
             return {"success": True, "message": "Poll created"}
@@ -750,23 +752,10 @@ async def create_poll(poll_data: dict, session: Session = Depends(get_session)):
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/prediction")
-async def create_prediction(prediction_data: dict, session: Session = Depends(get_session)):
+async def create_prediction(prediction_data: dict):
     """Create a Twitch prediction"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         headers = {
             'Authorization': f'Bearer {token_data.access_token}',
@@ -774,17 +763,17 @@ async def create_prediction(prediction_data: dict, session: Session = Depends(ge
             'Content-Type': 'application/json'
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.twitch.tv/helix/predictions",
-                headers=headers,
-                json={
-                    "broadcaster_id": token_data.user_id,
-                    "title": prediction_data.get('title', 'New Prediction'),
-                    "outcomes": prediction_data.get('outcomes', [{"title": "Yes"}, {"title": "No"}]),
-                    "prediction_window": prediction_data.get('prediction_window', 120)
-                }
-            )
+        client = helix.client
+        response = await client.post(
+            "https://api.twitch.tv/helix/predictions",
+            headers=headers,
+            json={
+                "broadcaster_id": token_data.user_id,
+                "title": prediction_data.get('title', 'New Prediction'),
+                "outcomes": prediction_data.get('outcomes', [{"title": "Yes"}, {"title": "No"}]),
+                "prediction_window": prediction_data.get('prediction_window', 120)
+            }
+        )
         
         if response.status_code == 200:
             return {"success": True, "message": "Prediction created"}
@@ -795,23 +784,10 @@ async def create_prediction(prediction_data: dict, session: Session = Depends(ge
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/shoutout")
-async def shoutout_streamer(shoutout_data: dict, session: Session = Depends(get_session)):
+async def shoutout_streamer(shoutout_data: dict):
     """Send a shoutout to another streamer"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         headers = {
             'Authorization': f'Bearer {token_data.access_token}',
@@ -824,52 +800,31 @@ async def shoutout_streamer(shoutout_data: dict, session: Session = Depends(get_
         if not username:
             return {"success": False, "error": "Username required"}
         
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(
-                f"https://api.twitch.tv/helix/users?login={username}",
-                headers=headers
-            )
-            
-            if user_response.status_code == 200:
-                users = user_response.json().get('data', [])
-                if not users:
-                    return {"success": False, "error": "User not found"}
-                
-                to_broadcaster_id = users[0]['id']
-                
-                response = await client.post(
-                    f"https://api.twitch.tv/helix/chat/shoutouts?from_broadcaster_id={token_data.user_id}&to_broadcaster_id={to_broadcaster_id}&moderator_id={token_data.user_id}",
-                    headers=headers
-                )
-                
-                if response.status_code == 204:
-                    return {"success": True, "message": f"Shoutout sent to {username}"}
-                else:
-                    return {"success": False, "error": response.text}
-            else:
-                return {"success": False, "error": "Failed to find user"}
+        client = helix.client
+        user = await user_cache.get_user(username, token_data.access_token)
+        if not user:
+            return {"success": False, "error": "User not found"}
+        
+        to_broadcaster_id = user['id']
+        
+        response = await client.post(
+            f"https://api.twitch.tv/helix/chat/shoutouts?from_broadcaster_id={token_data.user_id}&to_broadcaster_id={to_broadcaster_id}&moderator_id={token_data.user_id}",
+            headers=headers
+        )
+        
+        if response.status_code == 204:
+            return {"success": True, "message": f"Shoutout sent to {username}"}
+        else:
+            return {"success": False, "error": response.text}
     except Exception as e:
         logger.error(f"Failed to send shoutout: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/raid")
-async def start_raid(raid_data: dict, session: Session = Depends(get_session)):
+async def start_raid(raid_data: dict):
     """Start a raid"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         headers = {
             'Authorization': f'Bearer {token_data.access_token}',
@@ -882,52 +837,31 @@ async def start_raid(raid_data: dict, session: Session = Depends(get_session)):
         if not username:
             return {"success": False, "error": "Username required"}
         
-        async with httpx.AsyncClient() as client:
-            user_response = await client.get(
-                f"https://api.twitch.tv/helix/users?login={username}",
-                headers=headers
-            )
-            
-            if user_response.status_code == 200:
-                users = user_response.json().get('data', [])
-                if not users:
-                    return {"success": False, "error": "User not found"}
-                
-                to_broadcaster_id = users[0]['id']
-                
-                response = await client.post(
-                    f"https://api.twitch.tv/helix/raids?from_broadcaster_id={token_data.user_id}&to_broadcaster_id={to_broadcaster_id}",
-                    headers=headers
-                )
-            
-                if response.status_code == 200:
-                    return {"success": True, "message": f"Raid started to {username}"}
-                else:
-                    return {"success": False, "error": response.text}
-            else:
-                return {"success": False, "error": "Failed to find user"}
+        client = helix.client
+        user = await user_cache.get_user(username, token_data.access_token)
+        if not user:
+            return {"success": False, "error": "User not found"}
+        
+        to_broadcaster_id = user['id']
+        
+        response = await client.post(
+            f"https://api.twitch.tv/helix/raids?from_broadcaster_id={token_data.user_id}&to_broadcaster_id={to_broadcaster_id}",
+            headers=headers
+        )
+        
+        if response.status_code == 200:
+            return {"success": True, "message": f"Raid started to {username}"}
+        else:
+            return {"success": False, "error": response.text}
     except Exception as e:
         logger.error(f"Failed to start raid: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/clear-chat")
-async def clear_chat(session: Session = Depends(get_session)):
+async def clear_chat():
     """Clear chat (delete all messages)"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         headers = {
             'Authorization': f'Bearer {token_data.access_token}',
@@ -935,38 +869,25 @@ async def clear_chat(session: Session = Depends(get_session)):
             'Content-Type': 'application/json'
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"https://api.twitch.tv/helix/moderation/chat?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
-                headers=headers
-            )
-            
-            if response.status_code == 204:
-                return {"success": True, "message": "Chat cleared"}
-            else:
-                return {"success": False, "error": response.text}
+        client = helix.client
+        response = await client.delete(
+            f"https://api.twitch.tv/helix/moderation/chat?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
+            headers=headers
+        )
+        
+        if response.status_code == 204:
+            return {"success": True, "message": "Chat cleared"}
+        else:
+            return {"success": False, "error": response.text}
     except Exception as e:
         logger.error(f"Failed to clear chat: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/chat/slow-mode")
-async def toggle_slow_mode(data: dict, session: Session = Depends(get_session)):
+async def toggle_slow_mode(data: dict):
     """Toggle slow mode in chat"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         headers = {
             'Authorization': f'Bearer {token_data.access_token}',
@@ -976,39 +897,26 @@ async def toggle_slow_mode(data: dict, session: Session = Depends(get_session)):
         
         wait_time = data.get('wait_time', 30) if data.get('enabled', True) else None
         
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(
-                f"https://api.twitch.tv/helix/chat/settings?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
-                headers=headers,
-                json={"slow_mode": True, "slow_mode_wait_time": wait_time} if wait_time else {"slow_mode": False}
-            )
-            
-            if response.status_code == 200:
-                return {"success": True, "message": f"Slow mode {'enabled' if wait_time else 'disabled'}"}
-            else:
-                return {"success": False, "error": response.text}
+        client = helix.client
+        response = await client.patch(
+            f"https://api.twitch.tv/helix/chat/settings?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
+            headers=headers,
+            json={"slow_mode": True, "slow_mode_wait_time": wait_time} if wait_time else {"slow_mode": False}
+        )
+        
+        if response.status_code == 200:
+            return {"success": True, "message": f"Slow mode {'enabled' if wait_time else 'disabled'}"}
+        else:
+            return {"success": False, "error": response.text}
     except Exception as e:
         logger.error(f"Failed to toggle slow mode: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/chat/follower-only")
-async def toggle_follower_only(data: dict, session: Session = Depends(get_session)):
+async def toggle_follower_only(data: dict):
     """Toggle follower-only mode"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         headers = {
             'Authorization': f'Bearer {token_data.access_token}',
@@ -1019,39 +927,26 @@ async def toggle_follower_only(data: dict, session: Session = Depends(get_sessio
         enabled = data.get('enabled', True)
         duration = data.get('duration', 0) if enabled else None
         
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(
-                f"https://api.twitch.tv/helix/chat/settings?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
-                headers=headers,
-                json={"follower_mode": enabled, "follower_mode_duration": duration} if enabled else {"follower_mode": False}
-            )
-            
-            if response.status_code == 200:
-                return {"success": True, "message": f"Follower-only mode {'enabled' if enabled else 'disabled'}"}
-            else:
-                return {"success": False, "error": response.text}
+        client = helix.client
+        response = await client.patch(
+            f"https://api.twitch.tv/helix/chat/settings?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
+            headers=headers,
+            json={"follower_mode": enabled, "follower_mode_duration": duration} if enabled else {"follower_mode": False}
+        )
+        
+        if response.status_code == 200:
+            return {"success": True, "message": f"Follower-only mode {'enabled' if enabled else 'disabled'}"}
+        else:
+            return {"success": False, "error": response.text}
     except Exception as e:
         logger.error(f"Failed to toggle follower-only mode: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/chat/subscriber-only")
-async def toggle_subscriber_only(data: dict, session: Session = Depends(get_session)):
+async def toggle_subscriber_only(data: dict):
     """Toggle subscriber-only mode"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         headers = {
             'Authorization': f'Bearer {token_data.access_token}',
@@ -1061,39 +956,26 @@ async def toggle_subscriber_only(data: dict, session: Session = Depends(get_sess
         
         enabled = data.get('enabled', True)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(
-                f"https://api.twitch.tv/helix/chat/settings?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
-                headers=headers,
-                json={"subscriber_mode": enabled}
-            )
-            
-            if response.status_code == 200:
-                return {"success": True, "message": f"Subscriber-only mode {'enabled' if enabled else 'disabled'}"}
-            else:
-                return {"success": False, "error": response.text}
+        client = helix.client
+        response = await client.patch(
+            f"https://api.twitch.tv/helix/chat/settings?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
+            headers=headers,
+            json={"subscriber_mode": enabled}
+        )
+        
+        if response.status_code == 200:
+            return {"success": True, "message": f"Subscriber-only mode {'enabled' if enabled else 'disabled'}"}
+        else:
+            return {"success": False, "error": response.text}
     except Exception as e:
         logger.error(f"Failed to toggle subscriber-only mode: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/chat/emote-only")
-async def toggle_emote_only(data: dict, session: Session = Depends(get_session)):
+async def toggle_emote_only(data: dict):
     """Toggle emote-only mode"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         headers = {
             'Authorization': f'Bearer {token_data.access_token}',
@@ -1103,39 +985,26 @@ async def toggle_emote_only(data: dict, session: Session = Depends(get_session))
         
         enabled = data.get('enabled', True)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(
-                f"https://api.twitch.tv/helix/chat/settings?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
-                headers=headers,
-                json={"emote_mode": enabled}
-            )
-            
-            if response.status_code == 200:
-                return {"success": True, "message": f"Emote-only mode {'enabled' if enabled else 'disabled'}"}
-            else:
-                return {"success": False, "error": response.text}
+        client = helix.client
+        response = await client.patch(
+            f"https://api.twitch.tv/helix/chat/settings?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
+            headers=headers,
+            json={"emote_mode": enabled}
+        )
+        
+        if response.status_code == 200:
+            return {"success": True, "message": f"Emote-only mode {'enabled' if enabled else 'disabled'}"}
+        else:
+            return {"success": False, "error": response.text}
     except Exception as e:
         logger.error(f"Failed to toggle emote-only mode: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/chat/timeout")
-async def timeout_user(data: dict, session: Session = Depends(get_session)):
+async def timeout_user(data: dict):
     """Timeout a user in chat"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         headers = {
             'Authorization': f'Bearer {token_data.access_token}',
@@ -1150,61 +1019,40 @@ async def timeout_user(data: dict, session: Session = Depends(get_session)):
         if not username:
             return {"success": False, "error": "Username required"}
         
-        async with httpx.AsyncClient() as client:
-            # Get user ID
-            user_response = await client.get(
-                f"https://api.twitch.tv/helix/users?login={username}",
-                headers=headers
-            )
-            
-            if user_response.status_code == 200:
-                users = user_response.json().get('data', [])
-                if not users:
-                    return {"success": False, "error": "User not found"}
-                
-                user_id = users[0]['id']
-                
-                # Timeout user
-                response = await client.post(
-                    f"https://api.twitch.tv/helix/moderation/bans?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
-                    headers=headers,
-                    json={
-                        "data": {
-                            "user_id": user_id,
-                            "duration": duration,
-                            "reason": reason
-                        }
-                    }
-                )
-                
-                if response.status_code == 200:
-                    return {"success": True, "message": f"{username} timed out for {duration}s"}
-                else:
-                    return {"success": False, "error": response.text}
-            else:
-                return {"success": False, "error": "Failed to find user"}
+        client = helix.client
+        # Get user ID
+        user = await user_cache.get_user(username, token_data.access_token)
+        if not user:
+            return {"success": False, "error": "User not found"}
+        
+        user_id = user['id']
+        
+        # Timeout user
+        response = await client.post(
+            f"https://api.twitch.tv/helix/moderation/bans?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
+            headers=headers,
+            json={
+                "data": {
+                    "user_id": user_id,
+                    "duration": duration,
+                    "reason": reason
+                }
+            }
+        )
+        
+        if response.status_code == 200:
+            return {"success": True, "message": f"{username} timed out for {duration}s"}
+        else:
+            return {"success": False, "error": response.text}
     except Exception as e:
         logger.error(f"Failed to timeout user: {e}")
         return {"success": False, "error": str(e)}
 
 @api_router.post("/twitch/chat/ban")
-async def ban_user(data: dict, session: Session = Depends(get_session)):
+async def ban_user(data: dict):
     """Ban a user from chat"""
     try:
-        from sqlmodel import select
-        token_data = session.exec(select(TokenData)).first()
-        
-        if not token_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        
-        # Refresh token if needed
-        expires_at = token_data.expires_at.replace(tzinfo=timezone.utc) if token_data.expires_at.tzinfo is None else token_data.expires_at
-        if expires_at < datetime.now(timezone.utc):
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            token_data.access_token = new_token_response['access_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(seconds=new_token_response['expires_in'])
-            session.add(token_data)
-            session.commit()
+        token_data = await require_token()
         
         headers = {
             'Authorization': f'Bearer {token_data.access_token}',
@@ -1218,38 +1066,30 @@ async def ban_user(data: dict, session: Session = Depends(get_session)):
         if not username:
             return {"success": False, "error": "Username required"}
         
-        async with httpx.AsyncClient() as client:
-            # Get user ID
-            user_response = await client.get(
-                f"https://api.twitch.tv/helix/users?login={username}",
-                headers=headers
-            )
-            
-            if user_response.status_code == 200:
-                users = user_response.json().get('data', [])
-                if not users:
-                    return {"success": False, "error": "User not found"}
-                
-                user_id = users[0]['id']
-                
-                # Ban user (no duration = permanent ban)
-                response = await client.post(
-                    f"https://api.twitch.tv/helix/moderation/bans?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
-                    headers=headers,
-                    json={
-                        "data": {
-                            "user_id": user_id,
-                            "reason": reason
-                        }
-                    }
-                )
-                
-                if response.status_code == 200:
-                    return {"success": True, "message": f"{username} banned"}
-                else:
-                    return {"success": False, "error": response.text}
-            else:
-                return {"success": False, "error": "Failed to find user"}
+        client = helix.client
+        # Get user ID
+        user = await user_cache.get_user(username, token_data.access_token)
+        if not user:
+            return {"success": False, "error": "User not found"}
+        
+        user_id = user['id']
+        
+        # Ban user (no duration = permanent ban)
+        response = await client.post(
+            f"https://api.twitch.tv/helix/moderation/bans?broadcaster_id={token_data.user_id}&moderator_id={token_data.user_id}",
+            headers=headers,
+            json={
+                "data": {
+                    "user_id": user_id,
+                    "reason": reason
+                }
+            }
+        )
+        
+        if response.status_code == 200:
+            return {"success": True, "message": f"{username} banned"}
+        else:
+            return {"success": False, "error": response.text}
     except Exception as e:
         logger.error(f"Failed to ban user: {e}")
         return {"success": False, "error": str(e)}
@@ -1283,6 +1123,12 @@ async def get_obs_stats():
         current_scene=stats['current_scene']
     )
 
+@api_router.get("/obs/stats/history")
+async def get_obs_stats_history(seconds: Optional[float] = 300, points: int = 120):
+    """Sampled OBS stats (fps, cpu, kbps, dropped %, render lag) for charts"""
+    points = max(1, min(points, 1000))
+    return obs_service.get_stats_history(seconds, points)
+
 @api_router.post("/obs/stream")
 async def control_stream(control: StreamControl):
     """Control OBS streaming"""
@@ -1364,6 +1210,66 @@ async def save_clip():
         return {"success": True, "message": "Replay buffer saved!", "filename": f"replay_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"}
     return {"success": False, "error": "Failed to save replay buffer"}
 
+@api_router.get("/obs/audio")
+async def get_audio_levels():
+    """Latest downsampled audio levels (peak/RMS dBFS per channel) for each input"""
+    return {
+        "enabled": obs_service.audio_meters,
+        "interval_ms": round(obs_service.audio_interval * 1000),
+        "levels": obs_service.audio_levels
+    }
+
+@api_router.post("/obs/audio")
+async def toggle_audio_meters(toggle: AudioMetersToggle):
+    """Turn OBS audio meter streaming (the audio_levels WebSocket topic) on or off"""
+    success = await obs_service.set_audio_meters(toggle.enabled)
+    return {"success": success, "enabled": obs_service.audio_meters}
+
+@api_router.get("/obs/watchdog")
+async def get_stream_watchdog():
+    """Stream health watchdog state, rolling health and failover history"""
+    if not stream_watchdog:
+        return {"enabled": False}
+    return {"enabled": True, **stream_watchdog.get_status()}
+
+@api_router.get("/obs/macros")
+async def list_obs_macros():
+    """List saved OBS macros"""
+    return {"macros": macro_store.list()}
+
+@api_router.put("/obs/macros/{name}")
+async def save_obs_macro(name: str, macro: OBSMacro):
+    """Create or replace a named OBS macro"""
+    try:
+        saved = macro_store.put(name, macro.steps, macro.description, macro.halt_on_failure)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "name": name, "macro": saved}
+
+@api_router.delete("/obs/macros/{name}")
+async def delete_obs_macro(name: str):
+    """Delete a saved OBS macro"""
+    if not macro_store.delete(name):
+        raise HTTPException(status_code=404, detail=f"Macro '{name}' not found")
+    return {"success": True}
+
+@api_router.post("/obs/macros/run")
+async def run_adhoc_obs_macro(macro: OBSMacro):
+    """Run a list of OBS actions once without saving it"""
+    try:
+        return await obs_service.run_macro(macro.steps, macro.halt_on_failure)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.post("/obs/macros/{name}/run")
+async def run_obs_macro(name: str):
+    """Run a saved OBS macro in a single round trip"""
+    macro = macro_store.get(name)
+    if macro is None:
+        raise HTTPException(status_code=404, detail=f"Macro '{name}' not found")
+    result = await obs_service.run_macro(macro['steps'], macro.get('halt_on_failure', False))
+    return {"name": name, **result}
+
 # OAuth Endpoints
 @api_router.get("/auth/login")
 async def oauth_login():
@@ -1422,6 +1328,7 @@ async def oauth_callback(code: str, session: Session = Depends(get_session)):
             session.add(new_token)
         
         session.commit()
+        token_manager.set_token(existing_token or new_token)
         
         # Create session token for frontend
         session_token = oauth_service.create_session_token(user_id, timedelta(days=7))
@@ -1437,38 +1344,9 @@ async def oauth_callback(code: str, session: Session = Depends(get_session)):
         raise HTTPException(status_code=400, detail=str(e))
 
 @api_router.get("/auth/user")
-async def get_current_user(session: Session = Depends(get_session)):
+async def get_current_user():
     """Get current authenticated user"""
-    from sqlmodel import select
-    token_data = session.exec(select(TokenData)).first()
-    
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Check if token needs refresh (make expires_at timezone-aware if needed)
-    expires_at = token_data.expires_at
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    
-    if expires_at < datetime.now(timezone.utc):
-        try:
-            # Refresh token
-            new_token_response = await oauth_service.refresh_access_token(token_data.refresh_token)
-            
-            if 'error' in new_token_response:
-                raise HTTPException(status_code=401, detail="Token refresh failed")
-            
-            token_data.access_token = new_token_response['access_token']
-            token_data.refresh_token = new_token_response['refresh_token']
-            token_data.expires_at = datetime.now(timezone.utc) + timedelta(
-                seconds=new_token_response.get('expires_in', 3600)
-            )
-            token_data.updated_at = datetime.now(timezone.utc)
-            session.add(token_data)
-            session.commit()
-        except Exception as e:
-            logger.error(f"Token refresh failed: {e}")
-            raise HTTPException(status_code=401, detail="Token refresh failed")
+    token_data = await require_token()
     
     return {
         "user_id": token_data.user_id,
@@ -1486,14 +1364,14 @@ async def oauth_logout(session: Session = Depends(get_session)):
     if token_data:
         session.delete(token_data)
         session.commit()
+    token_manager.clear()
     
     return {"status": "logged out"}
 
 @api_router.get("/auth/status")
-async def auth_status(session: Session = Depends(get_session)):
+async def auth_status():
     """Check if user is authenticated"""
-    from sqlmodel import select
-    token_data = session.exec(select(TokenData)).first()
+    token_data = await token_manager.get_token()
     
     return {
         "authenticated": token_data is not None,
@@ -1598,16 +1476,31 @@ async def get_highlights():
 
 # WebSocket endpoint
 @api_router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, topics: Optional[str] = None,
+                             last_seq: Optional[int] = None, epoch: Optional[str] = None):
+    """Event stream. Subscribe to a subset with ?topics=chat,alerts or subscribe/unsubscribe messages.
+
+    audio_levels is opt-in: clients only get it by asking for it. A query naming
+    no known topic gets the default topics.
+
+    Reconnecting clients pass ?last_seq=<seq>&epoch=<epoch> (from the hello frame
+    and event seq numbers) to receive only what they missed.
+    """
+    await manager.connect(websocket, parse_topics(topics), last_seq=last_seq, epoch=epoch)
     try:
         while True:
             data = await websocket.receive_text()
-            # Echo back for testing
-            await websocket.send_json({"type": "pong", "data": data})
-    except WebSocketDisconnect:
+            await manager.handle_message(websocket, data)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
         manager.disconnect(websocket)
 
+@api_router.get("/ws/metrics")
+async def get_websocket_metrics():
+    """WebSocket fan-out metrics (clients, queue depth, evictions)"""
+    return manager.get_metrics()
+
 # Root level OAuth callback (Twitch redirects here without /api prefix)
 @app.get("/auth/callback")
 async def root_oauth_callback(code: str, session: Session = Depends(get_session)):
@@ -1663,6 +1556,7 @@ async def root_oauth_callback(code: str, session: Session = Depends(get_session)
             session.add(new_token)
         
         session.commit()
+        token_manager.set_token(existing_token or new_token)
         
         # Redirect to frontend with success flag
         frontend_url = os.getenv('FRONTEND_URL', 'https://livestream-control.preview.emergentagent.com')
@@ -1694,12 +1588,30 @@ async def root_oauth_callback(code: str, session: Session = Depends(get_session)
 # Discord Queue Management Endpoints
 # ============================================
 
+async def publish_queue_update(event: str, submission: Dict):
+    """Push a queue change to WebSocket clients subscribed to the queue topic"""
+    await manager.broadcast({
+        'type': 'queue_update',
+        'event': event,
+        'data': submission,
+        'stats': discord_manager.get_stats()
+    })
+
 @api_router.get("/queue/submissions")
-async def get_submissions():
-    """Get all pending music submissions"""
+async def get_submissions(annotate: bool = False):
+    """Get all pending music submissions
+
+    With annotate=true each submission also gets a 'twitch' entry (matched
+    Twitch user and sub status), resolved for the whole queue in bulk.
+    """
     try:
         queue = discord_manager.get_queue()
+        if annotate:
+            token_data = await require_token()
+            queue = await bulk_lookup.annotate_submissions(queue, token_data.user_id, token_data.access_token)
         return {"submissions": queue, "count": len(queue)}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting submissions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1724,6 +1636,7 @@ async def mark_submission(request: MarkSubmissionRequest):
     try:
         success = discord_manager.mark_submission(request.submission_id, request.status)
         if success:
+            await publish_queue_update('submission_marked', {'id': request.submission_id, 'status': request.status})
             return {"success": True, "message": f"Submission marked as {request.status}"}
         else:
             raise HTTPException(status_code=404, detail="Submission not found")
@@ -1739,6 +1652,7 @@ async def mark_skip_submission(request: MarkSubmissionRequest):
     try:
         success = discord_manager.mark_skip_submission(request.submission_id, request.status)
         if success:
+            await publish_queue_update('skip_marked', {'id': request.submission_id, 'status': request.status})
             return {"success": True, "message": f"Skip submission marked as {request.status}"}
         else:
             raise HTTPException(status_code=404, detail="Skip submission not found")
@@ -0,0 +1,238 @@
+import os
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+from dotenv import load_dotenv
+from pathlib import Path
+from obs_stats import derive
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+HEALTHY = 'healthy'
+DEGRADED = 'degraded'      # thresholds crossed, waiting out trigger_after (or the switch failed)
+FAILED_OVER = 'failed_over'
+
+
+class StreamWatchdog:
+    """Switch to a fallback scene when the stream goes unhealthy, and back when it recovers.
+
+    Every `interval` seconds the watchdog refreshes OBS stats (one batched
+    round trip) and computes bitrate and dropped-frame percentage over the
+    last `window` seconds of counters. Crossing a threshold for
+    `trigger_after` seconds fails over; staying healthy for `recover_after`
+    seconds switches back to the scene that was live before. A failed switch
+    leaves the watchdog DEGRADED, so the next check tries again.
+    """
+
+    def __init__(self, obs_service, fallback_scene: str, min_kbps: float = 1000.0,
+                 max_dropped_pct: float = 5.0, interval: float = 0.25, window: float = 1.0,
+                 trigger_after: float = 0.5, recover_after: float = 5.0):
+        self.obs = obs_service
+        self.fallback_scene = fallback_scene
+        self.min_kbps = min_kbps
+        self.max_dropped_pct = max_dropped_pct
+        self.interval = interval
+        self.window = window
+        self.trigger_after = trigger_after
+        self.recover_after = recover_after
+        self.alert_callback: Optional[Callable[[Dict], Awaitable[None]]] = None
+
+        self.state = HEALTHY
+        self.reasons = []
+        self.health: Dict[str, float] = {'kbps': 0.0, 'dropped_pct': 0.0}
+        self.previous_scene: Optional[str] = None
+        self._samples: Deque[Dict[str, float]] = deque()
+        self._unhealthy_since: Optional[float] = None
+        self._healthy_since: Optional[float] = None
+        self._failed_switches = 0  # in the current unhealthy spell
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.failovers = 0
+        self.failed_failovers = 0
+        self.recoveries = 0
+        self.last_reaction_ms: Optional[float] = None
+
+    def set_alert_callback(self, callback: Callable[[Dict], Awaitable[None]]):
+        """Register callback for failover/recovery alerts"""
+        self.alert_callback = callback
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(), name='stream-watchdog')
+        logger.info(f"Stream watchdog started (fallback scene: {self.fallback_scene})")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Stream watchdog check failed: {e}")
+            next_tick += self.interval
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    def _rolling_health(self) -> Optional[Dict[str, float]]:
+        """Bitrate and dropped % over the window (None until it spans at least one interval)"""
+        counters = self.obs.counters
+        if counters is None:
+            return None
+        if not self._samples or counters['time'] > self._samples[-1]['time']:
+            self._samples.append(counters)
+        cutoff = counters['time'] - self.window
+        while len(self._samples) > 2 and self._samples[1]['time'] <= cutoff:
+            self._samples.popleft()
+        if len(self._samples) < 2:
+            return None
+        return derive(self._samples[0], self._samples[-1])
+
+    async def check(self):
+        if not self.obs.connected:
+            return
+        await self.obs.update_stats()
+        now = time.monotonic()
+
+        if not self.obs.current_stats['streaming']:
+            # Nothing to protect; start fresh when the stream comes back
+            self._samples.clear()
+            self._unhealthy_since = self._healthy_since = None
+            self._failed_switches = 0
+            if self.state == DEGRADED:
+                self.state = HEALTHY
+            return
+
+        health = self._rolling_health()
+        if health is None:
+            return
+        self.health = {'kbps': round(health['kbps'], 1), 'dropped_pct': round(health['dropped_pct'], 3)}
+
+        reasons = []
+        if health['kbps'] < self.min_kbps:
+            reasons.append(f"bitrate {health['kbps']:.0f} kbps < {self.min_kbps:.0f}")
+        if health['dropped_pct'] > self.max_dropped_pct:
+            reasons.append(f"dropped frames {health['dropped_pct']:.1f}% > {self.max_dropped_pct:.1f}%")
+
+        if reasons:
+            self.reasons = reasons
+            self._healthy_since = None
+            if self._unhealthy_since is None:
+                self._unhealthy_since = now
+            if self.state == HEALTHY:
+                self.state = DEGRADED
+            if self.state == DEGRADED and now - self._unhealthy_since >= self.trigger_after:
+                await self._fail_over()
+        else:
+            self._unhealthy_since = None
+            self._failed_switches = 0
+            if self.state == DEGRADED:
+                self.state = HEALTHY
+                self.reasons = []
+            elif self.state == FAILED_OVER:
+                if self._healthy_since is None:
+                    self._healthy_since = now
+                if now - self._healthy_since >= self.recover_after:
+                    await self._recover()
+
+    async def _fail_over(self):
+        current_scene = self.obs.current_stats['current_scene']
+        if current_scene == self.fallback_scene:
+            switched = True
+        else:
+            self.previous_scene = current_scene
+            switched = await self.obs.switch_scene(self.fallback_scene)
+        if not switched:
+            # Stay DEGRADED and retry on the next check; alert only on the first miss
+            self.failed_failovers += 1
+            self._failed_switches += 1
+            logger.error(f"Stream unhealthy ({'; '.join(self.reasons)}); "
+                         f"could not switch to '{self.fallback_scene}', retrying")
+            if self._failed_switches == 1:
+                await self._alert('failover_failed', False)
+            return
+        self._failed_switches = 0
+        # From the first check that crossed a threshold to the scene switch completing
+        self.last_reaction_ms = round((time.monotonic() - self._unhealthy_since) * 1000, 1)
+        self.state = FAILED_OVER
+        self.failovers += 1
+        logger.warning(f"Stream unhealthy ({'; '.join(self.reasons)}); switched to '{self.fallback_scene}'")
+        await self._alert('failover', True)
+
+    async def _recover(self):
+        restored = False
+        # Only switch back if nobody moved off the fallback scene by hand
+        if self.previous_scene and self.obs.current_stats['current_scene'] == self.fallback_scene:
+            restored = await self.obs.switch_scene(self.previous_scene)
+        self.state = HEALTHY
+        self.reasons = []
+        self._healthy_since = None
+        self.recoveries += 1
+        logger.info(f"Stream healthy again; restored '{self.previous_scene}': {restored}")
+        await self._alert('recovered', restored)
+
+    async def _alert(self, event: str, scene_switched: bool):
+        if not self.alert_callback:
+            return
+        await self.alert_callback({
+            'event': event,
+            'reasons': list(self.reasons),
+            'health': dict(self.health),
+            'scene': self.previous_scene if event == 'recovered' else self.fallback_scene,
+            'scene_switched': scene_switched,
+            'reaction_ms': self.last_reaction_ms if event == 'failover' else None
+        })
+
+    def get_status(self) -> Dict:
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'state': self.state,
+            'reasons': list(self.reasons),
+            'health': dict(self.health),
+            'fallback_scene': self.fallback_scene,
+            'previous_scene': self.previous_scene,
+            'thresholds': {
+                'min_kbps': self.min_kbps,
+                'max_dropped_pct': self.max_dropped_pct,
+                'window_s': self.window,
+                'trigger_after_s': self.trigger_after,
+                'recover_after_s': self.recover_after,
+                'interval_ms': round(self.interval * 1000)
+            },
+            'failovers': self.failovers,
+            'failed_failovers': self.failed_failovers,
+            'recoveries': self.recoveries,
+            'last_reaction_ms': self.last_reaction_ms
+        }
+
+
+def create_watchdog(obs_service) -> Optional[StreamWatchdog]:
+    """Watchdog configured from the environment; None unless a fallback scene is set"""
+    fallback_scene = os.getenv('STREAM_WATCHDOG_FALLBACK_SCENE', '')
+    if not fallback_scene:
+        return None
+    return StreamWatchdog(
+        obs_service,
+        fallback_scene,
+        min_kbps=float(os.getenv('STREAM_WATCHDOG_MIN_KBPS', '1000')),
+        max_dropped_pct=float(os.getenv('STREAM_WATCHDOG_MAX_DROPPED_PCT', '5')),
+        interval=float(os.getenv('STREAM_WATCHDOG_INTERVAL_MS', '250')) / 1000,
+        window=float(os.getenv('STREAM_WATCHDOG_WINDOW', '1')),
+        trigger_after=float(os.getenv('STREAM_WATCHDOG_TRIGGER_AFTER', '0.5')),
+        recover_after=float(os.getenv('STREAM_WATCHDOG_RECOVER_AFTER', '5'))
+    )
@@ -0,0 +1,260 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional, Set
+from sqlmodel import Session, select
+from dotenv import load_dotenv
+from pathlib import Path
+from oauth_database import TokenData, engine
+from oauth_service import oauth_service
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+
+def _aware(moment: datetime) -> datetime:
+    """SQLite hands datetimes back naive; they are stored as UTC"""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def _detached(token: TokenData) -> TokenData:
+    """Plain copy that stays readable after its session is closed.
+
+    Call while the token's session is still open. Fields are read one by one
+    rather than through model_dump(), which returns {} for an instance that
+    session.commit() has expired; attribute access reloads it instead.
+    """
+    return TokenData(**{name: getattr(token, name) for name in TokenData.model_fields})
+
+
+class TokenManager:
+    """The active Twitch OAuth token, kept in memory and refreshed before it expires.
+
+    Handlers ask get_token() instead of querying SQLite. A background task
+    refreshes the token refresh_margin seconds before expires_at, and a
+    request that still finds it (nearly) expired joins the one refresh in
+    flight rather than starting its own. After a failed refresh nothing
+    retries it for failure_cooldown seconds, so a revoked token doesn't send
+    every API call to the refresh endpoint. New tokens are written back to
+    the database in the background, in order.
+    """
+
+    def __init__(self, refresh_margin: float = 300.0, check_interval: float = 30.0,
+                 failure_cooldown: float = 60.0):
+        self.refresh_margin = refresh_margin
+        self.check_interval = check_interval
+        self.failure_cooldown = failure_cooldown
+        self.refresh_callback: Optional[Callable[[TokenData], Awaitable[None]]] = None
+        self._token: Optional[TokenData] = None
+        self._loaded = False
+        self._refreshing: Optional[asyncio.Task] = None
+        # The token whose last refresh failed, and when
+        self._failed_token: Optional[TokenData] = None
+        self._failed_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._load_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._writes: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.joined_refreshes = 0
+        self.skipped_refreshes = 0
+        self.db_writes = 0
+
+    def set_refresh_callback(self, callback: Callable[[TokenData], Awaitable[None]]):
+        """Register callback(token) run after every successful refresh"""
+        self.refresh_callback = callback
+
+    async def load(self):
+        """Read the stored token into memory"""
+        def read() -> Optional[TokenData]:
+            with Session(engine) as session:
+                token = session.exec(select(TokenData)).first()
+                return _detached(token) if token else None
+
+        try:
+            self._token = await asyncio.to_thread(read)
+        except Exception as e:
+            logger.error(f"Failed to load OAuth token: {e}")
+            self._token = None
+        self._loaded = True
+
+    async def start(self):
+        await self.load()
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._refresh_loop(), name='token-refresh')
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def seconds_left(self, token: Optional[TokenData] = None) -> float:
+        token = token or self._token
+        if token is None:
+            return 0.0
+        return (_aware(token.expires_at) - datetime.now(timezone.utc)).total_seconds()
+
+    @property
+    def cached(self) -> Optional[TokenData]:
+        """The in-memory token as is (no load, no refresh)"""
+        return self._token
+
+    async def get_token(self) -> Optional[TokenData]:
+        """The active token, refreshed first if it is about to expire.
+
+        Returns None when nobody is logged in, or when the token has expired
+        and could not be refreshed.
+        """
+        if not self._loaded:
+            async with self._load_lock:
+                if not self._loaded:
+                    await self.load()
+        token = self._token
+        if token is None or self.seconds_left(token) > self.refresh_margin:
+            return token
+
+        try:
+            return await self.refresh()
+        except Exception:
+            # Still usable for a little while; the background task keeps trying
+            return token if self.seconds_left(token) > 0 else None
+
+    async def refresh(self) -> TokenData:
+        """Refresh the token; concurrent callers share a single refresh request.
+
+        Raises without a request while the current token is in its failure cooldown.
+        """
+        if self._refreshing is None or self._refreshing.done():
+            if (self._failed_token is not None and self._failed_token is self._token
+                    and time.monotonic() - self._failed_at < self.failure_cooldown):
+                self.skipped_refreshes += 1
+                raise RuntimeError("Token refresh failed recently; not retrying yet")
+            self._refreshing = asyncio.create_task(self._refresh(), name='token-refresh-request')
+        else:
+            self.joined_refreshes += 1
+        # Shielded so one caller giving up doesn't cancel the refresh for everyone
+        return await asyncio.shield(self._refreshing)
+
+    async def _refresh(self) -> TokenData:
+        token = self._token
+        if token is None:
+            raise RuntimeError("No OAuth token to refresh")
+        try:
+            response = await oauth_service.refresh_access_token(token.refresh_token)
+            if 'error' in response:
+                raise RuntimeError(response.get('message') or response['error'])
+        except Exception as e:
+            self.refresh_failures += 1
+            self._failed_token = token
+            self._failed_at = time.monotonic()
+            logger.error(f"Token refresh failed: {e}")
+            raise
+
+        now = datetime.now(timezone.utc)
+        refreshed = _detached(token)
+        refreshed.access_token = response['access_token']
+        # Twitch rotates refresh tokens; keep the old one only if none came back
+        refreshed.refresh_token = response.get('refresh_token') or token.refresh_token
+        refreshed.expires_at = now + timedelta(seconds=response.get('expires_in', 3600))
+        refreshed.updated_at = now
+        if self._token is not token:
+            # Logged out or replaced by a new login while the request was in flight
+            if self._token is None:
+                raise RuntimeError("Logged out during token refresh")
+            return self._token
+
+        self._token = refreshed
+        self._failed_token = None
+        self.refreshes += 1
+        logger.info(f"Refreshed OAuth token for {refreshed.username} "
+                    f"(expires in {int(self.seconds_left(refreshed))}s)")
+        self._write_back(refreshed)
+        if self.refresh_callback:
+            try:
+                await self.refresh_callback(refreshed)
+            except Exception as e:
+                logger.error(f"Error in token refresh callback: {e}")
+        return refreshed
+
+    async def _refresh_loop(self):
+        while True:
+            token = self._token
+            if token is not None and self.seconds_left(token) <= self.refresh_margin:
+                try:
+                    await self.refresh()
+                except Exception:
+                    pass  # logged in _refresh; retried next check
+            await asyncio.sleep(self.check_interval)
+
+    def _write_back(self, token: TokenData):
+        task = asyncio.create_task(self._write(token))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write(self, token: TokenData):
+        def write():
+            with Session(engine) as session:
+                stored = session.get(TokenData, token.id)
+                if stored is None:
+                    return  # logged out meanwhile
+                stored.access_token = token.access_token
+                stored.refresh_token = token.refresh_token
+                stored.expires_at = token.expires_at
+                stored.updated_at = token.updated_at
+                session.add(stored)
+                session.commit()
+
+        # Serialized so an older token can never overwrite a newer one
+        async with self._write_lock:
+            try:
+                await asyncio.to_thread(write)
+                self.db_writes += 1
+            except Exception as e:
+                logger.error(f"Failed to save refreshed OAuth token: {e}")
+
+    def set_token(self, token: TokenData):
+        """Adopt a token just stored by the OAuth callback (call before its session closes)"""
+        self._token = _detached(token)
+        self._loaded = True
+
+    def clear(self):
+        """Forget the token (logout)"""
+        self._token = None
+        self._loaded = True
+
+    def get_metrics(self):
+        token = self._token
+        return {
+            'authenticated': token is not None,
+            'username': token.username if token else None,
+            'expires_in': round(self.seconds_left(token)) if token else None,
+            'refreshing': self._refreshing is not None and not self._refreshing.done(),
+            'refreshes': self.refreshes,
+            'refresh_failures': self.refresh_failures,
+            'joined_refreshes': self.joined_refreshes,
+            'skipped_refreshes': self.skipped_refreshes,
+            'db_writes': self.db_writes
+        }
+
+
+# Global instance
+token_manager = TokenManager(
+    refresh_margin=float(os.getenv('TOKEN_REFRESH_MARGIN', '300')),
+    check_interval=float(os.getenv('TOKEN_REFRESH_CHECK_INTERVAL', '30')),
+    failure_cooldown=float(os.getenv('TOKEN_REFRESH_FAILURE_COOLDOWN', '60'))
+)
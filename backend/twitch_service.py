@@ -9,6 +9,10 @@ from twitchAPI.type import AuthScope
 from twitchAPI.chat import Chat, EventData, ChatMessage
 from dotenv import load_dotenv
 from pathlib import Path
+from emote_index import EmoteIndex, EMPTY_EMOTE_INDEX
+from chat_history import ChatHistory
+from user_cache import user_cache
+from bulk_lookup import candidate_logins
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -24,12 +28,12 @@ class TwitchService:
         self.twitch: Optional[Twitch] = None
         self.chat: Optional[Chat] = None
         self.user_id: Optional[str] = None
-        self.chat_messages: List[Dict] = []
-        self.max_messages = 50
+        self.chat_history = ChatHistory()
         self.recent_alerts: List[Dict] = []
         self.message_callback = None
         self.channel_emotes: Dict[str, str] = {}  # name -> id mapping
         self.global_emotes: Dict[str, str] = {}   # name -> id mapping
+        self.emote_index: EmoteIndex = EMPTY_EMOTE_INDEX  # rebuilt on every emote refresh
         
     async def initialize(self):
         """Initialize Twitch API connection"""
@@ -67,17 +71,22 @@ class TwitchService:
             logger.info(f"Fetching channel emotes for broadcaster ID: {self.user_id}")
             channel_emotes_response = await self.twitch.get_channel_emotes(self.user_id)
             
+            channel_emotes = {}
             for emote in channel_emotes_response:
                 # Store emote name -> ID mapping
-                self.channel_emotes[emote.name] = emote.id
+                channel_emotes[emote.name] = emote.id
                 logger.info(f"Loaded channel emote: {emote.name} -> {emote.id}")
             
             # Fetch global emotes
             logger.info("Fetching global Twitch emotes")
             global_emotes_response = await self.twitch.get_global_emotes()
             
-            for emote in global_emotes_response:
-                self.global_emotes[emote.name] = emote.id
+            global_emotes = {emote.name: emote.id for emote in global_emotes_response}
+            
+            # Swap in the new caches and index together
+            self.channel_emotes = channel_emotes
+            self.global_emotes = global_emotes
+            self.emote_index = EmoteIndex(channel_emotes, global_emotes)
             
             logger.info(f"Loaded {len(self.channel_emotes)} channel emotes and {len(self.global_emotes)} global emotes")
             
@@ -100,58 +109,9 @@ class TwitchService:
     
     async def _on_message(self, msg: ChatMessage):
         """Called when a new chat message arrives"""
-        # Parse emotes from the message text using our cached emote data
-        emotes_list = []
-        
-        # Split message into words and check each against our emote cache
-        words = msg.text.split()
-        current_pos = 0
-        
-        for word in words:
-            # Find position of this word in the original text
-            word_start = msg.text.find(word, current_pos)
-            word_end = word_start + len(word) - 1
-            
-            # Check if word is a channel emote
-            if word in self.channel_emotes:
-                emotes_list.append({
-                    'id': self.channel_emotes[word],
-                    'name': word,
-                    'positions': [[word_start, word_end]]
-                })
-            # Check if word is a global emote
-            elif word in self.global_emotes:
-                emotes_list.append({
-                    'id': self.global_emotes[word],
-                    'name': word,
-                    'positions': [[word_start, word_end]]
-                })
-            
-            current_pos = word_end + 1
-        
-        # Also try to get emote data from IRC tags if available (fallback)
-        if hasattr(msg, 'tags') and msg.tags and 'emotes' in msg.tags:
-            raw_emotes = msg.tags['emotes']
-            if raw_emotes:
-                # Parse emotes from IRC tags format: emote_id:start-end,start-end/emote_id:start-end
-                for emote_data in raw_emotes.split('/'):
-                    if ':' in emote_data:
-                        emote_id, positions_str = emote_data.split(':', 1)
-                        positions = []
-                        for pos_str in positions_str.split(','):
-                            if '-' in pos_str:
-                                start, end = pos_str.split('-')
-                                positions.append([int(start), int(end)])
-                        
-                        if positions:
-                            # Check if we already have this emote from our cache
-                            already_exists = any(e['id'] == emote_id for e in emotes_list)
-                            if not already_exists:
-                                emotes_list.append({
-                                    'id': emote_id,
-                                    'name': '',
-                                    'positions': positions
-                                })
+        # Detect emotes from the shared index plus IRC tag positions (if available)
+        tag_emotes = msg.tags.get('emotes') if getattr(msg, 'tags', None) else None
+        emotes_list = self.emote_index.detect(msg.text, tag_emotes)
         
         message_data = {
             'id': msg.id,
@@ -163,9 +123,7 @@ class TwitchService:
             'emotes': emotes_list
         }
         
-        self.chat_messages.insert(0, message_data)
-        if len(self.chat_messages) > self.max_messages:
-            self.chat_messages.pop()
+        message_data['seq'] = self.chat_history.append(message_data).seq
         
         # Call callback if registered
         if self.message_callback:
@@ -175,9 +133,9 @@ class TwitchService:
         """Register callback for new messages"""
         self.message_callback = callback
     
-    def get_recent_messages(self) -> List[Dict]:
-        """Get recent chat messages"""
-        return self.chat_messages
+    def get_recent_messages(self, limit: int = 50) -> List[Dict]:
+        """Get recent chat messages (newest first)"""
+        return [record.to_dict() for record in self.chat_history.recent(limit)]
     
     def get_emotes(self) -> Dict:
         """Get cached emote data"""
@@ -186,39 +144,31 @@ class TwitchService:
             'global_emotes': self.global_emotes
         }
     
+    async def get_user(self, login: str) -> Optional[Dict]:
+        """User (id, login, display_name) for a login, from the shared cache when possible"""
+        known, user = user_cache.lookup(login)
+        if known:
+            return user
+        found = await first(self.twitch.get_users(logins=[login]))
+        if not found:
+            user_cache.put_missing(login)
+            return None
+        user_cache.put(found.id, found.login, found.display_name)
+        return {'id': found.id, 'login': found.login, 'display_name': found.display_name}
+    
     async def find_matching_twitch_user(self, discord_username: str) -> Optional[str]:
         """Try to find a matching Twitch username for a Discord username"""
         if not self.twitch:
             return None
         
         try:
-            # Clean up username - remove special chars, numbers at end, etc.
-            clean_name = discord_username.lower()
-            # Remove common suffixes
-            clean_name = clean_name.replace('ttv', '').replace('twitch', '').replace('_', '').replace('-', '')
-            # Remove trailing numbers (common in Discord)
-            import re
-            clean_name = re.sub(r'\d+$', '', clean_name)
-            
-            if len(clean_name) < 3:
-                return None
-            
-            # Try exact match first
-            try:
-                user = await first(self.twitch.get_users(logins=[discord_username.lower()]))
-                if user:
-                    logger.info(f"Found exact match: {discord_username} → {user.login}")
-                    return user.login
-            except:
-                pass
-            
-            # Try cleaned name
-            if clean_name != discord_username.lower():
+            # Exact match first, then the cleaned-up name
+            for login in candidate_logins(discord_username):
                 try:
-                    user = await first(self.twitch.get_users(logins=[clean_name]))
+                    user = await self.get_user(login)
                     if user:
-                        logger.info(f"Found cleaned match: {discord_username} → {user.login}")
-                        return user.login
+                        logger.info(f"Found match: {discord_username} → {user['login']}")
+                        return user['login']
                 except:
                     pass
             
@@ -236,7 +186,7 @@ class TwitchService:
         
         try:
             # Get user ID from username
-            user = await first(self.twitch.get_users(logins=[username]))
+            user = await self.get_user(username)
             if not user:
                 logger.warning(f"User {username} not found on Twitch")
                 return {'is_subscribed': False, 'tier': None, 'found': False}
@@ -245,7 +195,7 @@ class TwitchService:
             try:
                 is_subscribed = await self.twitch.check_user_subscription(
                     broadcaster_id=self.user_id,
-                    user_id=user.id
+                    user_id=user['id']
                 )
                 
                 if is_subscribed:
@@ -0,0 +1,191 @@
+import os
+import re
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import httpx
+from dotenv import load_dotenv
+from pathlib import Path
+from helix_client import helix, PRIORITY_INTERACTIVE
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# helix/users accepts up to 100 login= parameters per call
+HELIX_USERS_MAX = 100
+
+# What Twitch allows in a login; helix/users answers 400 for the whole request if one doesn't fit
+LOGIN_RE = re.compile(r'^[a-z0-9_]{1,25}$')
+
+
+class UserCache:
+    """Bounded LRU of Twitch users (login <-> user ID <-> display name) with a TTL.
+
+    Fed from every Helix users response and from the user-id tag on IRC
+    chat messages, so moderation actions on someone who just chatted skip
+    the helix/users round trip. Logins Helix didn't know are remembered for
+    the shorter miss_ttl so repeated guesses don't hit the API either.
+    """
+
+    def __init__(self, max_size: int = 5000, ttl: float = 3600.0, miss_ttl: float = 300.0):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        # login -> (user or None for "no such user", expires at); oldest first
+        self._by_login: 'OrderedDict[str, Tuple[Optional[Dict], float]]' = OrderedDict()
+        self._login_by_id: Dict[str, str] = {}
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fetched = 0
+
+    def __len__(self) -> int:
+        return len(self._by_login)
+
+    def put(self, user_id: str, login: str, display_name: Optional[str] = None):
+        if not user_id or not login:
+            return
+        login = login.lower()
+        display_name = display_name or None  # IRC sends an empty display-name tag for some users
+        cached = self._by_login.get(login, (None, 0))[0]
+        if cached is not None and cached['id'] == user_id and display_name in (None, cached['display_name']):
+            # Unchanged (the common case for chat): just renew it
+            self._by_login[login] = (cached, time.monotonic() + self.ttl)
+            self._by_login.move_to_end(login)
+            return
+
+        previous_login = self._login_by_id.get(user_id)
+        if previous_login is not None and previous_login != login:
+            self._drop(previous_login)  # renamed account
+        user = {'id': user_id, 'login': login, 'display_name': display_name or login}
+        self._store(login, user, self.ttl)
+        self._login_by_id[user_id] = login
+
+    def put_helix(self, users: Iterable[Dict]):
+        """Cache the entries of a helix/users response"""
+        for user in users:
+            self.put(user.get('id'), user.get('login'), user.get('display_name'))
+
+    def put_missing(self, login: str):
+        """Remember that Helix has no user with this login"""
+        self._store(login.lower(), None, self.miss_ttl)
+
+    def _store(self, login: str, user: Optional[Dict], ttl: float):
+        self._drop(login)
+        self._by_login[login] = (user, time.monotonic() + ttl)
+        while len(self._by_login) > self.max_size:
+            self._drop(next(iter(self._by_login)))
+            self.evictions += 1
+
+    def _drop(self, login: str):
+        user = self._by_login.pop(login, (None, 0))[0]
+        if user is not None and self._login_by_id.get(user['id']) == login:
+            del self._login_by_id[user['id']]
+
+    def lookup(self, login: str) -> Tuple[bool, Optional[Dict]]:
+        """(known, user): known is False when Helix has to be asked; user is None for a cached miss"""
+        login = login.lower()
+        entry = self._by_login.get(login)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        user, expires = entry
+        if expires <= time.monotonic():
+            self._drop(login)
+            self.misses += 1
+            return False, None
+        self._by_login.move_to_end(login)
+        self.hits += 1
+        return True, user
+
+    def get_by_login(self, login: str) -> Optional[Dict]:
+        return self.lookup(login)[1]
+
+    def get_by_id(self, user_id: str) -> Optional[Dict]:
+        login = self._login_by_id.get(user_id)
+        return self.get_by_login(login) if login else None
+
+    async def get_users(self, logins: Iterable[str], access_token: str, priority: int = PRIORITY_INTERACTIVE,
+                        raise_errors: bool = False) -> Dict[str, Optional[Dict]]:
+        """Resolve logins to users (None when they don't exist), asking Helix only for unknown ones.
+
+        Unknown logins are fetched HELIX_USERS_MAX per request. Logins Twitch
+        could never issue are answered None without a request. If Helix
+        refuses a chunk, the error is logged and that chunk's logins come
+        back None (not cached) while the other chunks still resolve; with
+        raise_errors the httpx.HTTPError is raised instead.
+        """
+        results: Dict[str, Optional[Dict]] = {}
+        unknown: List[str] = []
+        for login in logins:
+            login = login.lower().lstrip('@')
+            if not login or login in results:
+                continue
+            if not LOGIN_RE.match(login):
+                results[login] = None
+                continue
+            known, user = self.lookup(login)
+            results[login] = user
+            if not known:
+                unknown.append(login)
+
+        for start in range(0, len(unknown), HELIX_USERS_MAX):
+            chunk = unknown[start:start + HELIX_USERS_MAX]
+            try:
+                response = await helix.client.get(
+                    'https://api.twitch.tv/helix/users',
+                    params=[('login', login) for login in chunk],
+                    headers={'Authorization': f'Bearer {access_token}'},
+                    extensions={'helix_priority': priority}
+                )
+                self.fetched += 1
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.error(f"Error looking up {len(chunk)} Twitch users: {e}")
+                if raise_errors:
+                    raise
+                continue
+            users = response.json().get('data', [])
+            self.put_helix(users)
+            found = {user['login'].lower(): user for user in users}
+            for login in chunk:
+                user = found.get(login)
+                if user is None:
+                    self.put_missing(login)
+                    results[login] = None
+                else:
+                    results[login] = {'id': user['id'], 'login': login,
+                                      'display_name': user.get('display_name') or login}
+        return results
+
+    async def get_user(self, login: str, access_token: str) -> Optional[Dict]:
+        """One login; None when there is no such user. Raises httpx.HTTPError if Helix fails."""
+        return (await self.get_users([login], access_token, raise_errors=True)).get(login.lower().lstrip('@'))
+
+    def get_metrics(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._by_login),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'helix_requests': self.fetched,
+            'evictions': self.evictions
+        }
+
+
+# Global instance
+user_cache = UserCache(
+    max_size=int(os.getenv('USER_CACHE_SIZE', '5000')),
+    ttl=float(os.getenv('USER_CACHE_TTL', '3600')),
+    miss_ttl=float(os.getenv('USER_CACHE_MISS_TTL', '300'))
+)
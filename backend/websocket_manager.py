@@ -0,0 +1,451 @@
+import os
+import asyncio
+import json
+import logging
+import math
+import time
+import uuid
+from collections import deque
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from fastapi import WebSocket
+from dotenv import load_dotenv
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to clients evicted for falling behind ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Topics a client can subscribe to; new clients get all but the opt-in ones
+TOPICS = frozenset({'chat', 'obs', 'queue', 'alerts', 'audio_levels'})
+OPT_IN_TOPICS = frozenset({'audio_levels'})
+DEFAULT_TOPICS = TOPICS - OPT_IN_TOPICS
+
+# Topic for events broadcast without an explicit one
+TOPIC_BY_TYPE = {
+    'chat_message': 'chat',
+    'channel_chat_message': 'chat',
+    'obs_state': 'obs',
+    'queue_update': 'queue',
+    'stream_health_alert': 'alerts',
+    'audio_levels': 'audio_levels',
+}
+
+# Events that may be coalesced into a single chat_batch frame when batching is on
+BATCHED_TYPES = frozenset({'chat_message', 'channel_chat_message'})
+
+# Live-only events: no seq and not kept for replay, since a stale reading is worthless
+UNSEQUENCED_TYPES = frozenset({'audio_levels'})
+
+
+def _default(obj: Any) -> Any:
+    # NumPy values (OBS stats, audio levels) become the Python numbers they hold
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return obj.tolist()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()  # what orjson writes natively
+    return str(obj)
+
+
+def _as_orjson_writes(obj: Any) -> Any:
+    """obj with the values json.dumps would write differently from orjson replaced"""
+    if isinstance(obj, (np.generic, np.ndarray)):
+        if obj.dtype == np.float32:
+            # orjson writes float32 at its own precision (0.1, not 0.10000000149011612)
+            obj = obj.astype(str).astype(np.float64)
+        return _as_orjson_writes(obj.tolist())
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None  # orjson writes NaN and Infinity as null
+    if isinstance(obj, dict):
+        return {key: _as_orjson_writes(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_as_orjson_writes(value) for value in obj]
+    return obj
+
+
+def encode(data: Any) -> str:
+    """Serialize an event to JSON text (orjson when available; the stdlib fallback writes the same text)"""
+    if orjson is not None:
+        return orjson.dumps(
+            data, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    return json.dumps(_as_orjson_writes(data), ensure_ascii=False, separators=(',', ':'), default=_default)
+
+
+def parse_topics(query: Optional[str]) -> Optional[List[str]]:
+    """Topics named in a ?topics=chat,alerts query.
+
+    Unknown names are ignored; None (meaning DEFAULT_TOPICS) when the query
+    is empty or names no known topic, so a typo doesn't leave a client
+    subscribed to nothing.
+    """
+    names = [name.strip() for name in (query or '').split(',') if name.strip()]
+    selected = [name for name in names if name in TOPICS]
+    if len(selected) < len(names):
+        logger.warning(f"Ignoring unknown WebSocket topics: {', '.join(sorted(set(names) - TOPICS))}")
+    return selected or None
+
+
+class WebSocketClient:
+    """One connected socket with its own bounded outbound queue and writer task"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int, topics: Iterable[str] = DEFAULT_TOPICS):
+        self.websocket = websocket
+        self.topics: Set[str] = set(topics)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.connected_at = time.time()
+        self.closed = False
+        self.first_seq: Optional[int] = None
+        self.live_at: Optional[int] = None  # stream position of the first live broadcast
+        self.taken = 0  # messages the writer has taken off the queue
+        self.sent = 0
+        self.max_depth = 0
+
+    def offer(self, message: Any) -> bool:
+        """Queue a message without waiting. Returns False when the queue is full."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+
+
+class ConnectionManager:
+    """Fan messages out to WebSocket clients without letting one client stall the rest.
+
+    broadcast() encodes the payload once and puts that same string on each
+    client's queue; a per-client writer task does the actual send. A client
+    whose queue overflows (a stalled tab or browser source) is disconnected.
+
+    Every broadcast event (except UNSEQUENCED_TYPES) carries a sequence
+    number and is kept in a replay ring, so a reconnecting client that sends
+    its last seen seq gets only the gap, or a snapshot when the gap is no
+    longer retained.
+
+    With batch_window > 0, chat events are held for up to batch_window
+    seconds (or until batch_max are waiting, or another sequenced event is
+    broadcast) and sent as one {"type": "chat_batch", "events": [...]} frame.
+    """
+
+    def __init__(self, queue_size: int = 256, close_timeout: float = 5.0,
+                 batch_window: float = 0.0, batch_max: int = 50, replay_size: int = 1000):
+        self.queue_size = queue_size
+        self.close_timeout = close_timeout
+        self.batch_window = batch_window
+        self.batch_max = max(1, batch_max)
+        self.clients: Dict[WebSocket, WebSocketClient] = {}
+        self._closing: Set[asyncio.Task] = set()
+        self._batch: List[Tuple[int, str]] = []
+        self._batch_timer: Optional[asyncio.Task] = None
+
+        # Changes on every restart so clients can tell a reset seq from a gap
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self._replay: Deque[Tuple[int, Optional[str], str]] = deque(maxlen=max(1, replay_size))
+        self.snapshot_provider: Optional[Callable[[], Dict]] = None
+
+        # Metrics
+        self.broadcasts = 0
+        self.batches = 0
+        self.batched_events = 0
+        self.resumed = 0
+        self.snapshots = 0
+        self.evicted = 0
+        self.last_broadcast = 0.0
+        self.max_broadcast = 0.0
+
+    def set_snapshot_provider(self, provider: Callable[[], Dict]):
+        """Register the callable that builds the state sent to clients too far behind to replay"""
+        self.snapshot_provider = provider
+
+    async def connect(self, websocket: WebSocket, topics: Optional[Iterable[str]] = None,
+                      last_seq: Optional[int] = None, epoch: Optional[str] = None) -> WebSocketClient:
+        """Accept a socket, subscribed to `topics` (DEFAULT_TOPICS when None).
+
+        With last_seq, events missed since then are queued before the client
+        starts receiving live broadcasts.
+        """
+        await websocket.accept()
+        client = WebSocketClient(websocket, self.queue_size, DEFAULT_TOPICS if topics is None else topics)
+        client.offer(encode({'type': 'hello', 'epoch': self.epoch, 'seq': self.seq}))
+        if last_seq is not None:
+            for message in self._resume_frames(client, last_seq, epoch, self._next_live_seq()):
+                client.offer(message)
+        client.writer = asyncio.create_task(self._write(client), name='ws-writer')
+        self.clients[websocket] = client
+        logger.info(f"WebSocket connected. Total: {len(self.clients)}")
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        client.closed = True
+        if client.writer:
+            client.writer.cancel()
+        logger.info(f"WebSocket disconnected. Total: {len(self.clients)}")
+
+    def _evict(self, client: WebSocketClient, reason: str):
+        """Drop a client that can't keep up and close its socket in the background"""
+        if self.clients.get(client.websocket) is not client:
+            return
+        self.evicted += 1
+        logger.warning(f"Evicting WebSocket client ({reason}). Total: {len(self.clients) - 1}")
+        self.disconnect(client.websocket)
+        task = asyncio.create_task(self._close(client.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=SLOW_CONSUMER_CLOSE_CODE), self.close_timeout)
+        except Exception:
+            pass
+
+    async def _write(self, client: WebSocketClient):
+        websocket = client.websocket
+        while True:
+            message = await client.queue.get()
+            client.taken += 1
+            try:
+                await websocket.send_text(message)
+            except Exception as e:
+                logger.debug(f"WebSocket send failed: {e}")
+                self.disconnect(websocket)
+                return
+            client.sent += 1
+
+    async def send(self, websocket: WebSocket, data: dict):
+        """Queue a message for one client (ordered with broadcasts)"""
+        client = self.clients.get(websocket)
+        if client and not client.offer(encode(data)):
+            self._evict(client, 'queue full')
+
+    def _next_live_seq(self) -> int:
+        """First seq that has not been handed to clients yet (held batches count as unsent)"""
+        return self._batch[0][0] if self._batch else self.seq + 1
+
+    def _resume_frames(self, client: WebSocketClient, last_seq: int, epoch: Optional[str],
+                       end_seq: int) -> List[str]:
+        """Frames bringing a client from last_seq up to (not including) end_seq"""
+        oldest = self._replay[0][0] if self._replay else self.seq + 1
+        gap = end_seq - last_seq - 1
+        if (epoch not in (None, self.epoch) or last_seq > self.seq or last_seq + 1 < oldest
+                or gap > self.queue_size // 2):
+            self.snapshots += 1
+            snapshot = self.snapshot_provider() if self.snapshot_provider else {}
+            return [encode({'type': 'snapshot', 'epoch': self.epoch, 'seq': end_seq - 1, 'data': snapshot})]
+
+        self.resumed += 1
+        frames = [encode({'type': 'resumed', 'epoch': self.epoch, 'from_seq': last_seq, 'seq': end_seq - 1})]
+        for seq, topic, message in islice(self._replay, max(0, last_seq + 1 - oldest), None):
+            if seq >= end_seq:
+                break
+            if topic is None or topic in client.topics:
+                frames.append(message)
+        return frames
+
+    def _resume(self, client: WebSocketClient, last_seq: int, epoch: Optional[str]):
+        """Put the missed events ahead of the live broadcasts already queued for the client"""
+        end_seq = client.first_seq if client.first_seq is not None else self._next_live_seq()
+        frames = self._resume_frames(client, last_seq, epoch, end_seq)
+        queued = []
+        while not client.queue.empty():
+            queued.append(client.queue.get_nowait())
+        # hello and replies queued before the first live broadcast stay in front
+        live_at = client.live_at if client.live_at is not None else client.taken + len(queued)
+        ahead = max(0, live_at - client.taken)
+        if client.live_at is not None:
+            client.live_at += len(frames)
+        for message in queued[:ahead] + frames + queued[ahead:]:
+            if not client.offer(message):
+                self._evict(client, 'queue full')
+                return
+
+    async def handle_message(self, websocket: WebSocket, text: str):
+        """Handle a client frame: subscribe/unsubscribe/resume requests, anything else is echoed back.
+
+        {"type": "subscribe", "topics": ["alerts"]} adds topics,
+        {"type": "unsubscribe", "topics": ["chat"]} removes them; both reply
+        with {"type": "subscribed", "topics": [...]} listing what is active now.
+        {"type": "resume", "last_seq": 41, "epoch": "..."} replays what was missed.
+        """
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+
+        try:
+            request = json.loads(text)
+        except ValueError:
+            request = None
+        action = request.get('type') if isinstance(request, dict) else None
+        if action == 'resume':
+            last_seq = request.get('last_seq')
+            if not isinstance(last_seq, int):
+                await self.send(websocket, {'type': 'error', 'message': 'last_seq must be an integer'})
+                return
+            self._resume(client, last_seq, request.get('epoch'))
+            return
+        if action not in ('subscribe', 'unsubscribe'):
+            # Echo back for testing
+            await self.send(websocket, {'type': 'pong', 'data': text})
+            return
+
+        topics = request.get('topics')
+        if isinstance(topics, str):
+            topics = [topics]
+        if not isinstance(topics, list) or not all(isinstance(topic, str) for topic in topics):
+            await self.send(websocket, {'type': 'error', 'message': 'topics must be a list of strings'})
+            return
+        unknown = sorted(set(topics) - TOPICS)
+        if unknown:
+            await self.send(websocket, {'type': 'error', 'message': f"Unknown topics: {', '.join(unknown)}"})
+            return
+
+        if action == 'subscribe':
+            client.topics.update(topics)
+        else:
+            client.topics.difference_update(topics)
+        await self.send(websocket, {'type': 'subscribed', 'topics': sorted(client.topics)})
+
+    def _sequence(self, data: dict, topic: Optional[str]) -> Tuple[int, str]:
+        """Stamp the next sequence number on an event, encode it and keep it for replay"""
+        self.seq += 1
+        message = encode({**data, 'seq': self.seq})
+        self._replay.append((self.seq, topic, message))
+        return self.seq, message
+
+    async def broadcast(self, data: dict, topic: Optional[str] = None):
+        """Broadcast message to clients subscribed to its topic"""
+        topic = topic or TOPIC_BY_TYPE.get(data.get('type'))
+        if data.get('type') in UNSEQUENCED_TYPES:
+            await self._deliver(encode(data), topic, None)
+            return
+        seq, message = self._sequence(data, topic)
+        if self.batch_window > 0 and data.get('type') in BATCHED_TYPES:
+            self._batch.append((seq, message))
+            if len(self._batch) >= self.batch_max:
+                await self._flush_batch()
+            elif self._batch_timer is None:
+                self._batch_timer = asyncio.create_task(self._flush_later(), name='ws-batch')
+            return
+        if self._batch:
+            # Held chat has lower seqs; send it first so clients see seq in order
+            await self._flush_batch()
+        await self._deliver(message, topic, seq)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.batch_window)
+        self._batch_timer = None
+        await self._flush_batch()
+
+    async def _flush_batch(self):
+        """Send the pending chat events (a lone event goes out as-is)"""
+        if self._batch_timer is not None and self._batch_timer is not asyncio.current_task():
+            self._batch_timer.cancel()
+        self._batch_timer = None
+        events, self._batch = self._batch, []
+        if not events:
+            return
+        first_seq = events[0][0]
+        if len(events) == 1:
+            await self._deliver(events[0][1], 'chat', first_seq)
+            return
+        self.batches += 1
+        self.batched_events += len(events)
+        # Events are already encoded; splice them rather than encoding again
+        message = '{"type":"chat_batch","events":[' + ','.join(text for _, text in events) + ']}'
+        await self._deliver(message, 'chat', first_seq)
+
+    async def _deliver(self, message: str, topic: Optional[str], seq: Optional[int]):
+        start = time.perf_counter()
+        for client in list(self.clients.values()):
+            if topic is not None and topic not in client.topics:
+                continue
+            if client.first_seq is None and seq is not None:
+                client.first_seq = seq
+                client.live_at = client.taken + client.queue.qsize()
+            if not client.offer(message):
+                self._evict(client, 'queue full')
+
+        elapsed = time.perf_counter() - start
+        self.broadcasts += 1
+        self.last_broadcast = elapsed
+        if elapsed > self.max_broadcast:
+            self.max_broadcast = elapsed
+
+    async def close_all(self):
+        """Disconnect every client (shutdown)"""
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        writers = [client.writer for client in self.clients.values() if client.writer]
+        for websocket in list(self.clients):
+            self.disconnect(websocket)
+        await asyncio.gather(*writers, *self._closing, return_exceptions=True)
+
+    def get_metrics(self) -> Dict:
+        """Connected clients, per-client queue depth and broadcast cost"""
+        return {
+            'clients': len(self.clients),
+            'subscribers': {
+                topic: sum(1 for client in self.clients.values() if topic in client.topics)
+                for topic in sorted(TOPICS)
+            },
+            'queue_size': self.queue_size,
+            'evicted': self.evicted,
+            'broadcasts': self.broadcasts,
+            'replay': {
+                'epoch': self.epoch,
+                'seq': self.seq,
+                'retained': len(self._replay),
+                'capacity': self._replay.maxlen,
+                'resumed': self.resumed,
+                'snapshots': self.snapshots
+            },
+            'batching': {
+                'window_ms': round(self.batch_window * 1000, 1),
+                'max': self.batch_max,
+                'batches': self.batches,
+                'events': self.batched_events
+            },
+            'broadcast_us': {
+                'last': round(self.last_broadcast * 1_000_000, 1),
+                'max': round(self.max_broadcast * 1_000_000, 1)
+            },
+            'connections': [
+                {
+                    'connected_at': client.connected_at,
+                    'topics': sorted(client.topics),
+                    'depth': client.queue.qsize(),
+                    'max_depth': client.max_depth,
+                    'sent': client.sent
+                }
+                for client in self.clients.values()
+            ]
+        }
+
+
+manager = ConnectionManager(
+    queue_size=int(os.getenv('WS_CLIENT_QUEUE_SIZE', '256')),
+    close_timeout=float(os.getenv('WS_CLOSE_TIMEOUT', '5')),
+    batch_window=float(os.getenv('WS_BATCH_WINDOW_MS', '0')) / 1000,
+    batch_max=int(os.getenv('WS_BATCH_MAX', '50')),
+    replay_size=int(os.getenv('WS_REPLAY_SIZE', '1000'))
+)
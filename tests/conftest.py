@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Keep the OAuth token store out of the source tree; must be set before oauth_database is imported
+os.environ['DATABASE_URL'] = f"sqlite:///{Path(tempfile.mkdtemp()) / 'oauth_tokens.db'}"
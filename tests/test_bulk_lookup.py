@@ -0,0 +1,108 @@
+import asyncio
+
+import httpx
+import pytest
+
+from bulk_lookup import bulk_lookup, candidate_logins
+from helix_client import helix
+from user_cache import user_cache
+
+
+class FakeHelix:
+    """helix/users and helix/subscriptions with Twitch's all-or-nothing 400 on a bad login"""
+
+    def __init__(self, subscribed=()):
+        self.subscribed = set(subscribed)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.url.path)
+        if request.url.path == '/helix/users':
+            logins = request.url.params.get_list('login')
+            if any(not login.replace('_', '').isalnum() or len(login) > 25 for login in logins):
+                return httpx.Response(400, json={'error': 'Bad Request'})
+            return httpx.Response(200, json={'data': [
+                {'id': f'id-{login}', 'login': login, 'display_name': login.title()}
+                for login in logins if not login.startswith('nobody')
+            ]})
+        user_ids = request.url.params.get_list('user_id')
+        return httpx.Response(200, json={'data': [
+            {'user_id': user_id, 'tier': '2000', 'is_gift': False}
+            for user_id in user_ids if user_id in self.subscribed
+        ]})
+
+
+@pytest.fixture
+def fake_helix(monkeypatch):
+    fake = FakeHelix(subscribed={'id-alice'})
+    monkeypatch.setattr(helix, '_client', httpx.AsyncClient(transport=httpx.MockTransport(fake)))
+    monkeypatch.setattr(user_cache, '_by_login', type(user_cache._by_login)())
+    monkeypatch.setattr(user_cache, '_login_by_id', {})
+    return fake
+
+
+def test_candidate_logins_are_valid_twitch_logins():
+    assert candidate_logins('Alice') == ['alice']
+    assert candidate_logins('bob_ttv123') == ['bob_ttv123', 'bob']
+    assert candidate_logins('john.doe') == ['johndoe']
+    assert candidate_logins('john doe') == []
+    assert candidate_logins('a' * 30) == []
+
+
+def test_annotate_queue_skips_impossible_logins(fake_helix):
+    queue = [
+        {'id': '1', 'discord_username': 'alice', 'twitch_username': None},
+        {'id': '2', 'discord_username': 'john.doe', 'twitch_username': None},
+        {'id': '3', 'discord_username': 'some one', 'twitch_username': None},
+        {'id': '4', 'discord_username': 'carol', 'twitch_username': 'Not A Login'},
+        {'id': '5', 'discord_username': 'nobody42', 'twitch_username': None},
+    ]
+    annotated = asyncio.run(bulk_lookup.annotate_submissions(queue, 'id-broadcaster', 'token'))
+    twitch = {sub['id']: sub['twitch'] for sub in annotated}
+
+    assert fake_helix.requests == ['/helix/users', '/helix/subscriptions']
+    assert twitch['1']['subscription']['tier'] == 'T2'
+    assert twitch['2']['twitch_username'] == 'johndoe'
+    assert twitch['2']['subscription']['is_subscribed'] is False
+    assert twitch['3']['matched'] is False
+    assert twitch['4']['subscription']['found'] is False
+    assert twitch['5']['matched'] is False
+
+
+def test_refused_chunk_does_not_fail_the_others(fake_helix, monkeypatch):
+    original = fake_helix.__call__
+
+    def refuse_second_chunk(request):
+        if request.url.path == '/helix/users' and 'login=user100' in str(request.url):
+            return httpx.Response(500)
+        return original(request)
+
+    monkeypatch.setattr(helix, '_client', httpx.AsyncClient(transport=httpx.MockTransport(refuse_second_chunk)))
+    logins = [f'user{i}' for i in range(150)]
+    users = asyncio.run(user_cache.get_users(logins, 'token'))
+
+    assert all(users[f'user{i}'] for i in range(100))
+    assert not any(users[f'user{i}'] for i in range(100, 150))
+    # Not cached as missing: the next lookup asks Helix again
+    assert user_cache.lookup('user120') == (False, None)
+
+
+def test_subscriptions_checked_only_for_chosen_matches(fake_helix, monkeypatch):
+    checked = []
+    get_subscriptions = bulk_lookup.get_subscriptions
+
+    async def spy(user_ids, *args, **kwargs):
+        user_ids = list(user_ids)
+        checked.extend(user_ids)
+        return await get_subscriptions(user_ids, *args, **kwargs)
+
+    monkeypatch.setattr(bulk_lookup, 'get_subscriptions', spy)
+    queue = [
+        # Both 'bob_ttv' and the cleaned 'bob' exist; the exact login wins
+        {'id': '1', 'discord_username': 'bob_ttv', 'twitch_username': None},
+        {'id': '2', 'discord_username': 'carol', 'twitch_username': 'dave'},
+    ]
+    annotated = asyncio.run(bulk_lookup.annotate_submissions(queue, 'id-broadcaster', 'token'))
+    assert annotated[0]['twitch']['twitch_username'] == 'bob_ttv'
+    assert sorted(checked) == ['id-bob_ttv', 'id-dave']
+
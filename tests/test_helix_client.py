@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import httpx
+
+from helix_client import BACKGROUND, RateLimitedTransport
+
+
+def rate_limited_until(reset_in: float, failures: int):
+    """Transport answering 429 (bucket resets in reset_in seconds) to the first `failures` requests"""
+    calls = []
+
+    def handler(request):
+        calls.append(time.monotonic())
+        if len(calls) <= failures:
+            return httpx.Response(429, headers={
+                'Ratelimit-Limit': '800', 'Ratelimit-Remaining': '0',
+                'Ratelimit-Reset': str(time.time() + reset_in)
+            })
+        return httpx.Response(200, json={'data': []})
+
+    return httpx.MockTransport(handler), calls
+
+
+def get(transport, **kwargs):
+    async def main():
+        async with httpx.AsyncClient(transport=transport) as client:
+            started = time.monotonic()
+            response = await client.get('https://api.twitch.tv/helix/users', **kwargs)
+            return response.status_code, time.monotonic() - started
+
+    return asyncio.run(main())
+
+
+def test_interactive_request_gets_429_back_quickly():
+    mock, calls = rate_limited_until(reset_in=30, failures=1)
+    transport = RateLimitedTransport(mock, max_retry_wait=60, interactive_retry_wait=3)
+    status, elapsed = get(transport)
+    assert status == 429
+    assert elapsed < 1
+    assert len(calls) == 1
+
+
+def test_interactive_request_retries_a_short_reset():
+    mock, calls = rate_limited_until(reset_in=0.2, failures=1)
+    transport = RateLimitedTransport(mock, interactive_retry_wait=3)
+    status, elapsed = get(transport)
+    assert status == 200
+    assert len(calls) == 2
+    assert transport.retries == 1
+
+
+def test_retry_waits_share_one_budget():
+    mock, calls = rate_limited_until(reset_in=0.3, failures=5)
+    transport = RateLimitedTransport(mock, max_retries=5, interactive_retry_wait=0.5)
+    status, elapsed = get(transport)
+    assert status == 429
+    assert len(calls) == 2  # 0.3s spent on the first retry leaves too little for a second
+    assert elapsed < 1
+
+
+def test_background_request_waits_for_longer_reset():
+    mock, calls = rate_limited_until(reset_in=1.0, failures=1)
+    transport = RateLimitedTransport(mock, max_retry_wait=60, interactive_retry_wait=0.5)
+    status, elapsed = get(transport, extensions=BACKGROUND)
+    assert status == 200
+    assert len(calls) == 2
+    assert elapsed >= 0.9
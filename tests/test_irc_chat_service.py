@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+from irc_chat_service import TwitchIRCChat
+from rate_limit import SlidingWindowLimiter
+
+
+class FakeTwitch:
+    """Local IRC server that records JOINs and echoes them once `echo` is set"""
+
+    def __init__(self):
+        self.joins = []  # (channel, monotonic time received)
+        self.joins_by_connection = []
+        self.parts = []
+        self.writers = []
+        self.echo = asyncio.Event()
+        self.echo.set()
+        self.server = None
+
+    async def handle(self, reader, writer):
+        self.writers.append(writer)
+        joins = []
+        self.joins_by_connection.append(joins)
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command, _, argument = line.decode().strip().partition(' ')
+            if command == 'JOIN':
+                self.joins.append((argument.lstrip('#'), time.monotonic()))
+                joins.append(argument.lstrip('#'))
+                await self.echo.wait()
+                writer.write(f":justinfan12345!justinfan12345@justinfan12345.tmi.twitch.tv JOIN {argument}\r\n".encode())
+                await writer.drain()
+            elif command == 'PART':
+                self.parts.append(argument.lstrip('#'))
+        writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    def joined(self):
+        return [channel for channel, _ in self.joins]
+
+
+def chat_against(port, channels, join_limiter=None):
+    chat = TwitchIRCChat(channels=channels, join_limiter=join_limiter or SlidingWindowLimiter(20, 10))
+    chat.server, chat.port = '127.0.0.1', port
+    return chat
+
+
+async def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+def test_joins_are_paced_by_the_shared_limiter():
+    async def main():
+        twitch = FakeTwitch()
+        port = await twitch.start()
+        chat = chat_against(port, ['a', 'b', 'c', 'd'], SlidingWindowLimiter(2, 0.3))
+        await chat.start()
+        try:
+            await wait_until(lambda: len(twitch.joins) == 4)
+        finally:
+            await chat.disconnect()
+            twitch.server.close()
+        return twitch.joins
+
+    joins = asyncio.run(main())
+    assert [channel for channel, _ in joins] == ['a', 'b', 'c', 'd']
+    # Two JOINs per 0.3s window: the third waits for the first to age out
+    assert joins[2][1] - joins[0][1] >= 0.29
+    assert joins[1][1] - joins[0][1] < 0.29
+
+
+def test_channel_joined_while_connecting_is_joined_on_the_new_connection():
+    async def main():
+        twitch = FakeTwitch()
+        twitch.echo.clear()  # hold the login at the JOIN confirmation
+        port = await twitch.start()
+        chat = chat_against(port, ['first'])
+        await chat.start()
+        try:
+            await wait_until(lambda: twitch.joined() == ['first'])
+            assert chat.writer is None
+            await chat.join('second')
+            await chat.part('first')
+            twitch.echo.set()
+            await wait_until(lambda: 'second' in twitch.joined() and twitch.parts)
+        finally:
+            await chat.disconnect()
+            twitch.server.close()
+        return twitch, chat
+
+    twitch, chat = asyncio.run(main())
+    assert twitch.joined() == ['first', 'second']
+    assert twitch.parts == ['first']
+    assert chat.channels == ['second']
+
+
+def test_channel_joined_during_reconnect_handoff_is_joined_on_the_replacement():
+    async def main():
+        twitch = FakeTwitch()
+        port = await twitch.start()
+        chat = chat_against(port, ['first'])
+        await chat.start()
+        try:
+            await wait_until(lambda: chat.writer is not None)
+            old_writer = chat.writer
+            twitch.echo.clear()
+            twitch.writers[0].write(b":tmi.twitch.tv RECONNECT\r\n")
+            await wait_until(lambda: len(twitch.joins_by_connection) == 2 and twitch.joins_by_connection[1])
+            # Sent on the old socket, which the handoff is about to replace
+            await chat.join('second')
+            twitch.echo.set()
+            await wait_until(lambda: chat.writer is not old_writer and 'second' in twitch.joins_by_connection[1])
+        finally:
+            await chat.disconnect()
+            twitch.server.close()
+        return twitch
+
+    twitch = asyncio.run(main())
+    assert twitch.joins_by_connection[1] == ['first', 'second']
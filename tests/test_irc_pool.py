@@ -0,0 +1,72 @@
+import asyncio
+
+import irc_pool
+from irc_pool import IRCConnectionPool
+
+
+class FakeShard:
+    """Stands in for a TwitchIRCChat connection (no sockets)"""
+
+    def __init__(self, channels=None, join_limiter=None):
+        self.channels = list(channels or [])
+        self.writer = None
+
+    def set_message_callback(self, callback):
+        self.route = callback
+
+    def set_emote_service(self, emote_service):
+        pass
+
+    async def join(self, channel):
+        self.channels.append(channel)
+
+    async def part(self, channel):
+        self.channels.remove(channel)
+
+    async def start(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+
+def test_full_pool_does_not_register_callback(monkeypatch):
+    monkeypatch.setattr(irc_pool, 'TwitchIRCChat', FakeShard)
+    received = []
+
+    async def on_message(parsed):
+        received.append(parsed['channel'])
+
+    async def main():
+        pool = IRCConnectionPool(channels_per_connection=1, max_connections=1)
+        assert await pool.add_channel('first', on_message)
+        assert not await pool.add_channel('second', on_message)
+        assert not pool.add_callback('second', on_message)
+        for channel in ('first', 'second'):
+            await pool._route({'channel': channel})
+        return pool
+
+    pool = asyncio.run(main())
+    assert received == ['first']
+    assert 'second' not in pool._callbacks
+
+
+def test_channels_go_to_least_loaded_shard_with_room(monkeypatch):
+    monkeypatch.setattr(irc_pool, 'TwitchIRCChat', FakeShard)
+
+    async def main():
+        pool = IRCConnectionPool(channels_per_connection=2, max_connections=3)
+        for channel in ('a', 'b', 'c', 'd', 'e'):
+            assert await pool.add_channel(channel)
+        placed = {entry['channel']: entry['connection'] for entry in pool.get_channels()}
+        # A freed slot is reused before the pool counts as full
+        assert await pool.remove_channel('#A')
+        assert await pool.add_channel('f')
+        assert await pool.add_channel('g')
+        full = await pool.add_channel('h')
+        return placed, pool, full
+
+    placed, pool, full = asyncio.run(main())
+    assert placed == {'a': 0, 'b': 0, 'c': 1, 'd': 1, 'e': 2}
+    assert [shard.channels for shard in pool.shards] == [['b', 'f'], ['c', 'd'], ['e', 'g']]
+    assert not full
@@ -0,0 +1,181 @@
+import asyncio
+
+import pytest
+
+from benchmarks.mock_obs_server import start
+from obs_client import EVENTS_ALL, EVENTS_INPUT_VOLUME_METERS, OBSClient, OBSError
+
+PASSWORD = 'secret'
+
+
+def run_against_mock(scenario, password=PASSWORD, latency=0.0, event_subscriptions=EVENTS_ALL):
+    """Start the mock server on a free port, connect a client and run scenario(client, mock, port)"""
+    async def main():
+        mock, server = await start(port=0, password=password, latency=latency)
+        port = server.sockets[0].getsockname()[1]
+        client = OBSClient('localhost', port, password, event_subscriptions, request_timeout=2)
+        try:
+            await client.connect(timeout=2)
+            return await scenario(client, mock, port)
+        finally:
+            await client.disconnect()
+            mock.meter_task.cancel()
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(main())
+
+
+def test_identify_with_password():
+    async def scenario(client, mock, port):
+        assert client.connected
+        assert client.negotiated_rpc_version == 1
+        assert (await client.call('GetCurrentProgramScene'))['currentProgramSceneName'] == 'Main'
+
+        bad = OBSClient('localhost', port, 'wrong')
+        with pytest.raises(Exception):
+            await bad.connect(timeout=2)
+        assert not bad.connected
+
+    run_against_mock(scenario)
+
+
+def test_responses_matched_by_request_id():
+    async def scenario(client, mock, port):
+        # The Sleep responses arrive after the scene list ones, out of request order
+        results = await asyncio.gather(
+            client.call('Sleep', {'sleepMillis': 100}),
+            client.call('GetSceneItemList', {'sceneName': 'Main'}),
+            client.call('Sleep', {'sleepMillis': 50}),
+            client.call('GetSceneItemList', {'sceneName': 'BRB'}),
+        )
+        assert results[0] == {} and results[2] == {}
+        assert [item['sourceName'] for item in results[1]['sceneItems']] == ['Webcam', 'Game Capture', 'Alerts']
+        assert [item['sourceName'] for item in results[3]['sceneItems']] == ['BRB Loop']
+        assert not client._pending
+
+        with pytest.raises(OBSError) as error:
+            await client.call('SetCurrentProgramScene', {'sceneName': 'Nope'})
+        assert error.value.code == 600
+
+    run_against_mock(scenario, latency=0.01)
+
+
+def test_batch_results_in_order():
+    async def scenario(client, mock, port):
+        results = await client.batch([
+            ('GetInputMute', {'inputName': 'Mic/Aux'}),
+            ('GetInputMute', {'inputName': 'Nope'}),
+            {'requestType': 'GetCurrentProgramScene'},
+        ])
+        assert [result['requestType'] for result in results] == [
+            'GetInputMute', 'GetInputMute', 'GetCurrentProgramScene']
+        assert results[0]['responseData'] == {'inputMuted': False}
+        assert results[1]['requestStatus']['code'] == 600
+        assert results[2]['responseData']['currentProgramSceneName'] == 'Main'
+
+        halted = await client.batch([('GetInputMute', {'inputName': 'Nope'}), ('GetStats', None)],
+                                    halt_on_failure=True)
+        assert len(halted) == 1
+
+    run_against_mock(scenario)
+
+
+def test_events_dispatched_in_order():
+    async def scenario(client, mock, port):
+        seen = []
+        done = asyncio.Event()
+
+        async def on_scene(data):
+            seen.append(data['sceneName'])
+            if len(seen) == 3:
+                done.set()
+
+        client.on('CurrentProgramSceneChanged', on_scene)
+        for scene in ('BRB', 'Starting Soon', 'Main'):
+            await client.call('SetCurrentProgramScene', {'sceneName': scene})
+        await asyncio.wait_for(done.wait(), 2)
+        assert seen == ['BRB', 'Starting Soon', 'Main']
+
+    run_against_mock(scenario)
+
+
+def test_handler_can_call_back_into_client():
+    async def scenario(client, mock, port):
+        answered = asyncio.Event()
+
+        async def on_mute(data):
+            # Would deadlock if events were dispatched from the reader itself
+            scene = await client.call('GetCurrentProgramScene')
+            assert scene['currentProgramSceneName'] == 'Main'
+            answered.set()
+
+        client.on('InputMuteStateChanged', on_mute)
+        await client.call('SetInputMute', {'inputName': 'Mic/Aux', 'inputMuted': True})
+        await asyncio.wait_for(answered.wait(), 2)
+
+    run_against_mock(scenario)
+
+
+def test_opt_in_events_and_disconnect_callback():
+    async def scenario(client, mock, port):
+        meters = asyncio.Event()
+        lost = asyncio.Event()
+
+        async def on_meters(data):
+            assert {entry['inputName'] for entry in data['inputs']} == {'Mic/Aux', 'Desktop Audio'}
+            meters.set()
+
+        async def on_disconnect():
+            lost.set()
+
+        client.on('InputVolumeMeters', on_meters)
+        client.on_disconnect = on_disconnect
+        await asyncio.wait_for(meters.wait(), 2)
+
+        for websocket in list(mock.clients):
+            await websocket.close()
+        await asyncio.wait_for(lost.wait(), 2)
+        assert not client.connected
+        with pytest.raises(ConnectionError):
+            await client.call('GetStats')
+
+    run_against_mock(scenario, event_subscriptions=EVENTS_ALL | EVENTS_INPUT_VOLUME_METERS)
+
+
+def test_backpressure_drops_meters_first_and_resyncs_after_lost_state_events():
+    async def main():
+        client = OBSClient(event_queue_size=4)
+        seen, resynced_after = [], []
+
+        async def on_event(data):
+            seen.append(data['n'])
+
+        async def on_resync():
+            resynced_after.append(list(seen))
+
+        client.on('InputVolumeMeters', on_event)
+        client.on('CurrentProgramSceneChanged', on_event)
+        client.on_resync = on_resync
+
+        def event(event_type, n):
+            client._queue_event({'eventType': event_type, 'eventData': {'n': n}})
+
+        # Handlers are stalled (no dispatcher yet): meters stop at half the queue, state changes fill the rest
+        for n in range(3):
+            event('InputVolumeMeters', n)
+        event('CurrentProgramSceneChanged', 3)
+        event('CurrentProgramSceneChanged', 4)
+        assert (client.dropped_events, client.dropped_state_events) == (1, 0)
+        event('CurrentProgramSceneChanged', 5)
+        assert (client.dropped_events, client.dropped_state_events) == (2, 1)
+        event('CurrentProgramSceneChanged', 6)
+
+        client._queue_event(None)
+        await asyncio.wait_for(client._dispatch_events(), 2)
+        return seen, resynced_after
+
+    seen, resynced_after = asyncio.run(main())
+    assert seen == [0, 1, 3, 4]
+    # Resynced once, after everything queued before the lost state change
+    assert resynced_after == [[0, 1, 3, 4]]
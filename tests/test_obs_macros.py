@@ -0,0 +1,27 @@
+import pytest
+
+from obs_macros import MacroStore
+
+STEPS = [{'action': 'switch_scene', 'scene': 'BRB'}, {'action': 'mute', 'input': 'Mic/Aux'}]
+
+
+def test_macros_persist(tmp_path):
+    path = tmp_path / 'macros.json'
+    MacroStore(path).put('brb', STEPS, 'Be right back')
+    assert MacroStore(path).get('brb') == {'steps': STEPS, 'description': 'Be right back',
+                                           'halt_on_failure': False}
+    assert not path.with_suffix('.tmp').exists()
+
+
+@pytest.mark.parametrize('name', ['run', 'Run'])
+def test_reserved_name_rejected(tmp_path, name):
+    store = MacroStore(tmp_path / 'macros.json')
+    with pytest.raises(ValueError, match='reserved'):
+        store.put(name, STEPS)
+    assert store.list() == {}
+
+
+def test_invalid_steps_rejected(tmp_path):
+    store = MacroStore(tmp_path / 'macros.json')
+    with pytest.raises(ValueError, match='missing scene'):
+        store.put('broken', [{'action': 'switch_scene'}])
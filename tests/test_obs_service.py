@@ -0,0 +1,65 @@
+import asyncio
+
+from benchmarks.mock_obs_server import start
+from obs_service import OBSService
+
+
+def test_rates_follow_sampler_cadence_despite_extra_refreshes():
+    async def main():
+        mock, server = await start(port=0, latency=0.001)
+        mock.streaming = True
+        mock.bitrate_kbps = 6000.0
+        mock.drop_pct = 10.0
+        service = OBSService()
+        service.port = server.sockets[0].getsockname()[1]
+        service.sample_interval = 0.5
+        try:
+            await service.connect()
+            assert service.connected
+            # Watchdog-style refreshes at a different, faster cadence
+            for _ in range(40):
+                await service.update_stats()
+                await asyncio.sleep(0.05)
+            history = service.get_stats_history(points=100)
+            return service.current_stats.copy(), history
+        finally:
+            await service.disconnect()
+            mock.meter_task.cancel()
+            server.close()
+            await server.wait_closed()
+
+    stats, history = asyncio.run(main())
+    assert abs(stats['output_bitrate'] - 6000) < 300
+    # Over a 50 ms refresh (3 frames) this would read 0% or 33%; over a 0.5 s sample, about 10%
+    dropped = history['series']['dropped_pct'][1:]
+    assert len(dropped) >= 3
+    assert all(4 < value < 17 for value in dropped), dropped
+
+
+def test_macro_sources_resolve_in_scene_switched_to_earlier():
+    async def main():
+        mock, server = await start(port=0)
+        mock.scenes['BRB'].append({'sceneItemId': 2, 'sourceName': 'Webcam', 'sceneItemEnabled': True})
+        service = OBSService()
+        service.port = server.sockets[0].getsockname()[1]
+        try:
+            await service.connect()
+            assert service.current_stats['current_scene'] == 'Main'
+            result = await service.run_macro([
+                {'action': 'switch_scene', 'scene': 'BRB'},
+                {'action': 'hide_source', 'source': 'Webcam'},
+            ])
+            return result, mock
+        finally:
+            await service.disconnect()
+            mock.meter_task.cancel()
+            server.close()
+            await server.wait_closed()
+
+    result, mock = asyncio.run(main())
+    assert result['success'], result
+    assert mock.current_scene == 'BRB'
+    webcams = {name: next(item for item in items if item['sourceName'] == 'Webcam')
+               for name, items in mock.scenes.items() if name in ('Main', 'BRB')}
+    assert webcams['BRB']['sceneItemEnabled'] is False
+    assert webcams['Main']['sceneItemEnabled'] is True
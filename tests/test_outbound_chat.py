@@ -0,0 +1,109 @@
+import asyncio
+
+from outbound_chat import OutboundChatQueue, PRIORITY_HIGH, PRIORITY_LOW
+from rate_limit import SlidingWindowLimiter
+
+
+def run(send, scenario, **options):
+    async def main():
+        queue = OutboundChatQueue(send, SlidingWindowLimiter(100, 30), retry_delay=0.01, **options)
+        try:
+            await scenario(queue)
+        finally:
+            await queue.stop()
+        return queue
+
+    return asyncio.run(main())
+
+
+def test_failed_send_is_retried():
+    attempts = []
+
+    async def send(text):
+        attempts.append(text)
+        return len(attempts) > 1  # first write fails
+
+    async def scenario(queue):
+        queue.enqueue('hello')
+        await asyncio.sleep(0.1)
+
+    queue = run(send, scenario)
+    assert attempts == ['hello', 'hello']
+    assert (queue.sent, queue.retried, queue.failed) == (1, 1, 0)
+
+
+def test_retries_are_bounded():
+    attempts = []
+
+    async def send(text):
+        attempts.append(text)
+        raise ConnectionError('not connected')
+
+    async def scenario(queue):
+        queue.enqueue('hello')
+        await asyncio.sleep(0.2)
+
+    queue = run(send, scenario, max_retries=2)
+    assert len(attempts) == 3
+    assert (queue.sent, queue.retried, queue.failed) == (0, 2, 1)
+    assert queue.get_metrics()['pending'] == 0
+
+
+def test_duplicates_merge_and_priority_orders_sends():
+    sent = []
+
+    async def send(text):
+        sent.append(text)
+        return True
+
+    async def scenario(queue):
+        assert queue.enqueue('!help reply', PRIORITY_LOW)
+        assert not queue.enqueue('!help reply', PRIORITY_LOW)
+        assert queue.enqueue('mod reply', PRIORITY_HIGH)
+        await asyncio.sleep(0.05)
+
+    queue = run(send, scenario)
+    assert sent == ['mod reply', '!help reply']
+    assert queue.merged == 1
+
+
+def run_limited(scenario, limit=1, period=0.2):
+    sent = []
+
+    async def send(text):
+        sent.append(text)
+        return True
+
+    async def main():
+        queue = OutboundChatQueue(send, SlidingWindowLimiter(limit, period))
+        try:
+            await scenario(queue)
+        finally:
+            await queue.stop()
+
+    asyncio.run(main())
+    return sent
+
+
+def test_promotion_while_waiting_for_budget_sends_once():
+    async def scenario(queue):
+        queue.enqueue('first', PRIORITY_LOW)
+        await asyncio.sleep(0.01)
+        queue.enqueue('hello', PRIORITY_LOW)
+        await asyncio.sleep(0.05)  # worker is now waiting for budget
+        queue.enqueue('hello', PRIORITY_HIGH)
+        await asyncio.sleep(0.5)
+
+    assert run_limited(scenario) == ['first', 'hello']
+
+
+def test_mod_reply_overtakes_message_waiting_for_budget():
+    async def scenario(queue):
+        queue.enqueue('first', PRIORITY_LOW)
+        await asyncio.sleep(0.01)
+        queue.enqueue('!help reply', PRIORITY_LOW)
+        await asyncio.sleep(0.05)
+        queue.enqueue('mod reply', PRIORITY_HIGH)
+        await asyncio.sleep(0.6)
+
+    assert run_limited(scenario) == ['first', 'mod reply', '!help reply']
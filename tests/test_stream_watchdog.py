@@ -0,0 +1,56 @@
+import asyncio
+
+from stream_watchdog import DEGRADED, FAILED_OVER, StreamWatchdog
+
+
+class FakeOBS:
+    """Streaming at 500 kbps (below the 1000 kbps threshold); switch_scene answers from a script"""
+
+    def __init__(self, switch_results):
+        self.connected = True
+        self.current_stats = {'streaming': True, 'current_scene': 'Main'}
+        self.counters = None
+        self.switch_results = list(switch_results)
+        self.switches = []
+        self._time = 0.0
+        self._bytes = 0
+
+    async def update_stats(self):
+        self._time += 1.0
+        self._bytes += 500 * 1000 // 8
+        self.counters = {'time': self._time, 'output_bytes': self._bytes, 'output_skipped': 0,
+                         'output_total': int(self._time * 60), 'render_skipped': 0,
+                         'render_total': int(self._time * 60)}
+
+    async def switch_scene(self, scene_name):
+        self.switches.append(scene_name)
+        switched = self.switch_results.pop(0)
+        if switched:
+            self.current_stats['current_scene'] = scene_name
+        return switched
+
+
+def test_failed_switch_stays_degraded_and_retries():
+    obs = FakeOBS([False, False, True])
+    watchdog = StreamWatchdog(obs, 'BRB', trigger_after=0.0)
+    alerts = []
+
+    async def on_alert(alert):
+        alerts.append((alert['event'], alert['scene_switched']))
+
+    watchdog.set_alert_callback(on_alert)
+
+    async def main():
+        await watchdog.check()  # first sample; no window yet
+        states = []
+        for _ in range(3):
+            await watchdog.check()
+            states.append(watchdog.state)
+        return states
+
+    states = asyncio.run(main())
+    assert states == [DEGRADED, DEGRADED, FAILED_OVER]
+    assert obs.switches == ['BRB', 'BRB', 'BRB']
+    assert (watchdog.failovers, watchdog.failed_failovers) == (1, 2)
+    assert watchdog.previous_scene == 'Main'
+    assert alerts == [('failover_failed', False), ('failover', True)]
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session, select
+
+from oauth_database import TokenData, create_db_and_tables, engine
+from oauth_service import oauth_service
+from token_manager import TokenManager
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    create_db_and_tables()
+    with Session(engine) as session:
+        for token in session.exec(select(TokenData)).all():
+            session.delete(token)
+        session.commit()
+
+
+def login(access_token: str, expires_in: int = 3600) -> TokenManager:
+    """Store a token the way the OAuth callback does and hand it to a manager"""
+    manager = TokenManager()
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=expires_in)
+    with Session(engine) as session:
+        existing_token = session.exec(select(TokenData).where(TokenData.user_id == '42')).first()
+        if existing_token:
+            existing_token.access_token = access_token
+            existing_token.expires_at = expires_at
+            session.add(existing_token)
+        else:
+            new_token = TokenData(user_id='42', username='streamer', access_token=access_token,
+                                  refresh_token='refresh-1', expires_at=expires_at, scopes='',
+                                  created_at=now, updated_at=now)
+            session.add(new_token)
+        session.commit()
+        manager.set_token(existing_token or new_token)
+    return manager
+
+
+def test_get_token_after_new_login():
+    manager = login('access-1')
+    token = asyncio.run(manager.get_token())
+    assert token is not None
+    assert token.access_token == 'access-1'
+    assert token.user_id == '42'
+    assert manager.seconds_left() > 3500
+
+
+def test_get_token_after_repeat_login():
+    login('access-1')
+    manager = login('access-2')
+    token = asyncio.run(manager.get_token())
+    assert token.access_token == 'access-2'
+    assert token.refresh_token == 'refresh-1'
+
+
+def test_expiring_token_is_refreshed_once(monkeypatch):
+    calls = []
+
+    async def refresh_access_token(refresh_token):
+        calls.append(refresh_token)
+        await asyncio.sleep(0.01)
+        return {'access_token': 'access-new', 'refresh_token': 'refresh-2', 'expires_in': 14400}
+
+    monkeypatch.setattr(oauth_service, 'refresh_access_token', refresh_access_token)
+    manager = login('access-old', expires_in=60)
+
+    async def run():
+        tokens = await asyncio.gather(*(manager.get_token() for _ in range(10)))
+        await manager.stop()  # waits for the database write-back
+        return tokens
+
+    tokens = asyncio.run(run())
+    assert calls == ['refresh-1']
+    assert {token.access_token for token in tokens} == {'access-new'}
+    with Session(engine) as session:
+        stored = session.exec(select(TokenData)).one()
+        assert (stored.access_token, stored.refresh_token) == ('access-new', 'refresh-2')
+
+
+def test_failed_refresh_is_not_retried_during_cooldown(monkeypatch):
+    calls = []
+
+    async def refresh_access_token(refresh_token):
+        calls.append(refresh_token)
+        return {'error': 'Bad Request', 'message': 'Invalid refresh token'}
+
+    monkeypatch.setattr(oauth_service, 'refresh_access_token', refresh_access_token)
+    manager = login('access-old', expires_in=60)
+    manager.failure_cooldown = 0.2
+
+    async def run():
+        first = [await manager.get_token() for _ in range(5)]
+        await asyncio.sleep(0.25)
+        after_cooldown = await manager.get_token()
+        return first, after_cooldown
+
+    first, after_cooldown = asyncio.run(run())
+    # Still valid for a minute, so callers keep getting the old token meanwhile
+    assert {token.access_token for token in first} == {'access-old'}
+    assert after_cooldown.access_token == 'access-old'
+    assert calls == ['refresh-1', 'refresh-1']
+    assert manager.skipped_refreshes == 4
+
+    # A new login isn't held back by the old token's failure
+    manager.set_token(manager.cached)
+    asyncio.run(manager.get_token())
+    assert len(calls) == 3
@@ -0,0 +1,37 @@
+import asyncio
+
+import httpx
+import pytest
+
+from helix_client import helix
+from user_cache import UserCache
+
+
+def test_empty_display_name_renews_without_rewriting():
+    cache = UserCache()
+    cache.put('77', 'quiet', '')
+    entry = cache._by_login['quiet'][0]
+    cache.put('77', 'quiet', '')
+    assert cache._by_login['quiet'][0] is entry
+    assert entry['display_name'] == 'quiet'
+
+
+def test_rename_drops_old_login():
+    cache = UserCache()
+    cache.put('77', 'oldname', 'OldName')
+    cache.put('77', 'newname', 'NewName')
+    assert cache.get_by_login('oldname') is None
+    assert cache.get_by_id('77')['login'] == 'newname'
+
+
+def test_single_lookup_raises_helix_errors(monkeypatch):
+    def rate_limited(request):
+        return httpx.Response(429, json={'error': 'Too Many Requests'})
+
+    monkeypatch.setattr(helix, '_client', httpx.AsyncClient(transport=httpx.MockTransport(rate_limited)))
+    cache = UserCache()
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(cache.get_user('somebody', 'token'))
+    # Not remembered as missing, and the bulk path still answers
+    assert cache.lookup('somebody') == (False, None)
+    assert asyncio.run(cache.get_users(['somebody'], 'token')) == {'somebody': None}
@@ -0,0 +1,231 @@
+import asyncio
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import websocket_manager
+from websocket_manager import encode, parse_topics
+
+
+PAYLOAD = {
+    'type': 'obs_state',
+    'data': {
+        'fps': np.float64(59.94),
+        'dropped': np.int64(3),
+        'streaming': np.bool_(True),
+        'levels': np.array([-12.5, -60.0]),
+        'at': datetime(2026, 1, 1, 12, 30),
+        1: 'int key',
+    },
+}
+
+# Values json.dumps writes differently from orjson unless told otherwise
+MISMATCH_PAYLOAD = {
+    'message': 'héllo 🎉 こんにちは',
+    'kbps': float('nan'),
+    'peak': np.float32(0.1),
+    'levels': np.array([[0.25, np.nan], [-np.inf, 0.1]], dtype=np.float32),
+    'history': (np.float64(np.nan), 1.5),
+}
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_encode_keeps_numpy_types(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(websocket_manager, 'orjson', None)
+    decoded = json.loads(encode(PAYLOAD))['data']
+    assert decoded['fps'] == 59.94
+    assert decoded['dropped'] == 3
+    assert decoded['streaming'] is True
+    assert decoded['levels'] == [-12.5, -60.0]
+    assert decoded['at'] == '2026-01-01T12:30:00'
+    assert decoded['1'] == 'int key'
+
+
+@pytest.mark.parametrize('payload', [PAYLOAD, MISMATCH_PAYLOAD])
+def test_encoders_agree(monkeypatch, payload):
+    fast = encode(payload)
+    monkeypatch.setattr(websocket_manager, 'orjson', None)
+    assert encode(payload) == fast
+    assert 'NaN' not in fast and '\\u' not in fast
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+def exchange(frames, topics=None):
+    """Connect a fake socket, feed it client frames and return what it was sent"""
+    async def main():
+        manager = websocket_manager.ConnectionManager()
+        websocket = FakeWebSocket()
+        client = await manager.connect(websocket, topics)
+        for frame in frames:
+            await manager.handle_message(websocket, json.dumps(frame))
+        await asyncio.sleep(0)
+        manager.disconnect(websocket)
+        return websocket.sent[1:], client.topics  # skip hello
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize('topics', [[{}], [['chat']], [1], {'chat': True}, None])
+def test_malformed_topics_get_error_frame(topics):
+    sent, subscribed = exchange([{'type': 'subscribe', 'topics': topics}])
+    assert sent == [{'type': 'error', 'message': 'topics must be a list of strings'}]
+    assert subscribed == set(websocket_manager.DEFAULT_TOPICS)
+
+
+def test_subscribe_and_unsubscribe():
+    sent, subscribed = exchange([
+        {'type': 'subscribe', 'topics': ['audio_levels']},
+        {'type': 'unsubscribe', 'topics': 'chat'},
+        {'type': 'subscribe', 'topics': ['nope']},
+    ])
+    assert sent[1] == {'type': 'subscribed', 'topics': sorted(subscribed)}
+    assert sent[2] == {'type': 'error', 'message': 'Unknown topics: nope'}
+    assert subscribed == set(websocket_manager.TOPICS) - {'chat'}
+
+
+def test_parse_topics():
+    assert parse_topics('chat, alerts') == ['chat', 'alerts']
+    assert parse_topics('chat,bogus') == ['chat']
+    assert parse_topics('bogus,alsobogus') is None
+    assert parse_topics('') is None
+    assert parse_topics(None) is None
+
+
+def broadcasts(scenario, **options):
+    """Run scenario(manager) with one fake client connected and return what it was sent after hello"""
+    async def main():
+        manager = websocket_manager.ConnectionManager(**options)
+        websocket = FakeWebSocket()
+        await manager.connect(websocket)
+        await scenario(manager)
+        for _ in range(3):
+            await asyncio.sleep(0)
+        await manager.close_all()
+        return websocket.sent[1:]
+
+    return asyncio.run(main())
+
+
+def chat(n):
+    return {'type': 'chat_message', 'data': {'message': f'msg {n}'}}
+
+
+def test_batch_flushes_at_batch_max():
+    async def scenario(manager):
+        for n in range(5):
+            await manager.broadcast(chat(n))
+
+    sent = broadcasts(scenario, batch_window=60, batch_max=3)
+    # The last two are still held when the manager closes
+    assert len(sent) == 1
+    assert sent[0]['type'] == 'chat_batch'
+    assert [event['seq'] for event in sent[0]['events']] == [1, 2, 3]
+
+
+def test_batch_flushes_after_batch_window():
+    async def scenario(manager):
+        await manager.broadcast(chat(0))
+        await manager.broadcast(chat(1))
+        await asyncio.sleep(0.05)
+
+    sent = broadcasts(scenario, batch_window=0.01, batch_max=50)
+    assert [frame['type'] for frame in sent] == ['chat_batch']
+    assert [event['data']['message'] for event in sent[0]['events']] == ['msg 0', 'msg 1']
+
+
+def test_held_chat_is_sent_before_a_later_sequenced_event():
+    async def scenario(manager):
+        await manager.broadcast(chat(0))
+        await manager.broadcast(chat(1))
+        await manager.broadcast({'type': 'obs_state', 'event': 'CurrentProgramSceneChanged', 'data': {}})
+        await manager.broadcast(chat(2))
+        await asyncio.sleep(0.05)
+
+    sent = broadcasts(scenario, batch_window=0.01, batch_max=50)
+    assert [frame['type'] for frame in sent] == ['chat_batch', 'obs_state', 'chat_message']
+    assert [event['seq'] for event in sent[0]['events']] == [1, 2]
+    assert [sent[1]['seq'], sent[2]['seq']] == [3, 4]
+
+
+def resume_after(events, last_seq, epoch=None, replay_size=1000, via_message=False):
+    """Broadcast obs_state events 1..events, then resume a new client from last_seq; returns its frames"""
+    async def main():
+        manager = websocket_manager.ConnectionManager(replay_size=replay_size)
+        manager.set_snapshot_provider(lambda: {'current_scene': 'Main'})
+        for n in range(1, events + 1):
+            await manager.broadcast({'type': 'obs_state', 'data': {'n': n}})
+        websocket = FakeWebSocket()
+        if via_message:
+            await manager.connect(websocket)
+            await manager.broadcast({'type': 'obs_state', 'data': {'n': events + 1}})
+            await manager.handle_message(websocket, json.dumps(
+                {'type': 'resume', 'last_seq': last_seq, 'epoch': epoch or manager.epoch}
+            ))
+        else:
+            await manager.connect(websocket, last_seq=last_seq, epoch=epoch or manager.epoch)
+        await asyncio.sleep(0)
+        await manager.close_all()
+        return websocket.sent, manager
+
+    return asyncio.run(main())
+
+
+def test_resume_replays_events_after_last_seq():
+    sent, manager = resume_after(5, last_seq=2)
+    assert sent[0] == {'type': 'hello', 'epoch': manager.epoch, 'seq': 5}
+    assert sent[1] == {'type': 'resumed', 'epoch': manager.epoch, 'from_seq': 2, 'seq': 5}
+    assert [frame['seq'] for frame in sent[2:]] == [3, 4, 5]
+    assert manager.resumed == 1
+
+
+def test_resume_message_puts_missed_events_before_live_ones():
+    sent, manager = resume_after(5, last_seq=3, via_message=True)
+    # Event 6 was queued live before the resume request; the gap goes between hello and it
+    assert [frame['type'] for frame in sent] == ['hello', 'resumed', 'obs_state', 'obs_state', 'obs_state']
+    assert sent[1]['seq'] == 5
+    assert [frame['seq'] for frame in sent[2:]] == [4, 5, 6]
+
+
+def test_resume_with_other_epoch_gets_snapshot():
+    sent, manager = resume_after(5, last_seq=2, epoch='restarted')
+    assert sent[1] == {'type': 'snapshot', 'epoch': manager.epoch, 'seq': 5, 'data': {'current_scene': 'Main'}}
+    assert len(sent) == 2
+    assert (manager.resumed, manager.snapshots) == (0, 1)
+
+
+def test_resume_older_than_replay_ring_gets_snapshot():
+    sent, manager = resume_after(10, last_seq=2, replay_size=4)
+    assert [frame['type'] for frame in sent] == ['hello', 'snapshot']
+    assert sent[1]['seq'] == 10
+    # The oldest retained event is 7, so resuming from 6 is still a replay
+    sent, manager = resume_after(10, last_seq=6, replay_size=4)
+    assert [frame['seq'] for frame in sent[2:]] == [7, 8, 9, 10]
+
+
+def test_queue_updates_reach_only_queue_subscribers():
+    async def main():
+        manager = websocket_manager.ConnectionManager()
+        queue_socket, chat_socket = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(queue_socket, ['queue'])
+        await manager.connect(chat_socket, ['chat'])
+        await manager.broadcast({'type': 'queue_update', 'event': 'submission_added', 'data': {'id': '1'}})
+        await asyncio.sleep(0)
+        await manager.close_all()
+        return queue_socket.sent[1:], chat_socket.sent[1:]
+
+    to_queue, to_chat = asyncio.run(main())
+    assert [frame['event'] for frame in to_queue] == ['submission_added']
+    assert to_chat == []